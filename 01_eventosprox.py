@@ -2,8 +2,19 @@ import os
 import re
 import time
 import json
+import random
 from urllib.parse import urljoin
 from bs4 import BeautifulSoup  # Importación añadida aquí
+import incremental
+import enriquecimiento
+import escritores
+import navegador
+import metricas
+import bloqueo
+import extraccion_js
+import fechas
+import historial
+import reintentos
 
 # Configuración
 BASE = "https://www.flowagility.com"
@@ -12,9 +23,35 @@ FLOW_EMAIL = "pilar1959suarez@gmail.com"
 FLOW_PASS = "Seattle1"
 HEADLESS = True
 INCOGNITO = True
-MAX_SCROLLS = 10
-SCROLL_WAIT_S = 1.5
+SCROLL_TIMEOUT_MIN_S = 1.0   # espera mínima sin tarjetas nuevas antes de dar la lista por completa
+SCROLL_TIMEOUT_MAX_S = 15.0  # tope de espera por paso (carga lenta)
+SCROLL_IDLE_S = 0.4          # red y DOM en reposo durante este tiempo = lote terminado
+SCROLL_POLL_S = 0.1
+WINDOWED_SCROLL = False      # vacía (o borra) las tarjetas ya extraídas: DOM de tamaño ~constante
+WINDOW_MODE = "collapse"     # "collapse": deja el div vacío; "remove": lo quita del DOM
+BLOCK_RESOURCES = bloqueo.POR_DEFECTO  # imágenes, fuentes, media y rastreadores; "" = cargar todo
+PARSER_BACKEND = "lxml"   # "lxml" (rápido) o "html.parser" (BeautifulSoup puro)
+EXTRACTION = "js"         # "js": extrae en el navegador (extraccion_js.py); "python": outerHTML + PARSER_BACKEND;
+                          # "verificar": ambos, avisando de cualquier diferencia
+SAVE_HTML = False         # guarda page_source en OUT_DIR para replay.py
+INCREMENTAL = False       # para el scroll tras INCREMENTAL_RUN eventos ya conocidos y sin cambios
+INCREMENTAL_RUN = 20
+INCREMENTAL_FULL_EVERY = 7  # scroll completo cada N ejecuciones incrementales (el listado va por fecha, no por alta)
+ENRICH = False            # descarga info/participantes/runs de cada evento (enriquecimiento.py)
+ENRICH_WORKERS = 8        # descargas simultáneas
+ENRICH_RATE = 4.0         # peticiones por segundo y host como máximo
+WRITE_JSONL = True        # competiciones_agility.jsonl: eventos en bruto según se extraen (tail -f)
+WRITE_PARQUET = False     # competiciones_agility.parquet/mes=AAAA-MM: columnas tipadas (columnar.py, pyarrow)
+RETRIES = 3               # reintentos de cada fase (sesión, cookies, scroll) con espera exponencial
+RETRY_BASE_S = 2.0        # espera antes del primer reintento; se duplica en cada uno
+RESUME = True             # checkpoint de los eventos cosechados: una ejecución fallida se reanuda
+RESUME_MAX_HOURS = 36     # un checkpoint más viejo se descarta (cubre la ejecución de la noche siguiente)
+HISTORY = True            # versiones y cambios de estado de cada evento en SQLite (historial.py)
+HISTORY_PATH = os.getenv("HISTORIAL_PATH") or historial.RUTA
+METRICS = True            # metricas_flowagility.json + agileventos_flowagility.prom en OUT_DIR
+METRICS_PROM_DIR = os.getenv("METRICAS_PROM_DIR") or None  # p. ej. el textfile collector de node_exporter
 OUT_DIR = "./output"
+SESSION_FILE = os.path.join(os.path.expanduser("~"), ".cache", "agileventos", "flow_session.json")
 UUID_RE = re.compile(r"([a-f0-9]{8}-[a-f0-9]{4}-[a-f0-9]{4}-[a-f0-9]{4}-[a-f0-9]{12})")
 
 # Crear directorio de salida si no existe
@@ -26,7 +63,7 @@ def log(message):
 
 def slow_pause(min_s=0.5, max_s=1.2):
     """Pausa aleatoria entre min_s y max_s segundos"""
-    time.sleep(max(min_s, max_s))
+    time.sleep(random.uniform(min_s, max_s))
 
 def _import_selenium():
     from selenium import webdriver
@@ -42,7 +79,6 @@ def _import_selenium():
 
 def _get_driver():
     webdriver, By, Options, *_ = _import_selenium()
-    from selenium.webdriver.chrome.service import Service
 
     opts = Options()
     if HEADLESS:  opts.add_argument("--headless=new")
@@ -55,19 +91,20 @@ def _get_driver():
     
     # Opciones adicionales para evitar problemas de versión
     opts.add_argument("--disable-gpu")
-    opts.add_argument("--remote-debugging-port=9222")
+    # sin --remote-debugging-port fijo: chromedriver usa uno libre y no choca
+    # con el Chrome compartido de navegador.py (CHROME_DEBUG_PORT)
     opts.add_experimental_option("excludeSwitches", ["enable-automation"])
     opts.add_experimental_option('useAutomationExtension', False)
+    bloqueo.preferencias(opts, BLOCK_RESOURCES)
 
-    # Usar ChromeDriverManager para manejar automáticamente la versión
-    try:
-        from webdriver_manager.chrome import ChromeDriverManager
-        service = Service(ChromeDriverManager().install())
-        return webdriver.Chrome(service=service, options=opts)
-    except ImportError:
-        # Fallback si webdriver_manager no está instalado
-        log("webdriver_manager no instalado, usando ChromeDriver del sistema")
-        return webdriver.Chrome(options=opts)
+    # chromedriver cacheado entre ejecuciones y, con NAVEGADOR_COMPARTIDO=1,
+    # pestaña en el Chrome caliente de navegador.py en vez de lanzar uno nuevo
+    driver, mode = navegador.obtener(lambda: opts)
+    log(f"Navegador {mode} listo ({navegador.resumen()})")
+    blocked = bloqueo.aplicar(driver, BLOCK_RESOURCES)
+    if blocked:
+        log(f"Bloqueando {blocked} patrones de recursos ({BLOCK_RESOURCES})")
+    return driver
 
 def _save_screenshot(driver, name):
     try:
@@ -128,92 +165,409 @@ def _ensure_logged_in(driver, max_tries, By, WebDriverWait, EC):
             return True
     return False
 
-def _full_scroll(driver):
-    last_h = 0
-    for _ in range(MAX_SCROLLS):
+# Instrumenta la página una sola vez: peticiones fetch/XHR en vuelo y última
+# mutación del DOM (las actualizaciones por websocket solo se ven como mutaciones).
+_SCROLL_HOOK_JS = """
+if (!window.__faHook) {
+  window.__faHook = true;
+  window.__faPending = 0;
+  window.__faLast = Date.now();
+  const touch = () => { window.__faLast = Date.now(); };
+  const done = () => { window.__faPending--; touch(); };
+  if (window.fetch) {
+    const origFetch = window.fetch;
+    window.fetch = function() {
+      window.__faPending++; touch();
+      return origFetch.apply(this, arguments).finally(done);
+    };
+  }
+  const origSend = XMLHttpRequest.prototype.send;
+  XMLHttpRequest.prototype.send = function() {
+    window.__faPending++; touch();
+    this.addEventListener('loadend', done);
+    return origSend.apply(this, arguments);
+  };
+  new MutationObserver(touch).observe(document.body, {childList: true, subtree: true});
+}
+"""
+
+_SCROLL_STATE_JS = """
+return [document.querySelectorAll('div.group.mb-6').length + (window.__faRemoved || 0),
+        document.body.scrollHeight,
+        window.__faPending || 0,
+        Date.now() - (window.__faLast || 0)];
+"""
+
+def _scroll_state(driver):
+    cards, height, pending, quiet_ms = driver.execute_script(_SCROLL_STATE_JS)
+    return cards, height, pending, quiet_ms / 1000.0
+
+def _load_session(driver):
+    """Restaura las cookies de la última sesión. Devuelve True si había alguna vigente."""
+    try:
+        with open(SESSION_FILE, encoding='utf-8') as f:
+            cookies = json.load(f).get('cookies', [])
+    except (OSError, ValueError):
+        return False
+    now = time.time()
+    cookies = [c for c in cookies if not c.get('expiry') or c['expiry'] > now]
+    if not cookies:
+        return False
+    # add_cookie solo funciona estando ya en el dominio
+    driver.get(BASE)
+    for c in cookies:
+        try:
+            driver.add_cookie(c)
+        except Exception:
+            pass
+    return True
+
+def _save_session(driver):
+    """Guarda las cookies en un fichero legible solo por el usuario (0600)"""
+    try:
+        os.makedirs(os.path.dirname(SESSION_FILE), mode=0o700, exist_ok=True)
+        tmp = SESSION_FILE + '.tmp'
+        fd = os.open(tmp, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            json.dump({'saved_at': time.time(), 'cookies': driver.get_cookies()}, f)
+        os.replace(tmp, SESSION_FILE)
+        log(f"Sesión guardada en {SESSION_FILE}")
+    except Exception as e:
+        log(f"No se pudo guardar la sesión: {e}")
+
+def _open_events(driver, By, WebDriverWait, EC):
+    """
+    Abre EVENTS_URL reutilizando la sesión guardada si existe; solo hace el
+    login completo cuando no hay sesión o _is_login_page detecta que caducó.
+    """
+    if _load_session(driver):
+        log("Reutilizando sesión guardada")
+    else:
+        _login(driver, By, WebDriverWait, EC)
+        _save_session(driver)
+
+    log("Navegando a la página de eventos...")
+    driver.get(EVENTS_URL)
+    if _is_login_page(driver):
+        if not _ensure_logged_in(driver, 2, By, WebDriverWait, EC):
+            raise RuntimeError("No se pudo iniciar sesión en FlowAgility")
+        _save_session(driver)
+        driver.get(EVENTS_URL)
+    WebDriverWait(driver, 20).until(
+        EC.presence_of_element_located((By.TAG_NAME, "body"))
+    )
+
+_CARDS_HTML_JS = """
+const sel = arguments[1] ? 'div.group.mb-6:not([data-fa-h])' : 'div.group.mb-6';
+return [...document.querySelectorAll(sel)].slice(arguments[0]).map(e => e.outerHTML);
+"""
+
+# Marca como cosechadas las N primeras tarjetas pendientes y libera su contenido.
+# Las borradas se suman en __faRemoved para que _scroll_state siga viendo crecer la lista.
+_COLLAPSE_JS = """
+const cards = document.querySelectorAll('div.group.mb-6:not([data-fa-h])');
+const n = Math.min(arguments[0], cards.length);
+for (let i = 0; i < n; i++) {
+  if (arguments[1]) cards[i].remove();
+  else { cards[i].setAttribute('data-fa-h', '1'); cards[i].replaceChildren(); }
+}
+if (arguments[1]) window.__faRemoved = (window.__faRemoved || 0) + n;
+return n;
+"""
+
+def _cards_html(driver, start=0):
+    """outerHTML de las tarjetas a partir de la posición `start` (o de las no cosechadas)"""
+    return driver.execute_script(_CARDS_HTML_JS, start, WINDOWED_SCROLL) or []
+
+def _cards_data(driver, start=0):
+    """Datos en bruto de las tarjetas a partir de `start`, extraídos en el navegador"""
+    return driver.execute_script(extraccion_js.FLOW_JS, start, WINDOWED_SCROLL) or []
+
+def _collapse_cards(driver, n):
+    """Vacía o borra las n tarjetas recién extraídas (scroll por ventanas)"""
+    if n:
+        driver.execute_script(_COLLAPSE_JS, n, WINDOW_MODE == "remove")
+
+def _full_scroll(driver, on_step=None):
+    """
+    Scroll infinito guiado por la propia página: tras cada scroll espera a que
+    aparezcan tarjetas nuevas y la red/DOM queden en reposo. Termina cuando un
+    scroll no trae nada nuevo dentro de un timeout adaptativo (3x la latencia
+    media observada, acotado entre SCROLL_TIMEOUT_MIN_S y SCROLL_TIMEOUT_MAX_S).
+
+    on_step(desde, hasta) se llama con el rango de tarjetas nuevas (también
+    las iniciales); si devuelve True se deja de hacer scroll.
+    """
+    driver.execute_script(_SCROLL_HOOK_JS)
+    cards, height, *_ = _scroll_state(driver)
+    if on_step and on_step(0, cards):
+        log(f"Scroll detenido: {cards} tarjetas (incremental)")
+        return
+    latency = None
+    timeout = SCROLL_TIMEOUT_MIN_S
+    steps = 0
+
+    while True:
         driver.execute_script("window.scrollTo(0, document.body.scrollHeight);")
-        time.sleep(SCROLL_WAIT_S)
-        h = driver.execute_script("return document.body.scrollHeight;")
-        if h == last_h:
+        steps += 1
+        t0 = time.monotonic()
+        grew_after = None
+        while True:
+            time.sleep(SCROLL_POLL_S)
+            new_cards, new_height, pending, quiet_s = _scroll_state(driver)
+            elapsed = time.monotonic() - t0
+            idle = pending == 0 and quiet_s >= SCROLL_IDLE_S
+            if new_cards > cards or new_height > height:
+                if grew_after is None:
+                    grew_after = elapsed
+                if idle:
+                    break
+            elif elapsed >= timeout and pending == 0:
+                break
+            if elapsed >= SCROLL_TIMEOUT_MAX_S:
+                break
+
+        if grew_after is None:
+            break
+        if on_step and on_step(cards, new_cards):
+            cards = new_cards
+            log(f"Scroll detenido tras {steps} pasos: racha de eventos ya conocidos")
             break
-        last_h = h
+        cards, height = new_cards, new_height
+        latency = grew_after if latency is None else 0.7 * latency + 0.3 * grew_after
+        timeout = min(SCROLL_TIMEOUT_MAX_S, max(SCROLL_TIMEOUT_MIN_S, 3 * latency))
 
-def extract_event_details(container_html):
-    """Extrae detalles específicos de un evento del HTML"""
-    soup = BeautifulSoup(container_html, 'html.parser')
-    
-    event_data = {}
-    
-    # ID del evento
-    event_container = soup.find('div', class_='group mb-6')
-    if event_container:
-        event_data['id'] = event_container.get('id', '')
-    
-    # Información básica
-    info_div = soup.find('div', class_='relative flex flex-col w-full pt-1 pb-6 mb-4 border-b border-gray-300')
-    if info_div:
-        # Fechas
-        date_elems = info_div.find_all('div', class_='text-xs')
-        if date_elems:
-            event_data['fechas'] = date_elems[0].get_text(strip=True)
-        
-        # Organización
-        if len(date_elems) > 1:
-            event_data['organizacion'] = date_elems[1].get_text(strip=True)
-        
-        # Nombre del evento
-        name_elem = info_div.find('div', class_='font-caption text-lg text-black truncate -mt-1')
-        if name_elem:
-            event_data['nombre'] = name_elem.get_text(strip=True)
-        
-        # Club organizador
-        club_elem = info_div.find('div', class_='text-xs mb-0.5 mt-0.5')
-        if club_elem:
-            event_data['club'] = club_elem.get_text(strip=True)
-        
-        # Lugar - buscar en todos los divs con text-xs
-        location_divs = info_div.find_all('div', class_='text-xs')
-        for div in location_divs:
-            text = div.get_text(strip=True)
-            if '/' in text and ('Spain' in text or 'España' in text):
-                event_data['lugar'] = text
+    log(f"Scroll completado: {cards} tarjetas en {steps} pasos")
+
+# Clases de los nodos que nos interesan dentro de cada tarjeta de evento.
+# Se comparan como conjuntos, así el orden o una clase extra no rompen la extracción.
+EVENT_CLS  = frozenset(("group", "mb-6"))
+INFO_CLS   = frozenset("relative flex flex-col w-full pt-1 pb-6 mb-4 border-b border-gray-300".split())
+NOMBRE_CLS = frozenset("font-caption text-lg text-black truncate -mt-1".split())
+CLUB_CLS   = frozenset("text-xs mb-0.5 mt-0.5".split())
+ESTADO_CLS = frozenset("py-1 px-4 border text-white font-bold rounded text-sm".split())
+LINK_KEYS  = (("info", "/info/"), ("participantes", "/participants_list"), ("runs", "/runs"))
+
+def _lxml_backend():
+    """Adaptador lxml: (parse, tarjetas, tag, clases, hijos, texto, atributo)"""
+    import lxml.etree
+    import lxml.html
+
+    cards_xpath = lxml.etree.XPath(
+        "descendant-or-self::div[contains(concat(' ', normalize-space(@class), ' '), ' group ')"
+        " and contains(concat(' ', normalize-space(@class), ' '), ' mb-6 ')]"
+    )
+
+    def parse(html):
+        try:
+            return lxml.html.fromstring(html)
+        except Exception:  # documento vacío o ilegible
+            return None
+
+    def tag(el):
+        return el.tag if isinstance(el.tag, str) else None
+
+    def classes(el):
+        return (el.get("class") or "").split()
+
+    def text(el):
+        return "".join(t.strip() for t in el.itertext())
+
+    return parse, cards_xpath, tag, classes, iter, text, lambda el, k: el.get(k)
+
+def _bs4_backend():
+    """Adaptador BeautifulSoup/html.parser (más lento, sin dependencias nativas)"""
+    from bs4.element import Tag
+
+    def parse(html):
+        return BeautifulSoup(html, "html.parser")
+
+    def cards(root):
+        return root.select("div.group.mb-6")
+
+    def tag(el):
+        return el.name if isinstance(el, Tag) else None
+
+    def classes(el):
+        return el.get("class") or []
+
+    def children(el):
+        return (c for c in el.children if isinstance(c, Tag))
+
+    def text(el):
+        return el.get_text(strip=True)
+
+    return parse, cards, tag, classes, children, text, lambda el, k: el.get(k)
+
+_BACKENDS = {}
+
+def _get_backend():
+    if PARSER_BACKEND not in _BACKENDS:
+        backend = None
+        if PARSER_BACKEND == "lxml":
+            try:
+                backend = _lxml_backend()
+            except ImportError:
+                log("lxml no instalado, usando html.parser")
+        _BACKENDS[PARSER_BACKEND] = backend or _bs4_backend()
+    return _BACKENDS[PARSER_BACKEND]
+
+def _abs_url(href):
+    # Atajo para rutas absolutas del propio sitio (el caso habitual); urljoin para el resto
+    if href.startswith("/") and not href.startswith("//"):
+        return BASE + href
+    return urljoin(BASE, href)
+
+def _walk_card(card, backend):
+    """
+    Recorre una sola vez el subárbol de la tarjeta y devuelve los datos en bruto
+    (el mismo dict que extraccion_js.FLOW_JS en el navegador)
+    """
+    _, _, tag, classes, children, text, attr = backend
+
+    info = nombre = club = estado = bandera = None
+    text_xs = []
+    links = {}
+
+    stack = [(card, False)]
+    while stack:
+        el, in_info = stack.pop()
+        name = tag(el)
+        if name is None:
+            continue
+        cls = classes(el)
+        if name == "div" and cls:
+            cls = frozenset(cls)
+            if in_info:
+                if "text-xs" in cls:
+                    text_xs.append(el)
+                if nombre is None and NOMBRE_CLS <= cls:
+                    nombre = el
+                if club is None and CLUB_CLS <= cls:
+                    club = el
+            elif info is None and INFO_CLS <= cls:
+                info = el
+                in_info = True
+            if estado is None and ESTADO_CLS <= cls:
+                estado = el
+            if bandera is None and "text-md" in cls:
+                bandera = el
+        elif name == "a" and len(links) < len(LINK_KEYS):
+            href = attr(el, "href")
+            if href:
+                for key, frag in LINK_KEYS:
+                    if key not in links and frag in href:
+                        links[key] = href
+        # apilar en orden inverso para visitar en orden de documento
+        stack.extend((c, in_info) for c in reversed(list(children(el))))
+
+    return {
+        'id': attr(card, "id") or "",
+        'info': info is not None,
+        'text_xs': [text(div) for div in text_xs],
+        'nombre': text(nombre) if nombre is not None else None,
+        'club': text(club) if club is not None else None,
+        'estado': text(estado) if estado is not None else None,
+        'bandera': text(bandera) if bandera is not None else None,
+        'links': links,
+    }
+
+def _build_event(raw):
+    """Compone el evento a partir de los datos en bruto de una tarjeta (Python o JS)"""
+    event_data = {"id": raw['id']}
+
+    if raw['info']:
+        text_xs = raw['text_xs']
+        if text_xs:
+            event_data['fechas'] = text_xs[0]
+        if len(text_xs) > 1:
+            event_data['organizacion'] = text_xs[1]
+        if raw['nombre'] is not None:
+            event_data['nombre'] = raw['nombre']
+        if raw['club'] is not None:
+            event_data['club'] = raw['club']
+        for t in text_xs:
+            if '/' in t and ('Spain' in t or 'España' in t):
+                event_data['lugar'] = t
                 break
-    
-    # Estado del evento
-    status_button = soup.find('div', class_='py-1 px-4 border text-white font-bold rounded text-sm')
-    if status_button:
-        event_data['estado'] = status_button.get_text(strip=True)
-        # Determinar tipo de estado
+
+    if raw['estado'] is not None:
+        event_data['estado'] = raw['estado']
         if 'Inscribirse' in event_data['estado']:
             event_data['estado_tipo'] = 'inscripcion_abierta'
         elif 'En curso' in event_data['estado']:
             event_data['estado_tipo'] = 'en_curso'
         else:
             event_data['estado_tipo'] = 'desconocido'
-    
-    # Enlaces
-    event_data['enlaces'] = {}
-    info_link = soup.find('a', href=lambda x: x and '/info/' in x)
-    if info_link:
-        event_data['enlaces']['info'] = urljoin(BASE, info_link['href'])
-    
-    participants_link = soup.find('a', href=lambda x: x and '/participants_list' in x)
-    if participants_link:
-        event_data['enlaces']['participantes'] = urljoin(BASE, participants_link['href'])
-    
-    runs_link = soup.find('a', href=lambda x: x and '/runs' in x)
-    if runs_link:
-        event_data['enlaces']['runs'] = urljoin(BASE, runs_link['href'])
-    
-    # Bandera del país
-    flag_div = soup.find('div', class_='text-md')
-    if flag_div:
-        event_data['pais_bandera'] = flag_div.get_text(strip=True)
-    
+
+    links = raw['links']
+    event_data['enlaces'] = {
+        key: _abs_url(links[key]) for key, _ in LINK_KEYS if key in links
+    }
+
+    if raw['bandera'] is not None:
+        event_data['pais_bandera'] = raw['bandera']
+
     return event_data
 
+def _extract_card(card, backend):
+    return _build_event(_walk_card(card, backend))
+
+def extract_events(page_html, on_error=None):
+    """
+    Parsea el documento una sola vez y devuelve la lista de eventos
+    (mismo esquema que extract_event_details) en orden de aparición.
+    """
+    backend = _get_backend()
+    root = backend[0](page_html)
+    if root is None:
+        return []
+    events = []
+    for i, card in enumerate(backend[1](root), 1):
+        try:
+            events.append(_extract_card(card, backend))
+        except Exception as e:
+            if on_error:
+                on_error(i, e)
+    return events
+
+def extract_event_details(container_html):
+    """Extrae detalles específicos de un evento del HTML"""
+    backend = _get_backend()
+    root = backend[0](container_html)
+    if root is None:
+        return {'enlaces': {}}
+    cards = backend[1](root)
+    if cards:
+        return _extract_card(cards[0], backend)
+    # Fragmento sin contenedor: se extrae lo que haya, pero sin 'id'
+    event_data = _extract_card(root, backend)
+    del event_data['id']
+    return event_data
+
+def _save_metrics(metrics):
+    if not METRICS:
+        return
+    try:
+        metrics.extra.update(navegador.TIEMPOS)
+        metrics.guardar(OUT_DIR, METRICS_PROM_DIR)
+        log(f"Tiempos: {metrics.resumen()}")
+    except Exception as e:
+        log(f"No se pudieron guardar las métricas: {e}")
+
+def _enrich_events(driver, events):
+    """Descarga en paralelo las páginas de detalle con las cookies del navegador"""
+    log(f"Enriqueciendo {len(events)} eventos ({ENRICH_WORKERS} en paralelo, {ENRICH_RATE}/s por host)...")
+    t0 = time.time()
+    enr = enriquecimiento.Enriquecedor(driver.get_cookies(), workers=ENRICH_WORKERS, por_segundo=ENRICH_RATE)
+    try:
+        enr.enriquecer(events)
+    finally:
+        enr.close()
+    log(f"Enriquecimiento: {enr.descargas} páginas, {enr.errores} errores en {time.time() - t0:.1f}s")
+
 def main():
-    """Función principal"""
+    """Función principal; devuelve False si el scraping falló (para planificador.py)"""
     log("=== Scraping FlowAgility - Competiciones de Agility ===")
     
     # Importar Selenium
@@ -222,55 +576,205 @@ def main():
      NoSuchElementException, ElementClickInterceptedException, 
      TimeoutException) = _import_selenium()
     
-    driver = _get_driver()
+    metrics = metricas.Medidor("flowagility")
+    with metrics.fase("arranque_navegador"):
+        driver = _get_driver()
     
+    array = parquet = history = checkpoint = stream = None
+    events = []
+    policy = reintentos.Politica(RETRIES + 1, RETRY_BASE_S)
     try:
-        # Login
-        _login(driver, By, WebDriverWait, EC)
-        
-        # Navegar a eventos
-        log("Navegando a la página de eventos...")
-        driver.get(EVENTS_URL)
-        WebDriverWait(driver, 20).until(
-            EC.presence_of_element_located((By.TAG_NAME, "body"))
-        )
+        # Login (o sesión guardada) y navegar a eventos
+        with metrics.fase("sesion"):
+            policy.ejecutar(lambda n: _open_events(driver, By, WebDriverWait, EC), "sesión", log=log)
         
         # Aceptar cookies
-        _accept_cookies(driver, By)
+        with metrics.fase("cookies"):
+            _accept_cookies(driver, By)
+        
+        output_file = os.path.join(OUT_DIR, 'competiciones_agility.json')
+        if RESUME:
+            checkpoint = reintentos.Checkpoint(
+                os.path.join(OUT_DIR, 'competiciones_agility.checkpoint.jsonl'),
+                {'url': EVENTS_URL, 'extraccion': EXTRACTION}, RESUME_MAX_HOURS * 3600
+            )
+        event_key = lambda e: e.get('id')
+        detector = None
+        if INCREMENTAL:
+            # los detalles se vuelven a descargar: no cuentan como cambio
+            snapshot = incremental.cargar_snapshot(
+                output_file, event_key,
+                convertir=lambda e: {k: v for k, v in e.items() if k != 'detalles'}
+            )
+            log(f"Modo incremental: {len(snapshot)} eventos en el snapshot anterior")
+            if incremental.toca_completa(output_file, INCREMENTAL_FULL_EVERY):
+                log(f"Modo incremental: toca scroll completo (cada {INCREMENTAL_FULL_EVERY} ejecuciones)")
+            else:
+                detector = incremental.Detector(snapshot, event_key, INCREMENTAL_RUN)
+        
+        # Los eventos se extraen tras cada paso de scroll, solo de las tarjetas nuevas,
+        # y se vuelcan al JSONL en el momento. Con WINDOWED_SCROLL las tarjetas
+        # extraídas se vacían en el navegador y, si ningún paso posterior necesita
+        # la lista completa (incremental, enriquecimiento), los eventos van directos
+        # al JSON final: en memoria solo quedan los ids.
+        seen_ids, consumed, total = set(), [0], [0]
+        stream = escritores.EscritorJSONL(os.path.join(OUT_DIR, 'competiciones_agility.jsonl')) if WRITE_JSONL else None
+        if WRITE_PARQUET:
+            import columnar
+            parquet = columnar.EscritorParquet(os.path.join(OUT_DIR, 'competiciones_agility.parquet'),
+                                               columnar.ESQUEMA_FLOW)
+        if WINDOWED_SCROLL and not INCREMENTAL and not ENRICH:
+            array = escritores.EscritorJSONArray(output_file, indent=2)
+        if HISTORY:
+            try:
+                history = historial.Historial(HISTORY_PATH)
+            except Exception as e:
+                log(f"Historial desactivado: {e}")
+        
+        def emit(new_events):
+            total[0] += len(new_events)
+            with metrics.fase("escritura"):
+                if stream:
+                    stream.escribir_todos(new_events)
+                if array:
+                    array.escribir_todos(new_events)
+                    if parquet:
+                        parquet.escribir_todos(new_events)
+                else:
+                    events.extend(new_events)
+        
+        if checkpoint and checkpoint.reanudado:
+            # eventos cosechados por la ejecución fallida: el scroll los salta por id
+            resumed = [e for e in checkpoint.eventos() if e.get('id') not in seen_ids]
+            seen_ids.update(e.get('id') for e in resumed)
+            emit(resumed)
+            log(f"Reanudando desde el checkpoint: {len(resumed)} eventos ya cosechados")
+        
+        def harvest():
+            start = consumed[0]
+            with metrics.fase("transferencia") as ph:
+                if EXTRACTION == "python":
+                    cards = _cards_html(driver, start)
+                    ph.sumar(items=len(cards), bytes=sum(len(c) for c in cards))
+                else:
+                    cards = _cards_data(driver, start)
+                    ph.sumar(items=len(cards), bytes=len(json.dumps(cards, ensure_ascii=False)))
+            if WINDOWED_SCROLL:
+                # la verificación necesita el HTML de estas mismas tarjetas: se vacían al final
+                pending = len(cards)
+            else:
+                consumed[0] += len(cards)
+            new_events = []
+            with metrics.fase("parseo") as ph:
+                if EXTRACTION == "python":
+                    extracted = extract_events(
+                        "".join(cards),
+                        on_error=lambda i, e: log(f"Error procesando evento {start + i}: {str(e)}")
+                    )
+                else:
+                    extracted = [_build_event(raw) for raw in cards]
+                    if EXTRACTION == "verificar":
+                        check = extract_events("".join(_cards_html(driver, start)))[:len(extracted)]
+                        for diff in extraccion_js.diferencias(extracted, check, clave=event_key):
+                            log(f"Extracción JS != Python: {diff}")
+                for e in extracted:
+                    if e['id'] and e['id'] in seen_ids:
+                        continue
+                    seen_ids.add(e['id'])
+                    new_events.append(e)
+                # fecha_inicio / fecha_fin ISO para todo el lote de una vez
+                fechas.anotar(new_events)
+                ph.sumar(items=len(new_events))
+            if WINDOWED_SCROLL:
+                with metrics.fase("colapso") as ph:
+                    _collapse_cards(driver, pending)
+                    ph.sumar(items=pending)
+            if checkpoint and new_events:
+                checkpoint.pagina(max(checkpoint.hechas, default=0) + 1, new_events)
+            if history and new_events:
+                with metrics.fase("historial") as ph:
+                    try:
+                        history.registrar('flow', new_events)
+                    except Exception as e:
+                        log(f"No se pudo actualizar el historial: {e}")
+                    ph.sumar(items=len(new_events))
+            emit(new_events)
+            return new_events
+        
+        def on_step(start, end):
+            new_events = harvest()
+            return detector.ver_todos(new_events) if detector else False
         
         # Scroll completo para cargar todos los eventos
-        log("Cargando todos los eventos...")
-        _full_scroll(driver)
-        slow_pause(2, 3)
+        log("Cargando y extrayendo eventos...")
+        def scroll_pass(attempt):
+            if attempt > 1:
+                # página recargada: las tarjetas ya cosechadas se descartan por id
+                _open_events(driver, By, WebDriverWait, EC)
+                consumed[0] = 0
+            _full_scroll(driver, on_step)
+            harvest()  # tarjetas que llegaran tras el último paso
         
-        # Obtener HTML de la página
-        page_html = driver.page_source
+        with metrics.fase("scroll") as ph:
+            policy.ejecutar(scroll_pass, "scroll", log=log)
+            ph.sumar(items=total[0])
+        metrics.extra['red'] = network = bloqueo.estadisticas(driver)
+        log(f"Red (página de eventos): {bloqueo.formato(network)}")
         
-        # Extraer eventos
-        log("Extrayendo información de eventos...")
-        events = []
+        if SAVE_HTML:
+            with metrics.fase("page_source") as ph:
+                page_html = driver.page_source
+                ph.sumar(bytes=len(page_html))
+            with open(os.path.join(OUT_DIR, 'events_page.html'), 'w', encoding='utf-8') as f:
+                f.write(page_html)
         
-        # Buscar todos los contenedores de eventos
-        soup = BeautifulSoup(page_html, 'html.parser')
-        event_containers = soup.find_all('div', class_='group mb-6')
+        log(f"Encontrados {total[0]} eventos")
         
-        log(f"Encontrados {len(event_containers)} eventos")
+        for i, event_data in enumerate(events, 1):
+            log(f"Procesado evento {i}/{len(events)}: {event_data.get('nombre', 'Sin nombre')}")
         
-        for i, container in enumerate(event_containers, 1):
-            try:
-                event_data = extract_event_details(str(container))
-                events.append(event_data)
-                log(f"Procesado evento {i}/{len(event_containers)}: {event_data.get('nombre', 'Sin nombre')}")
-            except Exception as e:
-                log(f"Error procesando evento {i}: {str(e)}")
-                continue
+        if INCREMENTAL:
+            seen = len(events)
+            partial = bool(detector and detector.parar)
+            events = incremental.fusionar(snapshot, events, event_key, partial)
+            if stream:
+                stream.escribir_todos(events[seen:])
+            delta = incremental.calcular_delta(snapshot, events, event_key)
+            delta_file = os.path.join(OUT_DIR, 'competiciones_agility.delta.json')
+            incremental.guardar_json(delta_file, delta)
+            log(f"Delta ({incremental.resumen(delta)}) guardado en {delta_file}")
         
-        # Guardar resultados
-        output_file = os.path.join(OUT_DIR, 'competiciones_agility.json')
-        with open(output_file, 'w', encoding='utf-8') as f:
-            json.dump(events, f, ensure_ascii=False, indent=2)
+        if ENRICH:
+            with metrics.fase("enriquecimiento") as ph:
+                _enrich_events(driver, events)
+                ph.sumar(items=len(events))
+        
+        # Guardar resultados (fichero temporal + rename: nunca queda un JSON a medias)
+        with metrics.fase("escritura") as ph:
+            if stream:
+                stream.close()
+            if array:
+                array.close()
+                saved = array.n
+            else:
+                with escritores.EscritorJSONArray(output_file, indent=2) as w:
+                    w.escribir_todos(events)
+                saved = len(events)
+            ph.sumar(items=saved, bytes=os.path.getsize(output_file))
+            if parquet:
+                if not array:
+                    parquet.escribir_todos(events)
+                parquet.close()
         
-        log(f"✅ Extracción completada. {len(events)} eventos guardados en {output_file}")
+        if checkpoint:
+            checkpoint.terminar()
+        if INCREMENTAL:
+            incremental.anotar_pasada(output_file, not partial)
+        log(f"✅ Extracción completada. {saved} eventos guardados en {output_file}")
+        if parquet:
+            log(f"Parquet guardado en {parquet.path} ({columnar.formato(parquet.stats)})")
+        if history:
+            log(f"Historial ({history.resumen('flow')}): {HISTORY_PATH}")
         
         # Mostrar resumen
         print(f"\n{'='*80}")
@@ -284,17 +788,34 @@ def main():
             print(f"   🏆 {event.get('club', 'Club no especificado')}")
             print(f"   📍 {event.get('lugar', 'Lugar no especificado')}")
             print(f"   🚦 {event.get('estado', 'Estado no especificado')}")
+            if 'participantes_total' in event.get('detalles', {}):
+                print(f"   👥 {event['detalles']['participantes_total']} participantes")
         
         print(f"\n{'='*80}")
-        print(f"Total: {len(events)} competiciones de agility")
+        print(f"Total: {saved} competiciones de agility")
         
     except Exception as e:
+        if array:
+            array.abortar()
+        if parquet:
+            parquet.abortar()
+        metrics.ok = False
         log(f"Error durante el scraping: {str(e)}")
+        if checkpoint:
+            checkpoint.cerrar()
+            log(f"Progreso conservado en {checkpoint.path} ({len(checkpoint.eventos())} eventos); la próxima ejecución sigue desde ahí")
         _save_screenshot(driver, "error_screenshot.png")
         
     finally:
-        driver.quit()
+        if stream:
+            stream.abortar()   # ya cerrado si todo fue bien; si no, cierra el fd y vuelca lo pendiente
+        if history:
+            history.close()
+        with metrics.fase("cierre_navegador"):
+            navegador.liberar(driver)
         log("Navegador cerrado")
+        _save_metrics(metrics)
+    return metrics.ok
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -41,28 +41,65 @@ Fecha de Creación: [Fecha de creación]
 """
 Scraper RSCE Agility -> CSV (con Lat/Lon y Estado)
 - Excluye eventos "Anulado"
-- Opción de filtrar "desde hoy"
+- Opción de filtrar "desde hoy" (fechas normalizadas por lote con pandas, fechas.py)
+- Columnas fecha_inicio/fecha_fin en ISO (AAAA-MM-DD) al final del CSV
+- Opcional (PARQUET=1): dataset Parquet tipado y particionado por mes (columnar.py)
+- Historial SQLite (HISTORIAL=1): versiones y cambios de estado de cada evento (historial.py)
+- Reintentos por página con espera exponencial y cortacircuitos; checkpoint
+  (REANUDAR=1) para que una ejecución fallida se reanude donde se quedó (reintentos.py)
 - Paginación robusta 1..N (o solo 1)
-- Geocodifica ciudades únicas (Nominatim) y añade Latitud/Longitud
-Requiere: selenium, webdriver-manager, bs4, geopy, python-dotenv (opcional)
+- Geocodifica ciudades únicas (nomenclátor offline, caché SQLite y Nominatim) y añade Latitud/Longitud
+- Motor HTTP (requests) para el listado con Selenium como respaldo
+- Selenium y geopy se importan solo si se usan; chromedriver cacheado y
+  navegador caliente opcional (navegador.py, NAVEGADOR_COMPARTIDO=1)
+Requiere: selenium, webdriver-manager, bs4, geopy, requests, pandas, python-dotenv (opcional)
 """
 
-import os, csv, time, re, datetime
-from typing import List, Tuple, Optional
-from bs4 import BeautifulSoup
+import os, time, datetime, queue, threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Tuple
+from urllib.parse import urlsplit
 
-# Selenium
-from selenium import webdriver
-from selenium.webdriver.common.by import By
-from selenium.webdriver.chrome.service import Service as ChromeService
-from selenium.webdriver.chrome.options import Options
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
-from webdriver_manager.chrome import ChromeDriverManager
+# Selenium: se importa al crear el primer driver (el motor HTTP no lo necesita)
+import navegador
+By = EC = WebDriverWait = None
 
-# Geocoding
-from geopy.geocoders import Nominatim
-from geopy.extra.rate_limiter import RateLimiter
+
+def _importar_selenium():
+    global By, EC, WebDriverWait
+    if By is None:
+        from selenium.webdriver.common.by import By as _By
+        from selenium.webdriver.support.ui import WebDriverWait as _WebDriverWait
+        from selenium.webdriver.support import expected_conditions as _EC
+        By, EC, WebDriverWait = _By, _EC, _WebDriverWait
+
+# Motor HTTP
+from rsce_http import RSCEHttp, url_desde_hoy
+
+# Scraping incremental (snapshot + delta)
+import incremental
+
+# Historial SQLite: versiones y cambios de estado de cada evento
+import historial
+
+# Reintentos con backoff, cortacircuitos y checkpoint para reanudar
+import reintentos
+
+# Salida en streaming (CSV/JSONL por página)
+import escritores
+
+# Tiempos por fase (informe JSON + textfile de Prometheus)
+import metricas
+
+# Bloqueo de imágenes, fuentes, media y rastreadores en Chrome
+import bloqueo
+
+# Extracción en el navegador (solo viajan los datos, no page_source)
+import extraccion_js
+
+# Geocoding (geopy se importa solo si hay que preguntar a Nominatim)
+from geocache import GeoCache
+import gazetteer
 
 # .env (opcional)
 try:
@@ -72,34 +109,6 @@ except Exception:
     pass
 
 
-# =========================
-# Fechas en español
-# =========================
-SPANISH_MONTHS = {
-    "enero": 1, "febrero": 2, "marzo": 3, "abril": 4, "mayo": 5, "junio": 6,
-    "julio": 7, "agosto": 8, "septiembre": 9, "setiembre": 9, "octubre": 10,
-    "noviembre": 11, "diciembre": 12
-}
-DATE_RE = re.compile(r"(\d{1,2})\s+([A-Za-záéíóúñ]+),?\s+(\d{4})")
-
-def parse_spanish_date(txt: str) -> Optional[datetime.date]:
-    if not txt:
-        return None
-    t = txt.strip().lower().replace(" de ", " ")
-    m = DATE_RE.search(t)
-    if not m:
-        return None
-    try:
-        d, mm, y = int(m.group(1)), m.group(2), int(m.group(3))
-        mnum = SPANISH_MONTHS.get(mm)
-        return datetime.date(y, mnum, d) if mnum else None
-    except Exception:
-        return None
-
-def parse_date_range(inicio: str, fin: str) -> Tuple[Optional[datetime.date], Optional[datetime.date]]:
-    return parse_spanish_date(inicio), parse_spanish_date(fin)
-
-
 # =========================
 # Scraper principal
 # =========================
@@ -118,6 +127,38 @@ class RSCEAgilityCSV:
         self.APLICAR_FILTRO_UI  = self._to_bool(os.getenv("APLICAR_FILTRO_UI"), True)   # pone "Desde=hoy" en la web
         self.FILTRAR_DESDE_HOY  = self._to_bool(os.getenv("FILTRAR_DESDE_HOY"), True)   # segunda capa de filtro
         self.GEOCODIFICAR       = self._to_bool(os.getenv("GEOCODIFICAR"), True)        # puedes apagarlo para pruebas
+        self.GUARDAR_HTML       = self._to_bool(os.getenv("GUARDAR_HTML"), False)       # HTML de cada página para replay.py
+        self.MOTOR              = os.getenv("MOTOR", "auto").strip().lower()            # http | selenium | auto
+        self.WORKERS            = max(1, int(os.getenv("WORKERS", "1")))                 # páginas en paralelo
+        self.INCREMENTAL        = self._to_bool(os.getenv("INCREMENTAL"), False)        # parar al llegar a eventos ya conocidos
+        self.INCREMENTAL_RUN    = int(os.getenv("INCREMENTAL_RUN", "20"))                # racha de conocidos sin cambios para parar
+        self.INCREMENTAL_COMPLETA = int(os.getenv("INCREMENTAL_COMPLETA", "7"))          # pasada completa cada N (listado por fecha, no por alta)
+        self.SNAPSHOT           = os.path.join(self.OUTDIR, "snapshot_rsce.json")
+        self.REINTENTOS         = max(0, int(os.getenv("REINTENTOS", "3")))             # reintentos por página
+        self.REINTENTO_BASE_S   = float(os.getenv("REINTENTO_BASE_S", "2"))             # espera antes del 1er reintento (se duplica)
+        self.CIRCUITO_FALLOS    = max(1, int(os.getenv("CIRCUITO_FALLOS", "3")))         # páginas fallidas seguidas para abortar
+        self.REANUDAR           = self._to_bool(os.getenv("REANUDAR"), True)           # checkpoint de páginas y geocoding
+        self.CHECKPOINT         = os.path.join(self.OUTDIR, "checkpoint_rsce.jsonl")
+        self.CHECKPOINT_HORAS   = float(os.getenv("CHECKPOINT_HORAS", "36"))            # más viejo se descarta (cubre la noche siguiente)
+        self.DELTA              = os.path.splitext(self.OUTCSV)[0] + ".delta.json"
+        self.JSONL              = self._to_bool(os.getenv("JSONL"), True)              # además del CSV, <csv>.jsonl por página
+        self.PARQUET            = self._to_bool(os.getenv("PARQUET"), False)           # además, dataset <csv>.parquet/mes=AAAA-MM (columnar.py)
+        self.HISTORIAL          = self._to_bool(os.getenv("HISTORIAL"), True)          # cambios por evento en HISTORIAL_PATH (historial.py)
+        self.HISTORIAL_PATH     = os.getenv("HISTORIAL_PATH", historial.RUTA)
+        self.METRICAS           = self._to_bool(os.getenv("METRICAS"), True)           # metricas_rsce.json + agileventos_rsce.prom
+        self.METRICAS_PROM_DIR  = os.getenv("METRICAS_PROM_DIR") or self.OUTDIR         # textfile collector de node_exporter
+        self.BLOQUEAR           = os.getenv("BLOQUEAR", bloqueo.POR_DEFECTO)             # categorías de recursos a no cargar ("" = todo)
+        self.EXTRACCION         = os.getenv("EXTRACCION", "js").strip().lower()         # js | python | verificar (motor Selenium)
+        self.medidor            = metricas.Medidor("rsce")
+
+        # Caché de geocoding persistente entre ejecuciones
+        self.GEOCACHE_PATH          = os.getenv("GEOCACHE_PATH", os.path.join(os.path.expanduser("~"), ".cache", "agileventos", "geocache.sqlite"))
+        self.GEOCACHE_TTL_DIAS      = float(os.getenv("GEOCACHE_TTL_DIAS", "90"))
+        self.GEOCACHE_TTL_NEG_DIAS  = float(os.getenv("GEOCACHE_TTL_NEG_DIAS", "7"))   # ciudades no encontradas
+        self.GEOCACHE_MAX           = int(os.getenv("GEOCACHE_MAX", "20000"))
+        self.GAZETTEER              = self._to_bool(os.getenv("GAZETTEER"), True)       # nomenclátor offline antes que Nominatim
+        self.NOMINATIM_URL          = os.getenv("NOMINATIM_URL", "")                    # p. ej. el geocoder de servidor_simulado.py
+        self.NOMINATIM_DELAY        = float(os.getenv("NOMINATIM_DELAY", "1"))          # s entre consultas (política de uso: 1)
 
         os.makedirs(self.OUTDIR, exist_ok=True)
 
@@ -128,13 +169,23 @@ class RSCEAgilityCSV:
         return str(v).strip().lower() in ("1", "true", "t", "yes", "y", "si", "sí")
 
     # ---------- Selenium ----------
-    def _init_driver(self):
+    def _opciones(self):
+        from selenium.webdriver.chrome.options import Options
         opts = Options()
         opts.add_argument("--headless=new")
         opts.add_argument("--disable-gpu")
         opts.add_argument("--no-sandbox")
         opts.add_argument("--window-size=1600,1000")
-        return webdriver.Chrome(service=ChromeService(ChromeDriverManager().install()), options=opts)
+        return bloqueo.preferencias(opts, self.BLOQUEAR)
+
+    def _init_driver(self):
+        """Chrome nuevo o, con NAVEGADOR_COMPARTIDO, una pestaña del navegador caliente."""
+        _importar_selenium()
+        with self.medidor.fase("arranque_navegador"):
+            d, modo = navegador.obtener(self._opciones)
+            bloqueo.aplicar(d, self.BLOQUEAR)
+        print(f"[DEBUG] Navegador {modo} listo ({navegador.resumen()})")
+        return d
 
     def _esperar_listado(self, d):
         WebDriverWait(d, 20).until(
@@ -184,31 +235,45 @@ class RSCEAgilityCSV:
         except Exception:
             return 1
 
-    def _ir_a_pagina(self, d, page_num: int) -> bool:
-        try:
-            if page_num == 1:
-                return True
-            btn = WebDriverWait(d, 5).until(
-                EC.element_to_be_clickable((
-                    By.XPATH,
-                    f"//div[contains(@class,'jet-filters-pagination__link') and normalize-space(text())='{page_num}']"
-                ))
-            )
-            d.execute_script("arguments[0].scrollIntoView({block:'center'});", btn)
-            d.execute_script("arguments[0].click();", btn)
-            self._esperar_listado(d)
-            return True
-        except Exception:
-            # Intento con "Siguiente"
+    def _clic_pagina(self, d, page_num: int):
+        btn = WebDriverWait(d, 5).until(
+            EC.element_to_be_clickable((
+                By.XPATH,
+                f"//div[contains(@class,'jet-filters-pagination__link') and normalize-space(text())='{page_num}']"
+            ))
+        )
+        d.execute_script("arguments[0].scrollIntoView({block:'center'});", btn)
+        d.execute_script("arguments[0].click();", btn)
+        self._esperar_listado(d)
+
+    def _clic_siguiente(self, d):
+        nxt = d.find_element(By.CSS_SELECTOR, ".jet-filters-pagination__link.next")
+        d.execute_script("arguments[0].scrollIntoView({block:'center'});", nxt)
+        d.execute_script("arguments[0].click();", nxt)
+        self._esperar_listado(d)
+
+    def _saltar_a_pagina(self, d, actual: int, objetivo: int) -> bool:
+        """
+        Llega de `actual` a `objetivo` aunque la paginación solo muestre unos
+        pocos números: salta al mayor número visible <= objetivo, o 'Siguiente'.
+        """
+        while actual < objetivo:
+            nums = d.execute_script("""
+                return [...document.querySelectorAll('.jet-filters-pagination__link')]
+                  .map(e => e.textContent.trim()).filter(t => /^\\d+$/.test(t)).map(Number);
+            """) or []
+            candidatos = [n for n in nums if actual < n <= objetivo]
             try:
-                nxt = d.find_element(By.CSS_SELECTOR, ".jet-filters-pagination__link.next")
-                d.execute_script("arguments[0].scrollIntoView({block:'center'});", nxt)
-                d.execute_script("arguments[0].click();", nxt)
-                self._esperar_listado(d)
-                return True
+                if candidatos:
+                    actual = max(candidatos)
+                    self._clic_pagina(d, actual)
+                else:
+                    self._clic_siguiente(d)
+                    actual += 1
             except Exception:
-                print("    ⚠️ Paginación no disponible o fin de páginas.")
+                print(f"    ⚠️ No se pudo llegar a la página {objetivo}")
                 return False
+        return True
 
     # ---------- Extracción ----------
     def _extraer_eventos(self, html: str) -> List[Tuple[str, str, str, str, str, str]]:
@@ -216,6 +281,7 @@ class RSCEAgilityCSV:
         Devuelve lista de tuplas:
         (nombre, inicio, fin, url, ciudad, estado)  con estado='Anulado' o 'Activo'
         """
+        from bs4 import BeautifulSoup
         soup = BeautifulSoup(html, "html.parser")
         bloques = soup.select("div.jet-listing-grid__item")
         eventos = []
@@ -231,113 +297,537 @@ class RSCEAgilityCSV:
             fin    = fechas[1].get_text(strip=True) if len(fechas) > 1 else ""
             lugar  = b.select_one(".elementor-icon-box-title span")
             ciudad = lugar.get_text(strip=True) if lugar else ""
-            # estado (anulado)
             badge  = b.select_one("span.jet-listing-dynamic-terms__link")
-            estado = "Anulado" if (badge and "anulado" in badge.get_text(strip=True).lower()) else "Activo"
-            if nombre or url:
-                eventos.append((nombre, inicio, fin, url, ciudad, estado))
+            ev = self._evento(nombre, url, inicio, fin, ciudad, badge.get_text(strip=True) if badge else None)
+            if ev:
+                eventos.append(ev)
         # debug corto
         print("      Ejemplos:", [f"{e[5]} · {e[0][:48]}" for e in eventos[:3]])
         return eventos
 
+    @staticmethod
+    def _evento(nombre, url, inicio, fin, ciudad, badge):
+        """Tupla final a partir de los campos de un item (parser Python o extraccion_js.RSCE_JS)."""
+        # estado (anulado)
+        estado = "Anulado" if (badge and "anulado" in badge.lower()) else "Activo"
+        if nombre or url:
+            return (nombre, inicio, fin, url, ciudad, estado)
+        return None
+
+    def _extraer_eventos_js(self, d):
+        """Extracción dentro del navegador: solo cruzan los campos por WebDriver."""
+        eventos = [ev for ev in (self._evento(*fila) for fila in d.execute_script(extraccion_js.RSCE_JS) or []) if ev]
+        if self.EXTRACCION == "verificar":
+            for diff in extraccion_js.diferencias(eventos, self._extraer_eventos(d.page_source)):
+                print(f"[WARN] Extracción JS != Python: {diff}")
+        return eventos
+
+    def _contenido(self, d):
+        """Lo que entregan los motores Selenium por página: HTML (modo python) o ya la lista de eventos."""
+        if self.EXTRACCION == "python" or self.GUARDAR_HTML:
+            return d.page_source
+        return self._extraer_eventos_js(d)
+
     # ---------- Filtros ----------
+    @staticmethod
+    def _fechas(eventos):
+        """DataFrame(inicio, fin) datetime64 de un lote de eventos (fechas.py, vectorizado)."""
+        import fechas
+        return fechas.parsear_par([e[1] for e in eventos], [e[2] for e in eventos])
+
     def _filtrar_eventos(self, eventos):
         """
         1) Excluye ANULADOS
         2) (opcional) Filtra por fecha: fin >= hoy, o inicio >= hoy si no hay fin.
            Si ninguna de las dos fechas se puede parsear -> conservamos.
+        Ambas condiciones se evalúan como máscaras sobre el lote entero.
         """
-        hoy = datetime.date.today()
-        out = []
-        for (n,i,f,u,c,estado) in eventos:
-            if estado.lower() == "anulado":
-                continue
-            if not self.FILTRAR_DESDE_HOY:
-                out.append((n,i,f,u,c,estado))
-                continue
-            di, df = parse_date_range(i, f)
-            keep = (df and df >= hoy) or (df is None and di and di >= hoy) or (di is None and df is None)
-            if keep:
-                out.append((n,i,f,u,c,estado))
-        return out
+        if not eventos:
+            return []
+        import fechas
+        keep = fechas.pd.Series([e[5] for e in eventos], dtype=object).str.lower().ne("anulado")
+        if self.FILTRAR_DESDE_HOY:
+            keep &= fechas.desde_hoy(self._fechas(eventos))
+        return [e for e, k in zip(eventos, keep) if k]
 
     # ---------- Geocoding ----------
-    def _geocode_ciudades(self, eventos):
+    def _geocode_ciudades(self, eventos, cache=None):
         """
         eventos: (n,i,f,u,c,estado) activos.
         Devuelve dict ciudad -> (lat, lon). Si GEOCODIFICAR=False, todas (None,None).
+        Orden: nomenclátor offline (GAZETTEER), caché SQLite (GEOCACHE_PATH) y,
+        solo para lo que ninguno resuelve, Nominatim.
+        Con `cache` (el dict de una llamada anterior) solo se resuelven las
+        ciudades nuevas: así se puede geocodificar página a página.
         """
-        cache = {}
+        cache = {} if cache is None else cache
         if not self.GEOCODIFICAR:
             return cache
-        geolocator = Nominatim(user_agent="agility-mapper-rsce/1.0", timeout=10)
-        geocode = RateLimiter(
-            geolocator.geocode, min_delay_seconds=1,
-            max_retries=2, error_wait_seconds=2, swallow_exceptions=True
-        )
-        for *_, c, _estado in eventos:
-            if c and c not in cache:
-                q = f"{c}, España"
-                loc = geocode(q)
-                cache[c] = (loc.latitude, loc.longitude) if loc else (None, None)
+        pendientes = {c for *_, c, _estado in eventos if c and c not in cache}
+        if not pendientes:
+            return cache
+        gaz = gazetteer.cargar() if self.GAZETTEER else None
+        locales = 0
+        geo = GeoCache(self.GEOCACHE_PATH, self.GEOCACHE_TTL_DIAS,
+                       self.GEOCACHE_TTL_NEG_DIAS, self.GEOCACHE_MAX)
+        geocode = getattr(self, "_geocode", None)
+        consultas = 0
+        try:
+            for *_, c, _estado in eventos:
+                if c and c not in cache:
+                    latlon = gaz.resolver(c) if gaz else None
+                    if latlon:
+                        cache[c] = latlon
+                        locales += 1
+                        continue
+                    q = f"{c}, España"
+                    hit, latlon = geo.get(q)
+                    if not hit:
+                        if geocode is None:
+                            from geopy.geocoders import Nominatim
+                            from geopy.extra.rate_limiter import RateLimiter
+                            extra = {}
+                            if self.NOMINATIM_URL:
+                                u = urlsplit(self.NOMINATIM_URL)
+                                extra = {"scheme": u.scheme or "https", "domain": u.netloc + u.path.rstrip("/")}
+                            geolocator = Nominatim(user_agent="agility-mapper-rsce/1.0", timeout=10, **extra)
+                            # se guarda en la instancia: el RateLimiter respeta el intervalo entre páginas
+                            geocode = self._geocode = RateLimiter(
+                                geolocator.geocode, min_delay_seconds=self.NOMINATIM_DELAY,
+                                max_retries=2, error_wait_seconds=2, swallow_exceptions=False
+                            )
+                        consultas += 1
+                        try:
+                            loc = geocode(q)
+                            latlon = (loc.latitude, loc.longitude) if loc else None
+                            geo.put(q, latlon)  # None = caché negativa
+                        except Exception as e:
+                            # error de red: no se cachea, se reintenta en la próxima ejecución
+                            print(f"[WARN] Geocoding '{q}': {e}")
+                            latlon = None
+                    cache[c] = latlon or (None, None)
+        finally:
+            geo.close()
+        print(f"🌍 Geocoding: {len(pendientes)} ciudades nuevas ({locales} nomenclátor, {geo.aciertos} en caché, {consultas} consultas a Nominatim)")
         return cache
 
     # ---------- CSV ----------
-    def _guardar_csv(self, eventos):
+    CABECERA = ["Nombre","Fecha inicio","Fecha fin","URL","Ciudad","Estado","Latitud","Longitud",
+                "fecha_inicio","fecha_fin"]
+
+    @classmethod
+    def _filas(cls, eventos, cache):
+        """Filas del CSV: texto original de las fechas y, al final, las mismas en ISO (AAAA-MM-DD)."""
+        import fechas
+        df = cls._fechas(eventos)
+        for (n,i,f,u,c,estado), fi, ff in zip(eventos, fechas.iso(df["inicio"]), fechas.iso(df["fin"])):
+            lat, lon = cache.get(c, (None, None)) if c else (None, None)
+            yield [n,i,f,u,c,estado,lat,lon,fi,ff]
+
+    def _abrir_salida(self):
         """
-        eventos: (n,i,f,u,c,estado) activos (ya filtrados)
+        CSV (.part + rename al terminar), si JSONL <csv>.jsonl legible con tail -f
+        y, si PARQUET, <csv>.parquet/ con columnas tipadas y una partición por mes.
         """
-        cache = self._geocode_ciudades(eventos)
-        with open(self.OUTCSV, "w", newline="", encoding="utf-8") as f:
-            w = csv.writer(f)
-            w.writerow(["Nombre","Fecha inicio","Fecha fin","URL","Ciudad","Estado","Latitud","Longitud"])
-            for n,i,f,u,c,estado in eventos:
-                lat, lon = cache.get(c, (None, None)) if c else (None, None)
-                w.writerow([n,i,f,u,c,estado,lat,lon])
-        print(f"📁 CSV guardado en: {self.OUTCSV} con {len(eventos)} eventos")
-
-    # ---------- Run ----------
-    def run(self):
-        print(f"[DEBUG] URL_BASE: {self.URL_BASE}")
-        print(f"[DEBUG] SOLO_PRIMERA={self.SOLO_PRIMERA} | APLICAR_FILTRO_UI={self.APLICAR_FILTRO_UI} | FILTRAR_DESDE_HOY={self.FILTRAR_DESDE_HOY} | GEOCODIFICAR={self.GEOCODIFICAR}")
+        csv_w = escritores.EscritorCSV(self.OUTCSV, self.CABECERA)
+        jsonl_w = escritores.EscritorJSONL(os.path.splitext(self.OUTCSV)[0] + ".jsonl") if self.JSONL else None
+        self._parquet = None
+        if self.PARQUET:
+            import columnar
+            self._parquet = columnar.EscritorParquet(os.path.splitext(self.OUTCSV)[0] + ".parquet",
+                                                     columnar.ESQUEMA_RSCE)
+        return escritores.Multiple(csv_w, jsonl_w, self._parquet)
+
+    def _registrar_historial(self, eventos):
+        """Eventos brutos (antes de filtrar: así quedan también los anulados) al historial."""
+        if not self._historial or not eventos:
+            return
+        import fechas
+        df = self._fechas(eventos)
+        registros = [dict(zip(self.CABECERA[:6], ev), fecha_inicio=fi, fecha_fin=ff)
+                     for ev, fi, ff in zip(eventos, fechas.iso(df["inicio"]), fechas.iso(df["fin"]))]
+        with self.medidor.fase("historial") as f:
+            try:
+                self._historial.registrar("rsce", registros)
+            except Exception as e:
+                print(f"[WARN] No se pudo actualizar el historial: {e}")
+            f.sumar(items=len(registros))
+
+    def _emitir(self, salida, eventos, cache):
+        """Filtra, geocodifica las ciudades nuevas y escribe (con flush) un lote de eventos brutos."""
+        med = self.medidor
+        with med.fase("filtro") as f:
+            activos = self._filtrar_eventos(eventos)
+            f.sumar(items=len(eventos))
+        with med.fase("geocoding") as f:
+            antes = len(cache)
+            self._geocode_ciudades(activos, cache)
+            f.sumar(items=len(cache) - antes)
+        with med.fase("escritura") as f:
+            filas = list(self._filas(activos, cache))
+            salida.escribir_todos(dict(zip(self.CABECERA, fila)) for fila in filas)
+            f.sumar(items=len(filas))
+        return len(filas)
+
+    # ---------- Motores ----------
+    @staticmethod
+    def _total_paginas_html(html: str) -> int:
+        from bs4 import BeautifulSoup
+        soup = BeautifulSoup(html, "html.parser")
+        nums = [int(t) for t in (el.get_text(strip=True) for el in soup.select(".jet-filters-pagination__link")) if t.isdigit()]
+        return max(nums) if nums else 1
 
-        d = self._init_driver()
+    # ---------- Reintentos ----------
+    def _pagina_con_reintentos(self, p: int, fn):
+        """
+        fn(intento) -> contenido de la página p, con REINTENTOS y espera exponencial.
+        Si se agotan, la página queda en _fallidas (la próxima ejecución la
+        reintenta desde el checkpoint) y devuelve None; tras CIRCUITO_FALLOS
+        páginas fallidas seguidas lanza CircuitoAbierto.
+        """
+        self._circuito.permitir()
+        try:
+            r = self._politica.ejecutar(fn, f"página {p}")
+        except reintentos.CircuitoAbierto:
+            raise
+        except Exception as e:
+            self._fallidas.add(p)
+            self._circuito.fallo()
+            print(f"    ⚠️ Página {p} descartada tras {self.REINTENTOS} reintentos: {e}")
+            if self._circuito.abierto:
+                raise reintentos.CircuitoAbierto(f"{self._circuito.fallos} páginas fallidas seguidas") from e
+            return None
+        self._fallidas.discard(p)
+        self._circuito.exito()
+        return r
+
+    def _paginas_http(self, hechas=frozenset()):
+        """Genera (num_pagina, html) pidiendo el listado y su AJAX de paginación por HTTP."""
+        url = url_desde_hoy(self.URL_BASE) if self.APLICAR_FILTRO_UI else self.URL_BASE
+        cli = RSCEHttp(url)
+        try:
+            # sin la primera página no hay total: si falla, que lo gestione _paginas (auto -> Selenium)
+            html = self._politica.ejecutar(lambda n: cli.primera_pagina(), "página 1")
+            total = cli.total_paginas() or self._total_paginas_html(html)
+            total = max(1, min(total, self.MAX_PAGINAS))
+            print(f"[DEBUG] total_pages detectadas (http): {total}")
+            if 1 not in hechas:
+                yield 1, html
+            if self.SOLO_PRIMERA:
+                return
+            resto = [p for p in range(2, total + 1) if p not in hechas]
+            descargar = lambda p: self._pagina_con_reintentos(p, lambda n: cli.pagina(p))
+            if self.WORKERS > 1:
+                # map conserva el orden de las páginas aunque se pidan en paralelo
+                with ThreadPoolExecutor(max_workers=self.WORKERS) as ex:
+                    yield from ((p, h) for p, h in zip(resto, ex.map(descargar, resto)) if h is not None)
+            else:
+                for p in resto:
+                    h = descargar(p)
+                    if h is not None:
+                        yield p, h
+        finally:
+            cli.close()
+
+    def _abrir_listado(self, d):
         d.get(self.URL_BASE)
         self._esperar_listado(d)
 
         if self.APLICAR_FILTRO_UI:
             self._aplicar_filtro_desde_hoy_ui(d)
 
-        total_pages = self._detectar_total_paginas(d)
-        pages = [1] if self.SOLO_PRIMERA else list(range(1, total_pages + 1))
+    def _visitar(self, d, p: int, posicion: list):
+        """
+        Función de intento para _pagina_con_reintentos: lleva el navegador a la
+        página p y devuelve su contenido. posicion[0] es la página en la que
+        está el navegador (None si no se sabe: se vuelve a abrir el listado).
+        """
+        def intento(n):
+            if n > 1 or posicion[0] is None:
+                # tras un fallo el listado puede haber quedado a medias
+                self._abrir_listado(d)
+                posicion[0] = 1
+            actual, posicion[0] = posicion[0], None
+            if not self._saltar_a_pagina(d, actual, p):
+                raise RuntimeError(f"no se pudo llegar a la página {p}")
+            posicion[0] = p
+            self._scroll_hasta_el_final(d)
+            return self._contenido(d)
+        return intento
 
-        eventos_totales = []
-        seen_urls = set()
+    def _paginas_selenium(self, hechas=frozenset()):
+        """Genera (num_pagina, html) navegando con Chrome por las páginas que no estén en `hechas`."""
+        d = self._init_driver()
+        try:
+            self._politica.ejecutar(lambda n: self._abrir_listado(d), "abrir listado")
+
+            total_pages = self._detectar_total_paginas(d)
+            pages = [p for p in ([1] if self.SOLO_PRIMERA else range(1, total_pages + 1)) if p not in hechas]
+
+            posicion = [1]
+            for p in pages:
+                html = self._pagina_con_reintentos(p, self._visitar(d, p, posicion))
+                if html is not None:
+                    yield p, html
+        finally:
+            red = self.medidor.extra["red"] = bloqueo.estadisticas(d)
+            if red:
+                print(f"[DEBUG] Red (listado): {bloqueo.formato(red)}")
+            navegador.liberar(d)
+
+    def _paginas_selenium_concurrente(self, hechas=frozenset()):
+        """
+        Reparte las páginas en WORKERS tramos contiguos, cada uno con su propio
+        Chrome. Los resultados se entregan en orden de página (determinista),
+        en cuanto está disponible el siguiente número.
+        """
+        d = self._init_driver()
+        drivers = [d]
+        try:
+            self._politica.ejecutar(lambda n: self._abrir_listado(d), "abrir listado")
+            total_pages = self._detectar_total_paginas(d)
+            pages = [p for p in range(1, total_pages + 1) if p not in hechas]
+            if not pages:
+                return
+            n = max(1, min(self.WORKERS, len(pages)))
+            tramos = [pages[k * len(pages) // n:(k + 1) * len(pages) // n] for k in range(n)]
+            print(f"[DEBUG] {n} workers: " + ", ".join(f"{t[0]}-{t[-1]}" for t in tramos if t))
+
+            resultados = queue.Queue()
+            FIN = object()
+
+            def trabajador(k, tramo):
+                entregadas = 0
+                try:
+                    if k == 0:
+                        drv = d
+                    else:
+                        drv = self._init_driver()
+                        drivers.append(drv)
+                        self._politica.ejecutar(lambda n: self._abrir_listado(drv), "abrir listado")
+                    posicion = [1]
+                    for p in tramo:
+                        # None = página fallida: desbloquea la entrega en orden
+                        resultados.put((p, self._pagina_con_reintentos(p, self._visitar(drv, p, posicion))))
+                        entregadas += 1
+                except Exception as e:
+                    # lo que quedaba del tramo cuenta como fallido: así no se da
+                    # la ejecución por completa ni se borra el checkpoint
+                    self._fallidas.update(tramo[entregadas:])
+                    print(f"[WARN] Worker {k} abortado: {e} (sin descargar: {tramo[entregadas:]})")
+                    if isinstance(e, reintentos.CircuitoAbierto):
+                        resultados.put(e)
+                finally:
+                    resultados.put(FIN)
+
+            hilos = [threading.Thread(target=trabajador, args=(k, t), daemon=True) for k, t in enumerate(tramos)]
+            for h in hilos:
+                h.start()
+
+            pendientes = {}
+            k = 0
+            vivos = len(hilos)
+            while vivos:
+                item = resultados.get()
+                if item is FIN:
+                    vivos -= 1
+                    continue
+                if isinstance(item, reintentos.CircuitoAbierto):
+                    raise item
+                p, html = item
+                pendientes[p] = html
+                while k < len(pages) and pages[k] in pendientes:
+                    html = pendientes.pop(pages[k])
+                    if html is not None:
+                        yield pages[k], html
+                    k += 1
+            # páginas tras un hueco (un worker abortado): se entregan igualmente en orden
+            for p in sorted(pendientes):
+                if pendientes[p] is not None:
+                    yield p, pendientes[p]
+        finally:
+            for drv in drivers:
+                try:
+                    navegador.liberar(drv)
+                except Exception:
+                    pass
+
+    def _paginas(self, hechas=frozenset()):
+        """
+        MOTOR=http|selenium|auto. En 'auto' se usa HTTP y, si falla (primera
+        página o cortacircuitos), Selenium sigue con las páginas que falten.
+        Las páginas de `hechas` (checkpoint) no se vuelven a descargar.
+        """
+        hechas = set(hechas)
+        if self.MOTOR in ("http", "auto"):
+            try:
+                for p, html in self._paginas_http(hechas):
+                    hechas.add(p)
+                    yield p, html
+                if self.MOTOR == "http" or not self._fallidas:
+                    return
+                print(f"[WARN] Motor HTTP sin las páginas {sorted(self._fallidas)} -> las intento con Selenium")
+            except Exception as e:
+                if self.MOTOR == "http":
+                    raise
+                print(f"[WARN] Motor HTTP falló: {e} -> sigo con Selenium")
+            self._circuito.exito()
+        if self.WORKERS > 1 and not self.SOLO_PRIMERA:
+            yield from self._paginas_selenium_concurrente(hechas)
+        else:
+            yield from self._paginas_selenium(hechas)
 
-        for p in pages:
-            ok = self._ir_a_pagina(d, p)
-            if not ok:
-                break
-            self._scroll_hasta_el_final(d)
-            eventos = self._extraer_eventos(d.page_source)
-
-            nuevos = 0
-            for ev in eventos:
-                url = ev[3]  # URL está en posición 3
-                if url and url not in seen_urls:
-                    eventos_totales.append(ev)
-                    seen_urls.add(url)
-                    nuevos += 1
-            print(f"    ➕ {nuevos} nuevos en página {p}")
-
-        d.quit()
-        print(f"🔍 Total brutos: {len(eventos_totales)}")
+    # ---------- Run ----------
+    def run(self) -> bool:
+        """Devuelve False si el scraping falló o quedaron páginas sin descargar (para planificador.py)."""
+        self.medidor = med = metricas.Medidor("rsce")
+        self._historial = None
+        try:
+            self._run()
+            if self._fallidas:
+                med.ok = False
+        except BaseException:
+            med.ok = False
+            raise
+        finally:
+            if self._historial:
+                self._historial.close()
+            self._guardar_metricas()
+        return med.ok
+
+    def _guardar_metricas(self):
+        if not self.METRICAS:
+            return
+        try:
+            self.medidor.extra.update(navegador.TIEMPOS)
+            self.medidor.guardar(self.OUTDIR, self.METRICAS_PROM_DIR)
+            print(f"[DEBUG] Tiempos: {self.medidor.resumen()}")
+        except Exception as e:
+            print(f"[WARN] No se pudieron guardar las métricas: {e}")
 
-        # Filtros: quitar anulados + (opcional) fecha desde hoy
-        eventos_final = self._filtrar_eventos(eventos_totales)
-        print(f"🔍 Tras filtros (estado/fecha): {len(eventos_final)}")
+    def _run(self):
+        print(f"[DEBUG] URL_BASE: {self.URL_BASE}")
+        print(f"[DEBUG] MOTOR={self.MOTOR} | WORKERS={self.WORKERS} | SOLO_PRIMERA={self.SOLO_PRIMERA} | APLICAR_FILTRO_UI={self.APLICAR_FILTRO_UI} | FILTRAR_DESDE_HOY={self.FILTRAR_DESDE_HOY} | GEOCODIFICAR={self.GEOCODIFICAR}")
 
-        self._guardar_csv(eventos_final)
+        eventos_totales = []
+        seen_urls = set()
+        self._politica = reintentos.Politica(self.REINTENTOS + 1, self.REINTENTO_BASE_S)
+        self._circuito = reintentos.Circuito(self.CIRCUITO_FALLOS, nombre="rsce")
+        self._fallidas = set()
+        ckpt = None
+        if self.REANUDAR:
+            firma = {"url": self.URL_BASE, "filtro_ui": self.APLICAR_FILTRO_UI, "solo_primera": self.SOLO_PRIMERA,
+                     "max_paginas": self.MAX_PAGINAS}
+            ckpt = reintentos.Checkpoint(self.CHECKPOINT, firma, self.CHECKPOINT_HORAS * 3600)
+            if ckpt.reanudado:
+                print(f"[DEBUG] Reanudando desde el checkpoint: {ckpt.resumen()}")
+        if self.HISTORIAL:
+            try:
+                self._historial = historial.Historial(self.HISTORIAL_PATH)
+            except Exception as e:
+                print(f"[WARN] Historial desactivado: {e}")
+
+        clave = lambda ev: ev[3]  # URL
+        snapshot = detector = None
+        if self.INCREMENTAL:
+            snapshot = incremental.cargar_snapshot(self.SNAPSHOT, clave, convertir=tuple)
+            print(f"[DEBUG] Incremental: {len(snapshot)} eventos en el snapshot anterior")
+            if incremental.toca_completa(self.SNAPSHOT, self.INCREMENTAL_COMPLETA):
+                print(f"[DEBUG] Incremental: toca pasada completa (cada {self.INCREMENTAL_COMPLETA} ejecuciones)")
+            else:
+                detector = incremental.Detector(snapshot, clave, self.INCREMENTAL_RUN)
+
+        # Cada página se filtra (anulados + fecha), se geocodifica y se escribe
+        # en cuanto llega: si algo falla a mitad, el .part conserva lo extraído
+        # y el checkpoint permite seguir en la próxima ejecución
+        cache = {c: tuple(v) for c, v in ckpt.datos.get("geocodes", {}).items()} if ckpt else {}
+        anotadas = set(cache)
+        escritos = 0
+        try:
+            escritos = self._recorrer(ckpt, cache, anotadas, eventos_totales, seen_urls, clave, snapshot, detector)
+            if ckpt and not self._fallidas:
+                ckpt.terminar()
+        finally:
+            if ckpt:
+                ckpt.cerrar()
+
+        if self._fallidas:
+            print(f"[WARN] Páginas sin descargar: {sorted(self._fallidas)}; "
+                  f"vuelve a ejecutar para completarlas (checkpoint: {self.CHECKPOINT})")
+        print(f"🔍 Total brutos: {len(eventos_totales)}")
+        print(f"🔍 Tras filtros (estado/fecha): {escritos}")
+        print(f"📁 CSV guardado en: {self.OUTCSV} con {escritos} eventos")
+        if self._historial:
+            print(f"🗂️ Historial ({self._historial.resumen('rsce')}): {self.HISTORIAL_PATH}")
+        if self._parquet:
+            import columnar
+            print(f"📁 Parquet guardado en: {self._parquet.path} ({columnar.formato(self._parquet.stats)})")
+
+    def _recorrer(self, ckpt, cache, anotadas, eventos_totales, seen_urls, clave, snapshot, detector) -> int:
+        """Páginas del checkpoint + páginas nuevas -> salida. Devuelve los eventos escritos."""
+        med = self.medidor
+        escritos = 0
+
+        def anotar_geocodes():
+            # solo las resueltas: las fallidas se vuelven a intentar al reanudar
+            nuevas = {c: v for c, v in cache.items() if c not in anotadas and v[0] is not None}
+            ckpt.anotar("geocodes", nuevas)
+            anotadas.update(nuevas)
+
+        with self._abrir_salida() as salida:
+            if ckpt and ckpt.paginas:
+                # lo ya descargado en la ejecución anterior: sin red (geocodes también del checkpoint)
+                previos = []
+                for ev in map(tuple, ckpt.eventos()):
+                    if ev[3] and ev[3] not in seen_urls:
+                        previos.append(ev)
+                        seen_urls.add(ev[3])
+                eventos_totales.extend(previos)
+                escritos += self._emitir(salida, previos, cache)
+                anotar_geocodes()
+                print(f"    ♻️ {len(previos)} eventos de {len(ckpt.paginas)} páginas del checkpoint")
+            for p, html in med.iterar("descarga", self._paginas(ckpt.hechas if ckpt else ()),
+                                      bytes_de=lambda x: len(x[1]) if isinstance(x[1], str) else 0):
+                if isinstance(html, list):
+                    # motor Selenium con EXTRACCION=js: la página ya viene extraída
+                    eventos = html
+                    print("      Ejemplos:", [f"{e[5]} · {e[0][:48]}" for e in eventos[:3]])
+                else:
+                    if self.GUARDAR_HTML:
+                        with open(os.path.join(self.OUTDIR, f"pagina_{p}.html"), "w", encoding="utf-8") as f:
+                            f.write(html)
+                    with med.fase("parseo") as f:
+                        eventos = self._extraer_eventos(html)
+                        f.sumar(items=len(eventos), bytes=len(html))
+
+                nuevos = []
+                for ev in eventos:
+                    url = ev[3]  # URL está en posición 3
+                    if url and url not in seen_urls:
+                        nuevos.append(ev)
+                        seen_urls.add(url)
+                eventos_totales.extend(nuevos)
+                self._registrar_historial(nuevos)
+                escritos += self._emitir(salida, nuevos, cache)
+                if ckpt:
+                    anotar_geocodes()
+                    ckpt.pagina(p, eventos)
+                print(f"    ➕ {len(nuevos)} nuevos en página {p}")
+                if detector and detector.ver_todos(eventos):
+                    print(f"[DEBUG] {detector.racha} eventos seguidos ya conocidos -> paro en página {p}")
+                    break
+
+            if self.INCREMENTAL:
+                vistos = len(eventos_totales)
+                parcial = bool(detector and detector.parar) or bool(self._fallidas)
+                eventos_totales[:] = incremental.fusionar(snapshot, eventos_totales, clave, parcial)
+                escritos += self._emitir(salida, eventos_totales[vistos:], cache)
+                delta = incremental.calcular_delta(snapshot, eventos_totales, clave)
+                incremental.guardar_json(self.SNAPSHOT, eventos_totales)
+                incremental.anotar_pasada(self.SNAPSHOT, not parcial)
+                incremental.guardar_json(self.DELTA, delta)
+                print(f"📁 Delta ({incremental.resumen(delta)}) guardado en: {self.DELTA}")
+        return escritos
 
 
 if __name__ == "__main__":
@@ -0,0 +1,387 @@
+# -*- coding: utf-8 -*-
+"""
+API JSON local de consulta por radio y fechas sobre el calendario unificado
+(fusion.py): "eventos a menos de X km de mí en las próximas N semanas".
+
+Índices en memoria:
+- Espacial: rejilla de celdas de CELDA_GRADOS (~11 km); una consulta por
+  radio solo recorre las celdas que toca el círculo y filtra por haversine.
+- Fechas: lista ordenada por fecha de inicio (bisect) para la ventana.
+- Cada consulta empieza por el índice que deja menos candidatos.
+- Recarga incremental: si el fichero de origen cambia (mtime/tamaño) se
+  vuelve a leer y solo se sacan/meten en los índices los eventos nuevos,
+  cambiados o desaparecidos (comparando una huella por id).
+
+Rutas:
+  GET  /eventos?lat=40.4&lon=-3.7&radio_km=50&semanas=4
+  GET  /eventos?desde=2025-07-01&hasta=2025-07-31&provincia=Madrid&limite=100
+  GET  /estado
+  POST /recargar
+
+Uso:
+  python api_eventos.py --calendario output/calendario_unificado.json --puerto 8765
+  python api_eventos.py --flow output/competiciones_agility.json \\
+                        --rsce resultados_agility/eventos_agility_2025.csv
+"""
+
+import os, sys, json, math, time, bisect, hashlib, argparse, datetime, threading
+from collections import defaultdict
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import urlsplit, parse_qs
+
+CELDA_GRADOS = 0.1
+RADIO_TIERRA_KM = 6371.0
+LIMITE = 500
+RADIO_MAX_KM = math.pi * RADIO_TIERRA_KM   # media vuelta: cubre toda la Tierra
+COMPROBAR_CADA = 1.0     # s entre comprobaciones del fichero de origen
+
+
+def haversine_km(lat1, lon1, lat2, lon2) -> float:
+    p1, p2 = math.radians(lat1), math.radians(lat2)
+    dp, dl = p2 - p1, math.radians(lon2 - lon1)
+    a = math.sin(dp / 2) ** 2 + math.cos(p1) * math.cos(p2) * math.sin(dl / 2) ** 2
+    return 2 * RADIO_TIERRA_KM * math.asin(math.sqrt(a))
+
+
+def _celda(lat: float, lon: float) -> Tuple[int, int]:
+    return math.floor(lat / CELDA_GRADOS), math.floor(lon / CELDA_GRADOS)
+
+
+def _dia(iso: Optional[str]) -> Optional[int]:
+    try:
+        return datetime.date.fromisoformat(iso[:10]).toordinal() if iso else None
+    except ValueError:
+        return None
+
+
+def _huella(e: dict) -> str:
+    return hashlib.sha1(json.dumps(e, sort_keys=True, ensure_ascii=False, default=str).encode("utf-8")).hexdigest()
+
+
+# =========================
+# Índice
+# =========================
+class IndiceEventos:
+    """Rejilla espacial + lista ordenada por fecha, actualizables por id."""
+
+    def __init__(self):
+        self.eventos: Dict[str, dict] = {}
+        self.huellas: Dict[str, str] = {}
+        self.rejilla = defaultdict(set)                 # celda -> ids
+        self.por_fecha: List[Tuple[int, str]] = []      # (día de inicio, id) ordenado
+        self.sin_fecha = set()
+        self._info: Dict[str, Tuple] = {}               # id -> (celda, día inicio, día fin, lat, lon)
+        self.lock = threading.RLock()
+
+    def __len__(self):
+        return len(self.eventos)
+
+    # ---------- mantenimiento ----------
+    def _meter(self, id_: str, e: dict):
+        try:
+            lat, lon = float(e["lat"]), float(e["lon"])
+        except (KeyError, TypeError, ValueError):
+            lat = lon = None
+        celda = _celda(lat, lon) if lat is not None else None
+        ini = _dia(e.get("fecha_inicio"))
+        fin = _dia(e.get("fecha_fin")) or ini
+        if celda is not None:
+            self.rejilla[celda].add(id_)
+        if ini is None:
+            self.sin_fecha.add(id_)
+        else:
+            bisect.insort(self.por_fecha, (ini, id_))
+        self.eventos[id_] = e
+        self._info[id_] = (celda, ini, fin, lat, lon)
+
+    def _sacar(self, id_: str):
+        celda, ini, _, _, _ = self._info.pop(id_)
+        self.eventos.pop(id_)
+        if celda is not None:
+            self.rejilla[celda].discard(id_)
+            if not self.rejilla[celda]:
+                del self.rejilla[celda]
+        if ini is None:
+            self.sin_fecha.discard(id_)
+        else:
+            i = bisect.bisect_left(self.por_fecha, (ini, id_))
+            del self.por_fecha[i]
+
+    def actualizar(self, eventos: List[dict]) -> Dict[str, int]:
+        """Sincroniza el índice con la lista completa tocando solo lo que cambió."""
+        nuevos, duplicados = {}, 0
+        for e in eventos:
+            id_ = str(e.get("id") or _huella(e)[:16])
+            if id_ in nuevos:
+                # id repetido: se conservan los dos con un sufijo en vez de pisar el primero
+                duplicados += 1
+                n = 2
+                while f"{id_}~{n}" in nuevos:
+                    n += 1
+                id_ = f"{id_}~{n}"
+            nuevos[id_] = (e, _huella(e))
+        if duplicados:
+            print(f"[WARN] {duplicados} eventos con id repetido (indexados con sufijo ~n)")
+        cambios = {"nuevos": 0, "cambiados": 0, "borrados": 0, "duplicados": duplicados}
+        with self.lock:
+            for id_ in [i for i in self.eventos if i not in nuevos]:
+                self._sacar(id_)
+                self.huellas.pop(id_, None)
+                cambios["borrados"] += 1
+            for id_, (e, h) in nuevos.items():
+                previa = self.huellas.get(id_)
+                if previa == h:
+                    continue
+                if previa is not None:
+                    self._sacar(id_)
+                    cambios["cambiados"] += 1
+                else:
+                    cambios["nuevos"] += 1
+                self._meter(id_, e)
+                self.huellas[id_] = h
+        return cambios
+
+    # ---------- consultas ----------
+    def _celdas(self, lat, lon, radio_km):
+        """Celdas ocupadas dentro del recuadro del círculo."""
+        dlat = radio_km / 111.32
+        dlon = radio_km / (111.32 * max(math.cos(math.radians(lat)), 0.01))
+        (f0, c0), (f1, c1) = _celda(lat - dlat, lon - dlon), _celda(lat + dlat, lon + dlon)
+        # radios grandes o cerca de los polos: el recuadro tiene más celdas que
+        # eventos hay; se filtran las ocupadas en vez de enumerarlo
+        if (f1 - f0 + 1) * (c1 - c0 + 1) > len(self.rejilla):
+            return [(f, c) for f, c in self.rejilla if f0 <= f <= f1 and c0 <= c <= c1]
+        return [c for c in ((f, c) for f in range(f0, f1 + 1) for c in range(c0, c1 + 1)) if c in self.rejilla]
+
+    def _rango_fechas(self, desde: Optional[int], hasta: Optional[int]):
+        # un evento que empezó antes de `desde` puede seguir en curso: margen de 31 días
+        i = bisect.bisect_left(self.por_fecha, (desde - 31, "")) if desde is not None else 0
+        j = bisect.bisect_right(self.por_fecha, (hasta, "\uffff")) if hasta is not None else len(self.por_fecha)
+        return i, j
+
+    def buscar(self, lat=None, lon=None, radio_km=None, desde=None, hasta=None,
+               provincia=None, limite=LIMITE) -> Tuple[int, List[dict]]:
+        """(total, eventos) ordenados por fecha y distancia; desde/hasta en ISO."""
+        d0, d1 = _dia(desde), _dia(hasta)
+        geo = lat is not None and lon is not None and radio_km is not None
+        with self.lock:
+            if geo:
+                celdas = self._celdas(lat, lon, radio_km)
+                n_geo = sum(len(self.rejilla[c]) for c in celdas)
+            if d0 is not None or d1 is not None:
+                i, j = self._rango_fechas(d0, d1)
+                n_fechas = j - i
+            else:
+                n_fechas = None
+            # el índice más selectivo genera los candidatos, el otro se comprueba evento a evento
+            if geo and (n_fechas is None or n_geo <= n_fechas):
+                candidatos = (id_ for c in celdas for id_ in self.rejilla[c])
+            elif n_fechas is not None:
+                candidatos = (id_ for _, id_ in self.por_fecha[i:j])
+            else:
+                candidatos = iter(self.eventos)
+            prov = provincia.lower() if provincia else None
+            res = []
+            for id_ in candidatos:
+                _, ini, fin, elat, elon = self._info[id_]
+                if d0 is not None and (fin is None or fin < d0):
+                    continue
+                if d1 is not None and (ini is None or ini > d1):
+                    continue
+                e = self.eventos[id_]
+                if prov and (e.get("provincia") or "").lower() != prov:
+                    continue
+                dist = None
+                if geo:
+                    if elat is None:
+                        continue
+                    dist = haversine_km(lat, lon, elat, elon)
+                    if dist > radio_km:
+                        continue
+                res.append((ini if ini is not None else math.inf, dist or 0.0, id_, dist))
+        res.sort()
+        salida = []
+        for _, _, id_, dist in res[:limite]:
+            e = dict(self.eventos[id_])
+            if dist is not None:
+                e["distancia_km"] = round(dist, 2)
+            salida.append(e)
+        return len(res), salida
+
+
+# =========================
+# Origen de datos
+# =========================
+class Origen:
+    """Ficheros de los que sale el calendario; sabe si han cambiado desde la última lectura."""
+
+    def __init__(self, calendario: Optional[str] = None, flow: Optional[str] = None, rsce: Optional[str] = None):
+        self.calendario, self.flow, self.rsce = calendario, flow, rsce
+        self.firma = None
+
+    def _ficheros(self):
+        return [p for p in (self.calendario, self.flow, self.rsce) if p]
+
+    def _firma_actual(self):
+        firma = []
+        for p in self._ficheros():
+            try:
+                st = os.stat(p)
+                firma.append((p, st.st_mtime_ns, st.st_size))
+            except OSError:
+                firma.append((p, None, None))
+        return tuple(firma)
+
+    def cambiado(self) -> bool:
+        return self._firma_actual() != self.firma
+
+    def leer(self) -> List[dict]:
+        import fusion
+        self.firma = self._firma_actual()
+        if self.calendario:
+            return fusion.cargar(self.calendario) if os.path.exists(self.calendario) else []
+        flow = fusion.cargar(self.flow) if self.flow and os.path.exists(self.flow) else []
+        rsce = fusion.cargar(self.rsce) if self.rsce and os.path.exists(self.rsce) else []
+        return fusion.fusionar(flow, rsce)[0] if flow or rsce else []
+
+
+class Servicio:
+    """Índice + origen: recarga incremental cuando cambian los ficheros."""
+
+    def __init__(self, origen: Origen):
+        self.origen = origen
+        self.indice = IndiceEventos()
+        self.ultima_comprobacion = 0.0
+        self.ultima_recarga: Optional[dict] = None
+        self._recargando = threading.Lock()
+
+    def recargar(self, forzar=False) -> Optional[dict]:
+        with self._recargando:
+            if not forzar and not self.origen.cambiado():
+                return None
+            t0 = time.perf_counter()
+            cambios = self.indice.actualizar(self.origen.leer())
+            cambios["segundos"] = round(time.perf_counter() - t0, 3)
+            cambios["hora"] = datetime.datetime.now().isoformat(timespec="seconds")
+            self.ultima_recarga = cambios
+            print(f"[DEBUG] Índice actualizado: {cambios}")
+            return cambios
+
+    def comprobar(self):
+        # como mucho una vez por segundo: un stat por fichero
+        ahora = time.monotonic()
+        if ahora - self.ultima_comprobacion >= COMPROBAR_CADA:
+            self.ultima_comprobacion = ahora
+            self.recargar()
+
+
+# =========================
+# HTTP
+# =========================
+def _num(q, k):
+    return float(q[k]) if q.get(k) not in (None, "") else None
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+
+    def log_message(self, *a):
+        pass
+
+    @property
+    def servicio(self) -> Servicio:
+        return self.server.servicio
+
+    def _json(self, obj, estado=200):
+        b = json.dumps(obj, ensure_ascii=False).encode("utf-8")
+        self.send_response(estado)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(b)))
+        self.send_header("Access-Control-Allow-Origin", "*")
+        self.end_headers()
+        self.wfile.write(b)
+
+    def do_GET(self):
+        u = urlsplit(self.path)
+        q = {k: v[0] for k, v in parse_qs(u.query).items()}
+        self.servicio.comprobar()
+        if u.path == "/eventos":
+            return self._eventos(q)
+        if u.path == "/estado":
+            s = self.servicio
+            return self._json({"eventos": len(s.indice), "celdas": len(s.indice.rejilla),
+                               "ultima_recarga": s.ultima_recarga})
+        self._json({"error": "ruta desconocida"}, 404)
+
+    def do_POST(self):
+        n = int(self.headers.get("Content-Length") or 0)
+        if n:
+            self.rfile.read(n)
+        if urlsplit(self.path).path == "/recargar":
+            return self._json({"cambios": self.servicio.recargar(forzar=True)})
+        self._json({"error": "ruta desconocida"}, 404)
+
+    def _eventos(self, q):
+        try:
+            lat, lon, radio = _num(q, "lat"), _num(q, "lon"), _num(q, "radio_km")
+            desde, hasta = q.get("desde"), q.get("hasta")
+            if q.get("semanas"):
+                hoy = datetime.date.fromisoformat(desde) if desde else datetime.date.today()
+                desde = hoy.isoformat()
+                hasta = (hoy + datetime.timedelta(weeks=float(q["semanas"]))).isoformat()
+            limite = int(q.get("limite") or LIMITE)
+            for f in (desde, hasta):
+                if f:
+                    datetime.date.fromisoformat(f)
+            for nombre, v, lo, hi in (("lat", lat, -90, 90), ("lon", lon, -180, 180),
+                                      ("radio_km", radio, 0, RADIO_MAX_KM)):
+                if v is not None and not (lo <= v <= hi):   # también descarta nan
+                    raise ValueError(f"{nombre} fuera de [{lo}, {hi:g}]")
+            if limite < 0:
+                raise ValueError("limite negativo")
+        except (ValueError, OverflowError) as e:
+            return self._json({"error": f"parámetro inválido: {e}"}, 400)
+        if (lat is None) != (lon is None) or (radio is not None and lat is None):
+            return self._json({"error": "lat, lon y radio_km van juntos"}, 400)
+        if lat is not None and radio is None:
+            radio = 50.0
+        t0 = time.perf_counter()
+        total, eventos = self.servicio.indice.buscar(lat, lon, radio, desde, hasta, q.get("provincia"), limite)
+        self._json({"total": total, "devueltos": len(eventos),
+                    "tiempo_ms": round((time.perf_counter() - t0) * 1000, 3), "eventos": eventos})
+
+
+def servidor(servicio: Servicio, host="127.0.0.1", puerto=8765) -> ThreadingHTTPServer:
+    httpd = ThreadingHTTPServer((host, puerto), _Handler)
+    httpd.daemon_threads = True
+    httpd.servicio = servicio
+    return httpd
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="API local de eventos por radio y fechas")
+    ap.add_argument("--calendario", help="salida de fusion.py (por defecto output/calendario_unificado.json)")
+    ap.add_argument("--flow", help="JSON de FlowAgility (se fusiona al vuelo con --rsce)")
+    ap.add_argument("--rsce", help="CSV de la RSCE")
+    ap.add_argument("--host", default="127.0.0.1")
+    ap.add_argument("--puerto", type=int, default=8765)
+    args = ap.parse_args(argv)
+    if not (args.calendario or args.flow or args.rsce):
+        args.calendario = "./output/calendario_unificado.json"
+    servicio = Servicio(Origen(args.calendario, args.flow, args.rsce))
+    servicio.recargar(forzar=True)
+    httpd = servidor(servicio, args.host, args.puerto)
+    print(f"🌐 API en http://{args.host}:{httpd.server_address[1]}/eventos ({len(servicio.indice)} eventos)")
+    try:
+        httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        httpd.server_close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
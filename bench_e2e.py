@@ -0,0 +1,153 @@
+# -*- coding: utf-8 -*-
+"""
+Benchmark extremo a extremo contra servidor_simulado.py (sin tocar la red).
+
+Para cada tamaño levanta el servidor simulado con N eventos y ejecuta el
+scraper completo:
+- rsce: Calendario.py (listado + paginación + parseo + filtros + geocoding
+  contra el Nominatim simulado + escritura CSV/JSONL)
+- flow: 01_eventosprox.py (login + scroll infinito + extracción + JSON);
+  necesita Chrome, si no lo encuentra se omite
+
+Informa del tiempo de reloj, eventos/segundo, peticiones y bytes servidos,
+y las fases de metricas.py de cada ejecución.
+
+Uso:
+  python bench_e2e.py
+  python bench_e2e.py --tamanos 100 1000 10000 50000 --latencia-ms 20
+  python bench_e2e.py --fuentes rsce --motor selenium --json bench_e2e.json
+"""
+
+import os, io, csv, json, time, shutil, argparse, tempfile, contextlib
+
+import navegador
+import replay
+from servidor_simulado import Simulador
+
+TAMANOS = [100, 1000, 10000, 50000]
+
+
+@contextlib.contextmanager
+def _silencio(activo=True):
+    if not activo:
+        yield
+        return
+    with contextlib.redirect_stdout(io.StringIO()):
+        yield
+
+
+@contextlib.contextmanager
+def _entorno(**valores):
+    previo = {k: os.environ.get(k) for k in valores}
+    os.environ.update({k: str(v) for k, v in valores.items()})
+    try:
+        yield
+    finally:
+        for k, v in previo.items():
+            if v is None:
+                os.environ.pop(k, None)
+            else:
+                os.environ[k] = v
+
+
+def _fases(path):
+    try:
+        with open(path, encoding="utf-8") as f:
+            return {k: v["segundos"] for k, v in json.load(f)["fases"].items()}
+    except (OSError, ValueError, KeyError):
+        return {}
+
+
+def bench_rsce(sim: Simulador, carpeta: str, motor: str, gazetteer: bool, verbose: bool) -> dict:
+    from Calendario import RSCEAgilityCSV
+    with _entorno(URL_BASE=sim.url_rsce, MOTOR=motor, CARPETA_DESTINO=carpeta, NOMBRE_CSV="eventos.csv",
+                  MAX_PAGINAS=sim.paginas, APLICAR_FILTRO_UI=0, FILTRAR_DESDE_HOY=0, INCREMENTAL=0,
+                  GEOCODIFICAR=1, GAZETTEER=int(gazetteer), NOMINATIM_URL=sim.url, NOMINATIM_DELAY=0,
+                  GEOCACHE_PATH=os.path.join(carpeta, "geocache.sqlite"), METRICAS=1, PARQUET=0,
+                  HISTORIAL=0):   # los eventos simulados no van al historial real
+        t0 = time.perf_counter()
+        with _silencio(not verbose):
+            RSCEAgilityCSV().run()
+        segundos = time.perf_counter() - t0
+    with open(os.path.join(carpeta, "eventos.csv"), newline="", encoding="utf-8") as f:
+        filas = sum(1 for _ in csv.reader(f)) - 1
+    return {"segundos": segundos, "eventos": filas,
+            "fases": _fases(os.path.join(carpeta, "metricas_rsce.json"))}
+
+
+def bench_flow(sim: Simulador, carpeta: str, verbose: bool) -> dict:
+    flow = replay.cargar_flow()
+    flow.BASE = sim.url
+    flow.EVENTS_URL = sim.url + "/zone/events"
+    flow.OUT_DIR = carpeta
+    flow.SESSION_FILE = os.path.join(carpeta, "sesion.json")
+    flow.INCREMENTAL = flow.ENRICH = flow.SAVE_HTML = False
+    flow.HISTORY = False   # los eventos simulados no van al historial real
+    flow.METRICS = True
+    t0 = time.perf_counter()
+    with _silencio(not verbose):
+        flow.main()
+    segundos = time.perf_counter() - t0
+    try:
+        with open(os.path.join(carpeta, "competiciones_agility.json"), encoding="utf-8") as f:
+            n = len(json.load(f))
+    except (OSError, ValueError):
+        n = 0
+    return {"segundos": segundos, "eventos": n,
+            "fases": _fases(os.path.join(carpeta, "metricas_flowagility.json"))}
+
+
+def ejecutar(tamanos, fuentes, latencia_ms, por_pagina, por_lote, motor, gazetteer, verbose):
+    resultados = []
+    hay_chrome = navegador.binario_chrome() is not None or bool(os.getenv("CHROMEDRIVER_PATH"))
+    for fuente in fuentes:
+        if fuente == "flow" and not hay_chrome:
+            print("[WARN] flow omitido: no se encuentra Chrome (CHROME_BIN)")
+            continue
+        if fuente == "rsce" and motor != "http" and not hay_chrome:
+            print(f"[WARN] rsce con motor {motor} omitido: no se encuentra Chrome (CHROME_BIN)")
+            continue
+        for n in tamanos:
+            carpeta = tempfile.mkdtemp(prefix=f"bench_e2e_{fuente}_{n}_")
+            try:
+                with Simulador(n, por_pagina, por_lote, latencia_ms) as sim:
+                    if fuente == "rsce":
+                        r = bench_rsce(sim, carpeta, motor, gazetteer, verbose)
+                    else:
+                        r = bench_flow(sim, carpeta, verbose)
+                    r.update(sim.total())
+            finally:
+                shutil.rmtree(carpeta, ignore_errors=True)
+            r.update(fuente=fuente, tamano=n, eventos_s=r["eventos"] / r["segundos"] if r["segundos"] else 0.0)
+            resultados.append(r)
+            fases = ", ".join(f"{k} {v:.2f}s" for k, v in r["fases"].items())
+            print(f"{fuente:5} {n:>7} eventos: {r['segundos']:8.2f}s  {r['eventos_s']:9.0f} ev/s  "
+                  f"{r['eventos']:>7} escritos  {r['peticiones']:>6} peticiones  {r['bytes'] / 1048576:7.1f} MiB")
+            if fases:
+                print(f"      {fases}")
+    return resultados
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Benchmark extremo a extremo contra el servidor simulado")
+    ap.add_argument("--tamanos", type=int, nargs="+", default=TAMANOS)
+    ap.add_argument("--fuentes", nargs="+", choices=("rsce", "flow"), default=["rsce", "flow"])
+    ap.add_argument("--latencia-ms", type=float, default=0, help="latencia añadida a cada petición")
+    ap.add_argument("--por-pagina", type=int, default=12, help="items por página RSCE")
+    ap.add_argument("--por-lote", type=int, default=20, help="tarjetas por carga del scroll infinito")
+    ap.add_argument("--motor", default="http", choices=("http", "selenium", "auto"), help="motor de Calendario.py")
+    ap.add_argument("--gazetteer", action="store_true", help="usa el nomenclátor offline antes del geocoder")
+    ap.add_argument("--verbose", action="store_true", help="muestra la salida de los scrapers")
+    ap.add_argument("--json", help="guarda los resultados en este fichero")
+    args = ap.parse_args(argv)
+
+    resultados = ejecutar(args.tamanos, args.fuentes, args.latencia_ms, args.por_pagina,
+                          args.por_lote, args.motor, args.gazetteer, args.verbose)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(resultados, f, ensure_ascii=False, indent=2)
+        print(f"Resultados en {args.json}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,142 @@
+# -*- coding: utf-8 -*-
+"""
+Benchmark offline de los parsers (sin Chrome ni red).
+
+Mide eventos/segundo y pico de memoria de:
+- flow: extract_events de 01_eventosprox.py, con cada backend indicado
+- rsce: RSCEAgilityCSV._extraer_eventos de Calendario.py
+
+Memoria en dos columnas: "heap MB" (tracemalloc) solo ve lo que reserva
+Python; los árboles de lxml viven en memoria C (libxml2) y ahí salen casi a
+cero. "RSS MB" es lo que crece el proceso (pico de RSS de un hijo con fork que
+ejecuta el parser una vez; "-" donde no hay fork) y sí los incluye.
+
+Uso:
+  python bench_parsers.py
+  python bench_parsers.py --tamanos 10 1000 100000 --backends lxml html.parser
+  python bench_parsers.py --parsers rsce --json bench_parsers.json
+"""
+
+import io, os, gc, json, time, argparse, contextlib, tracemalloc
+
+try:
+    import resource
+except ImportError:   # Windows
+    resource = None
+
+import replay
+
+TAMANOS = [10, 100, 1000, 10000, 100000]
+
+
+def _rss() -> int:
+    with open("/proc/self/statm") as f:
+        return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+
+
+def _pico_rss(fn, html):
+    """Bytes que sube el pico de RSS al ejecutar fn(html) en un hijo (incluye memoria C), o None."""
+    if resource is None or not hasattr(os, "fork") or not os.path.exists("/proc/self/statm"):
+        return None
+    r, w = os.pipe()
+    pid = os.fork()
+    if pid == 0:
+        try:
+            os.close(r)
+            base = _rss()
+            with contextlib.redirect_stdout(io.StringIO()):
+                fn(html)
+            pico = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024   # KiB en Linux
+            os.write(w, str(max(0, pico - base)).encode())
+        finally:
+            os._exit(0)
+    os.close(w)
+    with os.fdopen(r, "rb") as f:
+        datos = f.read()
+    os.waitpid(pid, 0)
+    return int(datos) if datos else None
+
+
+def _medir(fn, html, repeticiones):
+    """Devuelve (mejor tiempo en s, nº de eventos, pico de heap Python en bytes, pico de RSS en bytes o None)."""
+    mejor, n = float("inf"), 0
+    for _ in range(repeticiones):
+        gc.collect()
+        t0 = time.perf_counter()
+        n = len(fn(html))
+        mejor = min(mejor, time.perf_counter() - t0)
+    # pasada aparte para la memoria: tracemalloc distorsiona los tiempos
+    gc.collect()
+    tracemalloc.start()
+    fn(html)
+    _, pico = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return mejor, n, pico, _pico_rss(fn, html)
+
+
+def _parser_flow(backend):
+    flow = replay.cargar_flow()
+
+    def fn(html):
+        flow.PARSER_BACKEND = backend
+        return flow.extract_events(html)
+    return fn
+
+
+def _parser_rsce():
+    rsce = replay.cargar_rsce()
+
+    def fn(html):
+        with contextlib.redirect_stdout(io.StringIO()):
+            return rsce._extraer_eventos(html)
+    return fn
+
+
+def ejecutar(parsers, tamanos, backends, repeticiones=3):
+    resultados = []
+    casos = []
+    if "flow" in parsers:
+        casos += [(f"flow[{b}]", _parser_flow(b), replay.html_flow) for b in backends]
+    if "rsce" in parsers:
+        casos.append(("rsce", _parser_rsce(), replay.html_rsce))
+
+    print(f"{'parser':<20} {'tarjetas':>9} {'eventos':>9} {'seg':>9} {'ev/s':>11} {'heap MB':>9} {'RSS MB':>9}")
+    for nombre, fn, generar in casos:
+        for n in tamanos:
+            html = generar(n)
+            # las tallas grandes son lentas: una sola repetición basta
+            reps = repeticiones if n <= 10000 else 1
+            seg, eventos, pico, rss = _medir(fn, html, reps)
+            r = {
+                "parser": nombre, "tarjetas": n, "eventos": eventos,
+                "html_bytes": len(html.encode("utf-8")), "segundos": round(seg, 6),
+                "eventos_por_segundo": round(eventos / seg, 1) if seg else None,
+                "pico_memoria_bytes": pico,     # solo heap de Python (tracemalloc)
+                "pico_rss_bytes": rss,          # incluye memoria C (libxml2)
+            }
+            resultados.append(r)
+            print(f"{nombre:<20} {n:>9} {eventos:>9} {seg:>9.3f} "
+                  f"{r['eventos_por_segundo'] or 0:>11.0f} {pico / 1e6:>9.1f} "
+                  + (f"{rss / 1e6:>9.1f}" if rss is not None else f"{'-':>9}"))
+    return resultados
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Benchmark de parsers con HTML sintético")
+    ap.add_argument("--parsers", nargs="+", choices=("flow", "rsce"), default=["flow", "rsce"])
+    ap.add_argument("--tamanos", nargs="+", type=int, default=TAMANOS)
+    ap.add_argument("--backends", nargs="+", default=["lxml", "html.parser"],
+                    help="backends de 01_eventosprox.PARSER_BACKEND a comparar")
+    ap.add_argument("--repeticiones", type=int, default=3)
+    ap.add_argument("--json", help="guarda los resultados en este fichero")
+    args = ap.parse_args(argv)
+
+    resultados = ejecutar(args.parsers, args.tamanos, args.backends, args.repeticiones)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(resultados, f, ensure_ascii=False, indent=2)
+        print(f"📁 Resultados guardados en: {args.json}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,168 @@
+# -*- coding: utf-8 -*-
+"""
+Bloqueo de recursos de red en Chrome (solo necesitamos el DOM del listado).
+
+Categorías (se combinan separadas por comas, p. ej. "imagenes,fuentes,rastreadores"):
+- imagenes, fuentes, media: por extensión, con Network.setBlockedURLs (CDP) y,
+  para imágenes, además la preferencia de contenido del perfil
+- rastreadores: analítica, publicidad y gestores de consentimiento
+- css: hojas de estilo (no va por defecto: sin CSS cambia la altura de la
+  página y con ella el scroll infinito)
+Patrones propios: BLOQUEAR_EXTRA="*cdn.ejemplo.com*,*.pdf".
+
+Las preferencias solo se aplican al lanzar Chrome; los patrones CDP se
+aplican por pestaña, así que también funcionan sobre el navegador caliente
+de navegador.py.
+
+Medición: `estadisticas(driver)` lee la Resource Timing API de la página
+(recursos, bytes transferidos, tiempos de carga); `python bloqueo.py --medir URL`
+carga la URL con y sin bloqueo y muestra los bytes ahorrados y la diferencia
+de tiempos.
+"""
+
+import os, sys, argparse
+from typing import Dict, Iterable, List
+
+POR_DEFECTO = "imagenes,fuentes,media,rastreadores"
+
+# anclado al final de la ruta (o antes de la query): "*.mov*" bloquearía www.movistar.es
+_EXT = lambda *exts: [p for e in exts for p in (f"*.{e}", f"*.{e}?*")]
+CATEGORIAS = {
+    "imagenes": _EXT("png", "jpg", "jpeg", "gif", "webp", "avif", "svg", "ico", "bmp"),
+    "fuentes":  _EXT("woff", "woff2", "ttf", "otf", "eot") + ["*fonts.googleapis.com*", "*fonts.gstatic.com*"],
+    "media":    _EXT("mp4", "webm", "ogg", "mp3", "wav", "m4a", "mov"),
+    "css":      _EXT("css"),
+    "rastreadores": [
+        "*google-analytics.com*", "*googletagmanager.com*", "*doubleclick.net*",
+        "*googlesyndication.com*", "*googleadservices.com*", "*facebook.net*",
+        "*connect.facebook.*", "*hotjar.com*", "*clarity.ms*", "*segment.io*",
+        "*cdn.segment.com*", "*sentry.io*", "*newrelic.com*", "*nr-data.net*",
+        "*cookiebot.com*", "*cookielaw.org*", "*onetrust.com*", "*didomi.io*",
+        "*usercentrics.eu*", "*quantcast*", "*cookieyes.com*", "*iubenda.com*",
+        "*gravatar.com*",
+    ],
+}
+
+_STATS_JS = """
+const nav = performance.getEntriesByType('navigation')[0];
+const res = performance.getEntriesByType('resource');
+let bytes = nav ? (nav.transferSize || 0) : 0;
+for (const r of res) bytes += r.transferSize || 0;
+return {
+  recursos: res.length,
+  bytes: bytes,
+  dom_ms: nav ? Math.round(nav.domContentLoadedEventEnd) : null,
+  carga_ms: nav ? Math.round(nav.loadEventEnd) : null
+};
+"""
+
+
+def categorias(texto: str) -> List[str]:
+    cats = [c.strip().lower() for c in (texto or "").split(",") if c.strip()]
+    desconocidas = [c for c in cats if c not in CATEGORIAS]
+    if desconocidas:
+        print(f"[WARN] Categorías de bloqueo desconocidas: {', '.join(desconocidas)}")
+    return [c for c in cats if c in CATEGORIAS]
+
+
+def patrones(cats: Iterable[str], extra: str = None) -> List[str]:
+    extra = os.getenv("BLOQUEAR_EXTRA", "") if extra is None else extra
+    out = [p for c in cats for p in CATEGORIAS[c]]
+    out += [p.strip() for p in extra.split(",") if p.strip()]
+    return out
+
+
+def preferencias(opts, texto: str):
+    """Preferencias de contenido del perfil (solo al lanzar Chrome)."""
+    cats = categorias(texto)
+    if "imagenes" in cats:
+        opts.add_experimental_option("prefs", {"profile.managed_default_content_settings.images": 2})
+    return opts
+
+
+def aplicar(driver, texto: str, extra: str = None) -> int:
+    """Activa el bloqueo CDP en la pestaña actual. Devuelve el nº de patrones."""
+    urls = patrones(categorias(texto), extra)
+    if not urls:
+        return 0
+    try:
+        driver.execute_cdp_cmd("Network.enable", {})
+        driver.execute_cdp_cmd("Network.setBlockedURLs", {"urls": urls})
+        # más entradas de Resource Timing que las 250 por defecto (scroll infinito)
+        driver.execute_cdp_cmd("Page.addScriptToEvaluateOnNewDocument",
+                               {"source": "performance.setResourceTimingBufferSize(20000);"})
+    except Exception as e:
+        print(f"[WARN] No se pudo activar el bloqueo de recursos: {e}")
+        return 0
+    return len(urls)
+
+
+def estadisticas(driver) -> Dict:
+    """Recursos, bytes transferidos y tiempos de carga del documento actual."""
+    try:
+        return driver.execute_script(_STATS_JS) or {}
+    except Exception:
+        return {}
+
+
+def formato(st: Dict) -> str:
+    if not st:
+        return "sin datos"
+    return (f"{st.get('recursos', 0)} recursos, {st.get('bytes', 0) / 1024:.0f} KiB, "
+            f"DOM {st.get('dom_ms')} ms, load {st.get('carga_ms')} ms")
+
+
+# =========================
+# CLI: comparación con y sin bloqueo
+# =========================
+def medir(url: str, texto: str = POR_DEFECTO, repeticiones: int = 2):
+    import navegador
+    from selenium.webdriver.chrome.options import Options
+
+    def opciones(bloquear):
+        opts = Options()
+        for a in ("--headless=new", "--no-sandbox", "--disable-dev-shm-usage", "--disable-gpu"):
+            opts.add_argument(a)
+        return preferencias(opts, texto) if bloquear else opts
+
+    resultados = {}
+    for bloquear in (False, True):
+        d, _ = navegador.obtener(lambda: opciones(bloquear), compartido=False)
+        try:
+            if bloquear:
+                aplicar(d, texto)
+            mejor = None
+            for _ in range(repeticiones):
+                d.execute_cdp_cmd("Network.clearBrowserCache", {})
+                d.get(url)
+                st = estadisticas(d)
+                if mejor is None or (st.get("carga_ms") or 0) < (mejor.get("carga_ms") or 0):
+                    mejor = st
+            resultados[bloquear] = mejor
+        finally:
+            navegador.liberar(d)
+    sin, con = resultados[False], resultados[True]
+    print(f"sin bloqueo: {formato(sin)}")
+    print(f"con bloqueo: {formato(con)}")
+    if sin and con:
+        print(f"ahorro: {(sin['bytes'] - con['bytes']) / 1024:.0f} KiB, "
+              f"{sin['recursos'] - con['recursos']} recursos, "
+              f"load {(sin['carga_ms'] or 0) - (con['carga_ms'] or 0)} ms")
+    return resultados
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Bloqueo de recursos de red en Chrome")
+    ap.add_argument("--medir", metavar="URL", help="carga la URL con y sin bloqueo y compara")
+    ap.add_argument("--categorias", default=os.getenv("BLOQUEAR", POR_DEFECTO))
+    ap.add_argument("--repeticiones", type=int, default=2)
+    args = ap.parse_args(argv)
+    if args.medir:
+        medir(args.medir, args.categorias, args.repeticiones)
+    else:
+        for p in patrones(categorias(args.categorias)):
+            print(p)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
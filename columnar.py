@@ -0,0 +1,232 @@
+# -*- coding: utf-8 -*-
+"""
+Salida columnar: dataset Parquet con columnas tipadas y particionado por mes.
+
+    <carpeta>/mes=2025-07/part-0.parquet
+    <carpeta>/mes=2025-08/part-0.parquet
+    <carpeta>/mes=sin_fecha/part-0.parquet
+
+- Tipos: fechas como date32, Latitud/Longitud float64, enteros como int64 y
+  las columnas de pocos valores (estado, estado_tipo, Ciudad...) como
+  diccionario (categóricas en pandas); lo anidado (detalles) va como JSON.
+- El mes sale de fecha_inicio (fechas.py); sin fecha -> "sin_fecha".
+- Lectura selectiva: `leer(carpeta, columnas=[...], meses=[...])` solo abre
+  los ficheros de esos meses y solo descomprime esas columnas.
+- Escritura atómica como escritores.py: los lotes se acumulan en memoria en
+  formato Arrow, al cerrar se escribe `<carpeta>.part` y se intercambia con
+  la carpeta final; si el scraping falla, el dataset anterior queda intacto.
+
+Uso:
+    python columnar.py output/competiciones_agility.parquet --columnas nombre,fecha_inicio --meses 2025-07
+"""
+
+import os, sys, json, shutil, argparse
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+import pyarrow as pa
+import pyarrow.dataset as ds
+
+PARTICION = "mes"
+SIN_FECHA = "sin_fecha"
+
+# tipo lógico -> tipo Arrow
+TIPOS = {
+    "texto": pa.string(),
+    "categoria": pa.dictionary(pa.int32(), pa.string()),
+    "fecha": pa.date32(),
+    "decimal": pa.float64(),
+    "entero": pa.int64(),
+    "json": pa.string(),
+}
+
+# (columna, tipo, origen): origen es la clave del registro o una ruta de claves anidadas
+ESQUEMA_FLOW = [
+    ("id", "texto", "id"),
+    ("nombre", "texto", "nombre"),
+    ("club", "texto", "club"),
+    ("organizacion", "texto", "organizacion"),
+    ("lugar", "texto", "lugar"),
+    ("fechas", "texto", "fechas"),
+    ("fecha_inicio", "fecha", "fecha_inicio"),
+    ("fecha_fin", "fecha", "fecha_fin"),
+    ("estado", "categoria", "estado"),
+    ("estado_tipo", "categoria", "estado_tipo"),
+    ("pais_bandera", "categoria", "pais_bandera"),
+    ("enlace_info", "texto", ("enlaces", "info")),
+    ("enlace_participantes", "texto", ("enlaces", "participantes")),
+    ("enlace_runs", "texto", ("enlaces", "runs")),
+    ("participantes_total", "entero", ("detalles", "participantes_total")),
+    ("detalles", "json", "detalles"),
+]
+
+ESQUEMA_RSCE = [
+    ("Nombre", "texto", "Nombre"),
+    ("Fecha inicio", "texto", "Fecha inicio"),
+    ("Fecha fin", "texto", "Fecha fin"),
+    ("URL", "texto", "URL"),
+    ("Ciudad", "categoria", "Ciudad"),
+    ("Estado", "categoria", "Estado"),
+    ("Latitud", "decimal", "Latitud"),
+    ("Longitud", "decimal", "Longitud"),
+    ("fecha_inicio", "fecha", "fecha_inicio"),
+    ("fecha_fin", "fecha", "fecha_fin"),
+]
+
+
+def _valor(registro: dict, origen):
+    if isinstance(origen, str):
+        return registro.get(origen)
+    v = registro
+    for k in origen:
+        v = v.get(k) if isinstance(v, dict) else None
+    return v
+
+
+def _columna(valores: List, tipo: str) -> pa.Array:
+    if tipo == "json":
+        valores = [None if v is None else json.dumps(v, ensure_ascii=False) for v in valores]
+    elif tipo == "fecha":
+        # ISO AAAA-MM-DD (fechas.iso); string -> date32 lo hace Arrow
+        return pa.array([v or None for v in valores], pa.string()).cast(pa.date32())
+    elif tipo == "decimal":
+        valores = [None if v in (None, "") else float(v) for v in valores]
+    elif tipo == "entero":
+        valores = [None if v in (None, "") else int(v) for v in valores]
+    elif tipo in ("texto", "categoria"):
+        valores = [None if v is None else str(v) for v in valores]
+    return pa.array(valores, TIPOS[tipo])
+
+
+def esquema_arrow(esquema: Sequence[Tuple]) -> pa.Schema:
+    return pa.schema([(c, TIPOS[t]) for c, t, _ in esquema] + [(PARTICION, pa.string())])
+
+
+def tabla(registros: Sequence[dict], esquema: Sequence[Tuple]) -> pa.Table:
+    """Registros (dicts) -> tabla Arrow tipada con la columna de partición."""
+    cols = [_columna([_valor(r, o) for r in registros], t) for _, t, o in esquema]
+    mes = [(_valor(r, "fecha_inicio") or "")[:7] or SIN_FECHA for r in registros]
+    return pa.Table.from_arrays(cols + [pa.array(mes, pa.string())], schema=esquema_arrow(esquema))
+
+
+def _particionado():
+    return ds.partitioning(pa.schema([(PARTICION, pa.string())]), flavor="hive")
+
+
+def escribir(t: pa.Table, carpeta: str) -> Dict:
+    """Escribe el dataset en <carpeta>.part y lo intercambia con <carpeta>."""
+    carpeta = os.path.abspath(carpeta)
+    tmp, viejo = carpeta + ".part", carpeta + ".old"
+    for d in (tmp, viejo):
+        shutil.rmtree(d, ignore_errors=True)
+    # ordenado por mes: un solo fichero por partición y filas contiguas
+    t = t.sort_by(PARTICION)
+    ds.write_dataset(t, tmp, format="parquet", partitioning=_particionado(),
+                     basename_template="part-{i}.parquet",
+                     file_options=ds.ParquetFileFormat().make_write_options(compression="zstd"))
+    os.makedirs(tmp, exist_ok=True)  # sin filas no se crea nada: dataset vacío
+    if os.path.exists(carpeta):
+        os.replace(carpeta, viejo)
+    os.replace(tmp, carpeta)
+    shutil.rmtree(viejo, ignore_errors=True)
+    return estadisticas(carpeta)
+
+
+def estadisticas(carpeta: str) -> Dict:
+    ficheros = [os.path.join(r, f) for r, _, fs in os.walk(carpeta) for f in fs if f.endswith(".parquet")]
+    meses = sorted({os.path.basename(os.path.dirname(f)).split("=", 1)[-1] for f in ficheros})
+    return {"ficheros": len(ficheros), "meses": meses,
+            "bytes": sum(os.path.getsize(f) for f in ficheros)}
+
+
+def leer(carpeta: str, columnas: Optional[Sequence[str]] = None,
+         meses: Optional[Iterable[str]] = None, como: str = "pandas"):
+    """
+    Lee solo las columnas y meses pedidos ("2025-07", o "2025" para todo el año).
+    como="pandas" (categóricas y fechas ya tipadas) o "arrow".
+    """
+    dataset = ds.dataset(carpeta, format="parquet", partitioning=_particionado())
+    filtro = None
+    if meses:
+        meses = list(meses)
+        exactos = [m for m in meses if len(m) != 4]
+        filtro = ds.field(PARTICION).isin(exactos) if exactos else None
+        for anio in (m for m in meses if len(m) == 4):
+            f = ds.field(PARTICION).isin([f"{anio}-{i:02d}" for i in range(1, 13)])
+            filtro = f if filtro is None else filtro | f
+    t = dataset.to_table(columns=list(columnas) if columnas else None, filter=filtro)
+    if como == "arrow":
+        return t
+    import pandas as pd
+    # fechas como datetime64 y enteros con nulos como Int64 (no float)
+    return t.to_pandas(date_as_object=False, types_mapper={pa.int64(): pd.Int64Dtype()}.get)
+
+
+class EscritorParquet:
+    """
+    Misma API que los escritores de escritores.py (escribir_todos, close,
+    abortar, with): cada lote se convierte a Arrow al llegar y el dataset se
+    escribe al cerrar.
+    """
+
+    def __init__(self, carpeta: str, esquema: Sequence[Tuple]):
+        self.path = carpeta
+        self.esquema = list(esquema)
+        self.lotes: List[pa.Table] = []
+        self.n = 0
+        self.cerrado = False
+        self.stats: Dict = {}
+
+    def escribir_todos(self, registros: Iterable[dict]):
+        registros = list(registros)
+        if registros:
+            self.lotes.append(tabla(registros, self.esquema))
+            self.n += len(registros)
+
+    def close(self):
+        if self.cerrado:
+            return
+        self.cerrado = True
+        t = pa.concat_tables(self.lotes) if self.lotes else esquema_arrow(self.esquema).empty_table()
+        # unifica los diccionarios de cada lote en uno por columna
+        self.stats = escribir(t.unify_dictionaries().combine_chunks(), self.path)
+        self.lotes = []
+
+    def abortar(self):
+        self.cerrado = True
+        self.lotes = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        else:
+            self.abortar()
+
+
+def formato(st: Dict) -> str:
+    if not st:
+        return "sin datos"
+    return f"{st['ficheros']} ficheros, {len(st['meses'])} meses, {st['bytes'] / 1024:.0f} KiB"
+
+
+# =========================
+# CLI: lectura selectiva
+# =========================
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Lee un dataset Parquet particionado por mes")
+    ap.add_argument("carpeta")
+    ap.add_argument("--columnas", help="lista separada por comas (por defecto, todas)")
+    ap.add_argument("--meses", help="p. ej. 2025-07,2025-08 o 2025")
+    args = ap.parse_args(argv)
+    cols = [c.strip() for c in args.columnas.split(",")] if args.columnas else None
+    meses = [m.strip() for m in args.meses.split(",")] if args.meses else None
+    df = leer(args.carpeta, cols, meses)
+    print(f"{formato(estadisticas(args.carpeta))}")
+    print(f"{len(df)} filas, {len(df.columns)} columnas, {df.memory_usage(deep=True).sum() / 1024:.0f} KiB en memoria")
+    print(df.head(20).to_string())
+
+
+if __name__ == "__main__":
+    sys.exit(main())
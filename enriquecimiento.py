@@ -0,0 +1,200 @@
+# -*- coding: utf-8 -*-
+"""
+Enriquecimiento de eventos de FlowAgility con sus páginas de detalle.
+
+extract_event_details deja en `enlaces` las URLs de info, participantes y
+runs de cada evento; aquí se descargan en paralelo (sin navegador):
+- requests.Session con pool de conexiones y reintentos (429/5xx con backoff)
+  que reutiliza las cookies de la sesión de Selenium ya logueada
+- ThreadPoolExecutor con `workers` descargas simultáneas como máximo
+- limitador por host: como mucho `por_segundo` peticiones/s a cada dominio
+- cada URL se descarga una sola vez aunque la compartan varios eventos
+
+Cada evento recibe un dict `detalles`:
+  {'info': {campo: valor}, 'participantes_total': n, 'runs': [{...}], 'errores': {clave: msg}}
+"""
+
+import re, time, threading, importlib.util
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Dict, List, Optional
+from urllib.parse import urlsplit
+
+from bs4 import BeautifulSoup
+
+USER_AGENT = ("Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 "
+              "(KHTML, like Gecko) Chrome/139.0.0.0 Safari/537.36")
+
+LOGIN_PATH = "/user/login"
+TOTAL_RE   = re.compile(r"(\d+)\s*(?:participantes|participants|inscritos|binomios)", re.I)
+ESPACIOS   = re.compile(r"\s+")
+
+_PARSER = "lxml" if importlib.util.find_spec("lxml") is not None else "html.parser"
+
+
+class EnriquecimientoError(Exception):
+    pass
+
+
+# =========================
+# Parsers de las páginas de detalle
+# =========================
+def _texto(el) -> str:
+    return ESPACIOS.sub(" ", el.get_text(" ", strip=True)).strip()
+
+
+def _filas(soup) -> List[Dict[str, str]]:
+    """Filas de todas las tablas como dicts cabecera -> celda (col1, col2... si no hay cabecera)."""
+    filas = []
+    for tabla in soup.find_all("table"):
+        cab = [_texto(th) for th in tabla.select("thead th")]
+        if not cab:
+            primera = tabla.find("tr")
+            if primera is not None and primera.find("td") is None:
+                cab = [_texto(th) for th in primera.find_all("th")]
+        for tr in tabla.find_all("tr"):
+            celdas = [_texto(td) for td in tr.find_all("td")]
+            if not any(celdas):
+                continue
+            nombres = cab if len(cab) == len(celdas) else [f"col{i}" for i in range(1, len(celdas) + 1)]
+            filas.append(dict(zip(nombres, celdas)))
+    return filas
+
+
+def parse_info(html: str) -> Dict[str, str]:
+    """Campos etiqueta/valor de la página de información (dl, tablas de 2 columnas, 'Etiqueta: valor')."""
+    soup = BeautifulSoup(html, _PARSER)
+    info = {}
+    h1 = soup.find("h1")
+    if h1 is not None:
+        info["titulo"] = _texto(h1)
+    for dt in soup.find_all("dt"):
+        dd = dt.find_next_sibling("dd")
+        if dd is not None:
+            info.setdefault(_texto(dt).rstrip(":"), _texto(dd))
+    for tr in soup.find_all("tr"):
+        celdas = tr.find_all(["th", "td"], recursive=False)
+        if len(celdas) == 2:
+            info.setdefault(_texto(celdas[0]).rstrip(":"), _texto(celdas[1]))
+    for el in soup.find_all(["p", "li", "div", "span"]):
+        if el.find(["p", "li", "div", "dl", "table"]) is not None:
+            continue
+        etiqueta, sep, valor = _texto(el).partition(":")
+        if sep and valor.strip() and 0 < len(etiqueta) <= 40:
+            info.setdefault(etiqueta.strip(), valor.strip())
+    return {k: v for k, v in info.items() if k}
+
+
+def parse_participantes(html: str) -> Optional[int]:
+    """Nº de participantes: el total que muestre la página o, si no, las filas del listado."""
+    soup = BeautifulSoup(html, _PARSER)
+    m = TOTAL_RE.search(_texto(soup))
+    if m:
+        return int(m.group(1))
+    filas = _filas(soup)
+    if filas:
+        return len(filas)
+    return None
+
+
+def parse_runs(html: str) -> List[Dict[str, str]]:
+    """Mangas/runs: filas de las tablas de la página, o los elementos de lista si no hay tablas."""
+    soup = BeautifulSoup(html, _PARSER)
+    filas = _filas(soup)
+    if filas:
+        return filas
+    main = soup.find("main") or soup.body or soup
+    return [{"nombre": _texto(li)} for li in main.find_all("li") if _texto(li)]
+
+
+PARSERS = {
+    "info": ("info", parse_info),
+    "participantes": ("participantes_total", parse_participantes),
+    "runs": ("runs", parse_runs),
+}
+
+
+# =========================
+# Descarga
+# =========================
+class _Limitador:
+    """Espaciado mínimo entre peticiones al mismo host (compartido entre hilos)."""
+
+    def __init__(self, por_segundo: float):
+        self.intervalo = 1.0 / por_segundo if por_segundo > 0 else 0.0
+        self._siguiente = {}
+        self._lock = threading.Lock()
+
+    def esperar(self, host: str):
+        if not self.intervalo:
+            return
+        with self._lock:
+            ahora = time.monotonic()
+            turno = max(ahora, self._siguiente.get(host, 0.0))
+            self._siguiente[host] = turno + self.intervalo
+        if turno > ahora:
+            time.sleep(turno - ahora)
+
+
+class Enriquecedor:
+    def __init__(self, cookies=(), workers: int = 8, por_segundo: float = 4.0,
+                 timeout: float = 20, retries: int = 3):
+        import requests
+        from requests.adapters import HTTPAdapter
+        from urllib3.util.retry import Retry
+
+        self.workers = max(1, workers)
+        self.timeout = timeout
+        self.limitador = _Limitador(por_segundo)
+        self.session = requests.Session()
+        self.session.headers.update({"User-Agent": USER_AGENT, "Accept-Language": "es-ES,es;q=0.9"})
+        retry = Retry(total=retries, backoff_factor=0.5, status_forcelist=(429, 500, 502, 503, 504))
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=self.workers, max_retries=retry)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        # cookies tal como las devuelve driver.get_cookies()
+        for c in cookies:
+            self.session.cookies.set(c["name"], c["value"], domain=c.get("domain"), path=c.get("path", "/"))
+        self.descargas = self.errores = 0
+
+    def close(self):
+        self.session.close()
+
+    def descargar(self, url: str) -> str:
+        self.limitador.esperar(urlsplit(url).netloc)
+        r = self.session.get(url, timeout=self.timeout)
+        r.raise_for_status()
+        if LOGIN_PATH in r.url:
+            raise EnriquecimientoError("sesión caducada (redirige al login)")
+        return r.text
+
+    def _procesar(self, clave: str, url: str):
+        campo, parser = PARSERS[clave]
+        return campo, parser(self.descargar(url))
+
+    def enriquecer(self, eventos: List[dict], on_progress=None) -> List[dict]:
+        """Añade `detalles` a cada evento (in situ) y devuelve la misma lista."""
+        tareas = {}  # (clave, url) -> [eventos]
+        for ev in eventos:
+            ev["detalles"] = {}
+            for clave, url in (ev.get("enlaces") or {}).items():
+                if clave in PARSERS and url:
+                    tareas.setdefault((clave, url), []).append(ev)
+
+        hechas = 0
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            futuros = {pool.submit(self._procesar, clave, url): (clave, url) for clave, url in tareas}
+            for fut in as_completed(futuros):
+                clave, url = futuros[fut]
+                try:
+                    campo, valor = fut.result()
+                    self.descargas += 1
+                    for ev in tareas[(clave, url)]:
+                        ev["detalles"][campo] = valor
+                except Exception as e:
+                    self.errores += 1
+                    for ev in tareas[(clave, url)]:
+                        ev["detalles"].setdefault("errores", {})[clave] = str(e)
+                hechas += 1
+                if on_progress:
+                    on_progress(hechas, len(tareas))
+        return eventos
@@ -0,0 +1,162 @@
+# -*- coding: utf-8 -*-
+"""
+Escritores de registros en streaming (JSON Lines, CSV y array JSON).
+
+Los scrapers escriben cada página/tarjeta en cuanto la extraen en lugar de
+acumular todo y volcarlo al final:
+- JSONL: se escribe directamente en el fichero final, un registro por línea y
+  flush en cada lote; se puede seguir con `tail -f` durante el scraping y, si
+  el proceso muere, lo escrito hasta entonces es válido línea a línea.
+- CSV y array JSON: se escriben en `<fichero>.part` (también con flush por
+  lote, así que se puede seguir igual) y al cerrar se renombran con
+  os.replace, de modo que el fichero final siempre está completo; si el
+  scraping falla, el de la ejecución anterior queda intacto y el .part
+  conserva lo extraído.
+
+Uso:
+    with EscritorCSV("eventos.csv", cabecera) as w:
+        for pagina in paginas:
+            w.escribir_todos(filas)   # flush al final de cada lote
+"""
+
+import os, csv, json
+from typing import Iterable, Optional, Sequence
+
+
+class _Escritor:
+    SUFIJO_TMP = ".part"
+    ATOMICO = True
+
+    def __init__(self, path: str):
+        self.path = path
+        d = os.path.dirname(os.path.abspath(path))
+        os.makedirs(d, exist_ok=True)
+        self.destino = path + self.SUFIJO_TMP if self.ATOMICO else path
+        self.f = open(self.destino, "w", newline="", encoding="utf-8")
+        self.n = 0
+        self.cerrado = False
+        self._inicio()
+
+    # --- a implementar por cada formato ---
+    def _inicio(self):
+        pass
+
+    def _registro(self, registro):
+        raise NotImplementedError
+
+    def _fin(self):
+        pass
+
+    # --- API común ---
+    def escribir(self, registro):
+        self._registro(registro)
+        self.n += 1
+
+    def escribir_todos(self, registros: Iterable):
+        """Escribe un lote (una página, un paso de scroll) y hace flush."""
+        for r in registros:
+            self.escribir(r)
+        self.flush()
+
+    def flush(self):
+        self.f.flush()
+
+    def close(self):
+        """Cierra el formato y publica el fichero final (rename atómico)."""
+        if self.cerrado:
+            return
+        self._fin()
+        self.f.flush()
+        os.fsync(self.f.fileno())
+        self.f.close()
+        self.cerrado = True
+        if self.ATOMICO:
+            os.replace(self.destino, self.path)
+
+    def abortar(self):
+        """Cierra sin publicar: el fichero final anterior no se toca y el .part queda como parcial."""
+        if not self.cerrado:
+            self.f.close()
+            self.cerrado = True
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        else:
+            self.abortar()
+
+
+class EscritorJSONL(_Escritor):
+    ATOMICO = False  # se escribe en el fichero final para poder hacer tail -f
+
+    def _registro(self, registro):
+        self.f.write(json.dumps(registro, ensure_ascii=False) + "\n")
+
+
+class EscritorCSV(_Escritor):
+    def __init__(self, path: str, cabecera: Sequence[str]):
+        self.cabecera = list(cabecera)
+        super().__init__(path)
+
+    def _inicio(self):
+        self.w = csv.writer(self.f)
+        self.w.writerow(self.cabecera)
+
+    def _registro(self, registro):
+        if isinstance(registro, dict):
+            registro = [registro.get(k) for k in self.cabecera]
+        self.w.writerow(registro)
+
+
+class EscritorJSONArray(_Escritor):
+    """Mismo resultado que json.dump(lista, f, ensure_ascii=False, indent=indent), registro a registro."""
+
+    def __init__(self, path: str, indent: Optional[int] = 2):
+        self.indent = indent
+        super().__init__(path)
+
+    def _inicio(self):
+        self.f.write("[")
+
+    def _registro(self, registro):
+        if self.indent is None:
+            self.f.write((", " if self.n else "") + json.dumps(registro, ensure_ascii=False))
+            return
+        pad = " " * self.indent
+        texto = json.dumps(registro, ensure_ascii=False, indent=self.indent)
+        self.f.write(("," if self.n else "") + "\n" + pad + texto.replace("\n", "\n" + pad))
+
+    def _fin(self):
+        self.f.write("\n]" if self.n and self.indent is not None else "]")
+
+
+class Multiple:
+    """Reparte cada registro entre varios escritores."""
+
+    def __init__(self, *escritores):
+        self.escritores = [e for e in escritores if e is not None]
+
+    def escribir_todos(self, registros: Iterable):
+        registros = list(registros)
+        for e in self.escritores:
+            e.escribir_todos(registros)
+
+    def close(self):
+        for e in self.escritores:
+            e.close()
+
+    def abortar(self):
+        for e in self.escritores:
+            e.abortar()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        else:
+            self.abortar()
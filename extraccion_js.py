@@ -0,0 +1,120 @@
+# -*- coding: utf-8 -*-
+"""
+Extracción dentro del navegador: un único execute_script que recorre el DOM y
+devuelve solo los datos, en lugar de traer page_source (varios MB tras el
+scroll) y volver a parsearlo en Python.
+
+- FLOW_JS devuelve, por tarjeta `div.group.mb-6`, los mismos datos en bruto
+  que recoge `_walk_card` de 01_eventosprox.py (mismo recorrido en orden de
+  documento y mismas reglas de clases); `_build_event` compone el evento
+  igual para ambos caminos, así el esquema no puede divergir.
+- RSCE_JS devuelve, por `div.jet-listing-grid__item`, [nombre, url, inicio,
+  fin, ciudad, texto del badge] con los mismos selectores que
+  RSCEAgilityCSV._extraer_eventos.
+- El texto de un nodo es la concatenación de sus nodos de texto recortados,
+  como `"".join(t.strip() for t in el.itertext())` en lxml.
+
+Los parsers de Python siguen disponibles: con modo "verificar" se ejecutan
+los dos y `diferencias` informa de cualquier discrepancia.
+"""
+
+from typing import List
+
+# Texto de un elemento: nodos de texto recortados y concatenados (sin comentarios)
+_TEXTO_JS = r"""
+// mismos espacios que str.strip() de Python (\s de JS incluye \ufeff y no \x1c-\x1f ni \x85)
+const ws = /^[\t\n\v\f\r \x1c-\x1f\x85\xa0\u1680\u2000-\u200a\u2028\u2029\u202f\u205f\u3000]+|[\t\n\v\f\r \x1c-\x1f\x85\xa0\u1680\u2000-\u200a\u2028\u2029\u202f\u205f\u3000]+$/g;
+const txt = (el) => {
+  let out = '';
+  const walk = (n) => {
+    for (const c of n.childNodes) {
+      if (c.nodeType === 3) out += c.nodeValue.replace(ws, '');
+      else if (c.nodeType === 1) walk(c);
+    }
+  };
+  walk(el);
+  return out;
+};
+"""
+
+FLOW_JS = _TEXTO_JS + r"""
+const INFO = 'relative flex flex-col w-full pt-1 pb-6 mb-4 border-b border-gray-300'.split(' ');
+const NOMBRE = 'font-caption text-lg text-black truncate -mt-1'.split(' ');
+const CLUB = 'text-xs mb-0.5 mt-0.5'.split(' ');
+const ESTADO = 'py-1 px-4 border text-white font-bold rounded text-sm'.split(' ');
+const LINKS = [['info', '/info/'], ['participantes', '/participants_list'], ['runs', '/runs']];
+const all = (cls, req) => req.every(c => cls.has(c));
+
+const card = (root) => {
+  let info = false, nombre = null, club = null, estado = null, bandera = null;
+  const textXs = [], links = {};
+  let nLinks = 0;
+  const stack = [[root, false]];
+  while (stack.length) {
+    let [el, inInfo] = stack.pop();
+    const name = el.tagName.toLowerCase();
+    const raw = (el.getAttribute('class') || '').split(/\s+/).filter(Boolean);
+    if (name === 'div' && raw.length) {
+      const cls = new Set(raw);
+      if (inInfo) {
+        if (cls.has('text-xs')) textXs.push(txt(el));
+        if (nombre === null && all(cls, NOMBRE)) nombre = txt(el);
+        if (club === null && all(cls, CLUB)) club = txt(el);
+      } else if (!info && all(cls, INFO)) {
+        info = true;
+        inInfo = true;
+      }
+      if (estado === null && all(cls, ESTADO)) estado = txt(el);
+      if (bandera === null && cls.has('text-md')) bandera = txt(el);
+    } else if (name === 'a' && nLinks < LINKS.length) {
+      const href = el.getAttribute('href');
+      if (href) {
+        for (const [key, frag] of LINKS) {
+          if (!(key in links) && href.includes(frag)) { links[key] = href; nLinks++; }
+        }
+      }
+    }
+    const kids = el.children;
+    for (let i = kids.length - 1; i >= 0; i--) stack.push([kids[i], inInfo]);
+  }
+  return {id: root.getAttribute('id') || '', info, text_xs: textXs, nombre, club, estado, bandera, links};
+};
+
+// arguments[1] = scroll por ventanas: solo tarjetas aún no cosechadas
+const sel = arguments[1] ? 'div.group.mb-6:not([data-fa-h])' : 'div.group.mb-6';
+return [...document.querySelectorAll(sel)].slice(arguments[0] || 0).map(card);
+"""
+
+RSCE_JS = _TEXTO_JS + r"""
+const out = [];
+for (const b of document.querySelectorAll('div.jet-listing-grid__item')) {
+  const h2 = b.querySelector('h2');
+  if (!h2) continue;
+  const a = h2.querySelector('a');
+  const f = b.querySelectorAll('.jet-listing-dynamic-field__content');
+  const lugar = b.querySelector('.elementor-icon-box-title span');
+  const badge = b.querySelector('span.jet-listing-dynamic-terms__link');
+  out.push([txt(h2), a ? (a.getAttribute('href') || '').trim() : '',
+            f.length > 0 ? txt(f[0]) : '', f.length > 1 ? txt(f[1]) : '',
+            lugar ? txt(lugar) : '', badge ? txt(badge) : null]);
+}
+return out;
+"""
+
+
+def diferencias(a: List, b: List, clave=None, limite: int = 5) -> List[str]:
+    """Discrepancias entre dos extracciones (JS vs Python), como mensajes legibles."""
+    out = []
+    if len(a) != len(b):
+        out.append(f"nº de registros: {len(a)} vs {len(b)}")
+    for i, (x, y) in enumerate(zip(a, b)):
+        if x != y:
+            k = clave(x) if clave else i
+            if isinstance(x, dict) and isinstance(y, dict):
+                campos = sorted(k_ for k_ in set(x) | set(y) if x.get(k_) != y.get(k_))
+                out.append(f"{k}: difieren {', '.join(campos)}")
+            else:
+                out.append(f"{k}: {x!r} != {y!r}")
+            if len(out) >= limite:
+                break
+    return out
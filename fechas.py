@@ -0,0 +1,207 @@
+# -*- coding: utf-8 -*-
+"""
+Normalización de fechas por lotes (pandas).
+
+Convierte columnas enteras de texto a fechas con tipo, en español o inglés:
+  "13 de julio de 2025", "13 jul 2025", "July 13, 2025", "13/07/2025", "2025-07-13"
+y rangos:
+  "13 - 15 Jul 2025", "30 Jun - 2 Jul 2025", "28 Dec 2025 - 2 Jan 2026",
+  "del 13 al 15 de julio de 2025", "04/10/2025 - 05/10/2025", "04/10-05/10/2025"
+
+- Se parsea una sola vez cada texto distinto (los listados repiten mucho las
+  mismas fechas) con expresiones regulares vectorizadas (Series.str.extract);
+  además hay una memoria por proceso para las llamadas página a página.
+- Un rango sin mes o año en la primera parte toma los de la segunda; si así
+  queda al revés ("28 Dec - 2 Jan 2026") el inicio pasa al año anterior.
+- La fecha puede ir rodeada de otro texto ("Fecha: ...", una hora detrás);
+  texto sin fecha reconocible -> NaT.
+
+Salida: fecha_inicio / fecha_fin (datetime64) y su versión ISO AAAA-MM-DD.
+"""
+
+import re, datetime
+from typing import Iterable, List, Optional
+
+import numpy as np
+import pandas as pd
+
+MESES = {
+    # español
+    "enero": 1, "febrero": 2, "marzo": 3, "abril": 4, "mayo": 5, "junio": 6, "julio": 7,
+    "agosto": 8, "septiembre": 9, "setiembre": 9, "octubre": 10, "noviembre": 11, "diciembre": 12,
+    "ene": 1, "abr": 4, "ago": 8, "set": 9, "dic": 12,
+    # inglés
+    "january": 1, "february": 2, "march": 3, "april": 4, "june": 6, "july": 7, "august": 8,
+    "september": 9, "october": 10, "november": 11, "december": 12,
+    "jan": 1, "feb": 2, "mar": 3, "apr": 4, "may": 5, "jun": 6, "jul": 7, "aug": 8,
+    "sep": 9, "sept": 9, "oct": 10, "nov": 11, "dec": 12,
+}
+
+_LIMPIAR = [
+    # numéricas primero, antes de tratar "-" como separador de rango
+    (re.compile(r"\b(\d{4})-(\d{1,2})-(\d{1,2})\b"), r"\3/\2/\1"),
+    (re.compile(r"\b(\d{1,2})[-.](\d{1,2})[-.](\d{4})\b"), r"\1/\2/\3"),
+    (re.compile(r"\b(?:lunes|martes|mi[eé]rcoles|jueves|viernes|s[aá]bado|domingo|"
+                r"monday|tuesday|wednesday|thursday|friday|saturday|sunday|"
+                r"lun|mi[eé]|jue|vie|s[aá]b|dom|mon|tue|wed|thu|fri|sat|sun)\b\.?,?(?=\s+\d)"), " "),
+    (re.compile(r"\b(?:del?|desde|from)\s+(?=\d)"), " "),
+    (re.compile(r"\s+de\s+"), " "),
+    (re.compile(r"\s*(?:[-–—]|\bal?\b|\bto\b|\bhasta\b|\buntil\b)\s*(?=\d|[a-z])"), " - "),
+    (re.compile(r"(\d)(?:st|nd|rd|th)\b"), r"\1"),
+    (re.compile(r"[.,]"), " "),
+    (re.compile(r"\s+"), " "),
+]
+
+_D, _M, _Y = r"(\d{1,2})", r"([a-zñ]+)", r"(\d{4})"
+_PATRONES = [
+    # 13 - 15 jul 2025 / 30 jun - 2 jul 2025 / 28 dec 2025 - 2 jan 2026
+    ("rango_dm", rf"{_D}(?: {_M})?(?: {_Y})? - {_D} {_M} {_Y}"),
+    # jul 13 - 15 2025 / jun 30 - jul 2 2025
+    ("rango_md", rf"{_M} {_D}(?: {_Y})? - (?:{_M} )?{_D} {_Y}"),
+    ("dma", rf"{_D} {_M} {_Y}"),
+    ("mda", rf"{_M} {_D} {_Y}"),
+    # 04/10/2025 - 05/10/2025 / 04/10 - 05/10/2025
+    ("rango_num", r"(\d{1,2})/(\d{1,2})(?:/(\d{4}))? - (\d{1,2})/(\d{1,2})/(\d{4})"),
+    # 13/07/2025 (las ISO se reescriben así en _limpiar)
+    ("num", r"(\d{1,2})/(\d{1,2})/(\d{4})"),
+]
+# sin anclar al texto entero: la fecha puede llevar texto alrededor
+# ("Fecha: 13 de julio de 2025", "12 de octubre de 2025 a las 9:00")
+_PATRONES = [(n, re.compile(rf"(?<![\w/]){p}(?![\w/])")) for n, p in _PATRONES]
+
+_MEMO = {}          # texto -> (inicio, fin) como numpy.datetime64 (NaT si no hay fecha)
+_MEMO_MAX = 50000
+
+
+def _limpiar(s: pd.Series) -> pd.Series:
+    s = s.fillna("").astype(str).str.strip().str.lower()
+    for rx, rep in _LIMPIAR:
+        s = s.str.replace(rx, rep, regex=True)
+    return s.str.strip()
+
+
+def _fecha(y, m, d) -> pd.Series:
+    df = pd.DataFrame({"year": pd.to_numeric(y, errors="coerce"),
+                       "month": pd.to_numeric(m, errors="coerce"),
+                       "day": pd.to_numeric(d, errors="coerce")})
+    ok = df.notna().all(axis=1)
+    out = pd.Series(pd.NaT, index=df.index, dtype="datetime64[ns]")
+    if ok.any():
+        out[ok] = pd.to_datetime(df[ok].astype(int), errors="coerce")
+    return out
+
+
+def _mes(s: pd.Series) -> pd.Series:
+    return s.map(MESES)
+
+
+def _parsear_unicos(textos: pd.Series) -> pd.DataFrame:
+    """textos sin repetidos -> DataFrame(inicio, fin) con el mismo índice."""
+    t = _limpiar(textos)
+    ini = pd.Series(pd.NaT, index=t.index, dtype="datetime64[ns]")
+    fin = ini.copy()
+    pend = pd.Series(True, index=t.index)
+    for nombre, rx in _PATRONES:
+        if not pend.any():
+            break
+        g = t[pend].str.extract(rx)
+        hit = g.notna().any(axis=1) & g.iloc[:, -1].notna()
+        g = g[hit]
+        if g.empty:
+            continue
+        if nombre == "rango_dm":
+            d1, m1, y1, d2, m2, y2 = (g[i] for i in range(6))
+            m2n, y2n = _mes(m2), pd.to_numeric(y2)
+            m1n = _mes(m1).fillna(m2n)
+            y1n = pd.to_numeric(y1).fillna(y2n)
+            a, b = _fecha(y1n, m1n, d1), _fecha(y2n, m2n, d2)
+        elif nombre == "rango_md":
+            m1, d1, y1, m2, d2, y2 = (g[i] for i in range(6))
+            m1n = _mes(m1)
+            m2n = _mes(m2).fillna(m1n)
+            y2n = pd.to_numeric(y2)
+            y1n = pd.to_numeric(y1).fillna(y2n)
+            a, b = _fecha(y1n, m1n, d1), _fecha(y2n, m2n, d2)
+        elif nombre == "rango_num":
+            d1, m1, y1, d2, m2, y2 = (g[i] for i in range(6))
+            y2n = pd.to_numeric(y2)
+            y1n = pd.to_numeric(y1).fillna(y2n)
+            a, b = _fecha(y1n, m1, d1), _fecha(y2n, m2, d2)
+        elif nombre == "dma":
+            a = b = _fecha(g[2], _mes(g[1]), g[0])
+        elif nombre == "mda":
+            a = b = _fecha(g[2], _mes(g[0]), g[1])
+        else:  # num
+            a = b = _fecha(g[2], g[1], g[0])
+        # "28 dec - 2 jan 2026": el inicio es del año anterior
+        if nombre.startswith("rango"):
+            al_reves = a.notna() & b.notna() & (a > b)
+            if al_reves.any():
+                a = a.where(~al_reves, a - pd.DateOffset(years=1))
+        ok = a.notna() | b.notna()
+        ini[ok[ok].index] = a[ok]
+        fin[ok[ok].index] = b[ok]
+        pend[ok[ok].index] = False
+    return pd.DataFrame({"inicio": ini, "fin": fin})
+
+
+def parsear(textos: Iterable[Optional[str]]) -> pd.DataFrame:
+    """
+    Columna de textos (fecha o rango) -> DataFrame(inicio, fin) datetime64,
+    en el mismo orden. Cada texto distinto se parsea una sola vez.
+
+    >>> df = parsear(["04/10/2025 - 05/10/2025", "04/10/2025-05/10/2025", "30/12 - 02/01/2026",
+    ...               "13 - 15 jul 2025", "Fecha: 13 de julio de 2025 10:00"])
+    >>> list(zip(iso(df["inicio"]), iso(df["fin"])))  # doctest: +NORMALIZE_WHITESPACE
+    [('2025-10-04', '2025-10-05'), ('2025-10-04', '2025-10-05'), ('2025-12-30', '2026-01-02'),
+     ('2025-07-13', '2025-07-15'), ('2025-07-13', '2025-07-13')]
+    """
+    textos = ["" if t is None else t for t in textos]
+    # la búsqueda en la memoria es Python puro: en lotes pequeños (una página)
+    # construir Series solo para esto cuesta más que el propio parseo
+    nuevos = list(dict.fromkeys(t for t in textos if t not in _MEMO))
+    if nuevos:
+        if len(_MEMO) + len(nuevos) > _MEMO_MAX:
+            _MEMO.clear()
+        res = _parsear_unicos(pd.Series(nuevos, dtype=object))
+        _MEMO.update(zip(nuevos, zip(res["inicio"].to_numpy(), res["fin"].to_numpy())))
+    pares = [_MEMO[t] for t in textos]
+    return pd.DataFrame({
+        "inicio": np.array([p[0] for p in pares], dtype="datetime64[ns]"),
+        "fin": np.array([p[1] for p in pares], dtype="datetime64[ns]"),
+    })
+
+
+def parsear_par(inicios: Iterable[Optional[str]], fines: Iterable[Optional[str]]) -> pd.DataFrame:
+    """
+    Columnas separadas de inicio y fin (RSCE): inicio del primero, fin del
+    segundo; sin fin (evento de un día) se usa el del propio inicio.
+    """
+    a, b = parsear(inicios), parsear(fines)
+    return pd.DataFrame({"inicio": a["inicio"], "fin": b["fin"].fillna(a["fin"])})
+
+
+def iso(s: pd.Series) -> List[Optional[str]]:
+    """datetime64 -> 'AAAA-MM-DD' (None para NaT)."""
+    return [None if pd.isna(x) else x for x in s.dt.strftime("%Y-%m-%d")]
+
+
+def desde_hoy(df: pd.DataFrame, hoy: Optional[datetime.date] = None) -> pd.Series:
+    """
+    Máscara de eventos vigentes: fin >= hoy, o inicio >= hoy si no hay fin.
+    Sin ninguna de las dos fechas se conservan.
+    """
+    hoy = pd.Timestamp(hoy or datetime.date.today())
+    ini, fin = df["inicio"], df["fin"]
+    return (fin >= hoy) | (fin.isna() & (ini >= hoy)) | (ini.isna() & fin.isna())
+
+
+def anotar(eventos: List[dict], campo: str = "fechas") -> List[dict]:
+    """Añade fecha_inicio / fecha_fin (ISO) a una lista de dicts a partir de `campo`."""
+    if not eventos:
+        return eventos
+    df = parsear(e.get(campo) for e in eventos)
+    for e, a, b in zip(eventos, iso(df["inicio"]), iso(df["fin"])):
+        e["fecha_inicio"], e["fecha_fin"] = a, b
+    return eventos
+
@@ -0,0 +1,269 @@
+# -*- coding: utf-8 -*-
+"""
+Calendario canónico: une los eventos de FlowAgility (01_eventosprox.py) y de
+la RSCE (Calendario.py) en una sola lista sin duplicados.
+
+Emparejamiento:
+1. Cada evento se normaliza a (fecha de inicio, provincia, ciudad, nombre):
+   fechas con fechas.py, provincia con el nomenclátor offline (gazetteer.py)
+   a partir de `lugar` ("Getafe / Madrid / Spain") o `Ciudad`.
+2. Bloques por (fecha de inicio, provincia): cada evento Flow solo se
+   compara con los RSCE de su provincia que empiezan el mismo día o ±1 día
+   (TOLERANCIA_DIAS); los de provincia desconocida, con todos los de esas
+   fechas. El coste crece con el tamaño de los bloques, no con Flow × RSCE.
+3. Dentro del bloque, similitud de nombres (difflib sobre el nombre
+   normalizado sin palabras genéricas: "concurso", "prueba", "agility"...)
+   más bonificación por misma ciudad y mismas fechas. Asignación 1 a 1 por
+   mejor puntuación.
+
+Cada registro de salida conserva de qué fuentes viene, las URL de ambas y
+los datos originales (`procedencia`).
+
+Uso:
+  python fusion.py --flow output/competiciones_agility.json \\
+                   --rsce resultados_agility/eventos_agility_2025.csv \\
+                   --salida output/calendario_unificado.json
+"""
+
+import os, re, csv, sys, json, difflib, hashlib, argparse, datetime
+from collections import defaultdict
+from typing import Dict, List, Optional, Tuple
+
+import escritores
+import fechas
+import gazetteer
+from geocache import normalizar
+
+TOLERANCIA_DIAS = 1
+UMBRAL = 0.6             # puntuación mínima para dar dos eventos por el mismo
+PESO_NOMBRE, PESO_CIUDAD, PESO_FECHAS = 0.6, 0.25, 0.15
+
+GENERICAS = {
+    "concurso", "prueba", "pruebas", "agility", "competicion", "trofeo", "de", "del", "la", "el",
+    "los", "las", "y", "en", "club", "c", "rsce", "canina", "canino", "deportivo", "open",
+    "clasificatorio", "clasificatoria", "selectiva", "puntuable",
+}
+
+CABECERA = ["nombre", "fecha_inicio", "fecha_fin", "ciudad", "provincia", "lat", "lon", "estado",
+            "fuentes", "url_flow", "url_rsce", "puntuacion"]
+
+
+# =========================
+# Carga y normalización
+# =========================
+def cargar(path: str) -> List[dict]:
+    """Registros de un JSON (lista), JSONL o CSV."""
+    ext = os.path.splitext(path)[1].lower()
+    with open(path, encoding="utf-8", newline="" if ext == ".csv" else None) as f:
+        if ext == ".csv":
+            return list(csv.DictReader(f))
+        if ext == ".jsonl":
+            return [json.loads(l) for l in f if l.strip()]
+        datos = json.load(f)
+    return datos if isinstance(datos, list) else [datos]
+
+
+def _nombre_clave(nombre: str) -> str:
+    palabras = re.findall(r"[a-z0-9ñ]+", normalizar(nombre))
+    utiles = [p for p in palabras if p not in GENERICAS]
+    return " ".join(utiles or palabras)
+
+
+def _fechas_iso(registros: List[dict], texto_ini, texto_fin=None) -> List[Tuple[Optional[str], Optional[str]]]:
+    """(inicio, fin) ISO de cada registro: las columnas ya calculadas o, si faltan, con fechas.py."""
+    faltan = [r for r in registros if not r.get("fecha_inicio")]
+    if faltan:
+        if texto_fin:
+            df = fechas.parsear_par([texto_ini(r) for r in faltan], [texto_fin(r) for r in faltan])
+        else:
+            df = fechas.parsear([texto_ini(r) for r in faltan])
+        for r, a, b in zip(faltan, fechas.iso(df["inicio"]), fechas.iso(df["fin"])):
+            r["fecha_inicio"], r["fecha_fin"] = a, b
+    return [(r.get("fecha_inicio") or None, r.get("fecha_fin") or r.get("fecha_inicio") or None) for r in registros]
+
+
+def _lugar(gaz, texto: str):
+    """(ciudad, clave de provincia, provincia, lat, lon) a partir del texto de lugar."""
+    ciudad = re.split(r"[/,(]", texto or "")[0].strip()
+    lugar = gaz.buscar(texto) if texto else None
+    if lugar is None:
+        return ciudad, "", "", None, None
+    return ciudad, gazetteer.clave_provincia(lugar.provincia), lugar.provincia, lugar.lat, lugar.lon
+
+
+def _float(v):
+    try:
+        return float(v) if v not in (None, "") else None
+    except ValueError:
+        return None
+
+
+def normalizar_flow(eventos: List[dict], gaz) -> List[dict]:
+    out = []
+    for e, (ini, fin) in zip(eventos, _fechas_iso(eventos, lambda r: r.get("fechas"))):
+        ciudad, kprov, prov, lat, lon = _lugar(gaz, e.get("lugar", ""))
+        out.append({
+            "fuente": "flow", "nombre": e.get("nombre") or "", "fecha_inicio": ini, "fecha_fin": fin,
+            "ciudad": ciudad, "kprov": kprov, "provincia": prov, "lat": lat, "lon": lon,
+            "estado": e.get("estado"), "url": (e.get("enlaces") or {}).get("info"), "original": e,
+        })
+    return out
+
+
+def normalizar_rsce(filas: List[dict], gaz) -> List[dict]:
+    out = []
+    fechas_rsce = _fechas_iso(filas, lambda r: r.get("Fecha inicio"), lambda r: r.get("Fecha fin"))
+    for f, (ini, fin) in zip(filas, fechas_rsce):
+        ciudad, kprov, prov, lat, lon = _lugar(gaz, f.get("Ciudad", ""))
+        out.append({
+            "fuente": "rsce", "nombre": f.get("Nombre") or "", "fecha_inicio": ini, "fecha_fin": fin,
+            "ciudad": ciudad, "kprov": kprov, "provincia": prov,
+            # las coordenadas del CSV (Nominatim) mandan sobre el centroide del nomenclátor
+            "lat": _float(f.get("Latitud")) if _float(f.get("Latitud")) is not None else lat,
+            "lon": _float(f.get("Longitud")) if _float(f.get("Longitud")) is not None else lon,
+            "estado": f.get("Estado"), "url": f.get("URL"), "original": f,
+        })
+    return out
+
+
+# =========================
+# Bloques y emparejamiento
+# =========================
+def _dias(iso: Optional[str]) -> Optional[int]:
+    return datetime.date.fromisoformat(iso).toordinal() if iso else None
+
+
+class Indice:
+    """Índice de bloques (día de inicio, provincia) -> posiciones."""
+
+    def __init__(self, registros: List[dict]):
+        self.registros = registros
+        self.bloques = defaultdict(list)
+        for i, r in enumerate(registros):
+            self.bloques[(_dias(r["fecha_inicio"]), r["kprov"])].append(i)
+        self.por_dia = defaultdict(list)   # para los de provincia desconocida
+        for (dia, _), idx in self.bloques.items():
+            self.por_dia[dia].extend(idx)
+
+    def candidatos(self, r: dict, tolerancia: int = TOLERANCIA_DIAS) -> List[int]:
+        dia = _dias(r["fecha_inicio"])
+        if dia is None:
+            return []
+        out = []
+        for d in range(dia - tolerancia, dia + tolerancia + 1):
+            if r["kprov"]:
+                out.extend(self.bloques.get((d, r["kprov"]), ()))
+                out.extend(self.bloques.get((d, ""), ()))
+            else:
+                out.extend(self.por_dia.get(d, ()))
+        return out
+
+
+def puntuar(a: dict, b: dict) -> Tuple[float, float]:
+    """(puntuación total, similitud de nombres) entre dos eventos normalizados."""
+    na, nb = a.setdefault("_clave", _nombre_clave(a["nombre"])), b.setdefault("_clave", _nombre_clave(b["nombre"]))
+    sim = difflib.SequenceMatcher(None, na, nb).ratio() if na and nb else 0.0
+    misma_ciudad = bool(a["ciudad"]) and normalizar(a["ciudad"]) == normalizar(b["ciudad"])
+    mismas_fechas = a["fecha_inicio"] == b["fecha_inicio"] and a["fecha_fin"] == b["fecha_fin"]
+    return PESO_NOMBRE * sim + PESO_CIUDAD * misma_ciudad + PESO_FECHAS * mismas_fechas, sim
+
+
+def emparejar(flow: List[dict], rsce: List[dict], umbral: float = UMBRAL):
+    """Pares (i_flow, j_rsce, puntuación) 1 a 1 y nº de comparaciones hechas."""
+    indice = Indice(rsce)
+    propuestas, comparaciones = [], 0
+    for i, a in enumerate(flow):
+        for j in indice.candidatos(a):
+            comparaciones += 1
+            p, _ = puntuar(a, rsce[j])
+            if p >= umbral:
+                propuestas.append((p, i, j))
+    usados_f, usados_r, pares = set(), set(), []
+    for p, i, j in sorted(propuestas, reverse=True):
+        if i not in usados_f and j not in usados_r:
+            usados_f.add(i)
+            usados_r.add(j)
+            pares.append((i, j, p))
+    return pares, comparaciones
+
+
+# =========================
+# Registro canónico
+# =========================
+def _id(r: dict) -> str:
+    # la URL de la fuente principal (RSCE si la hay) distingue eventos del mismo
+    # día y provincia con nombre genérico ("Concurso Agility")
+    base = f"{r.get('url') or ''}|{r['fecha_inicio']}|{r['kprov']}|{_nombre_clave(r['nombre'])}"
+    return hashlib.sha1(base.encode("utf-8")).hexdigest()[:16]
+
+
+def _canonico(f: Optional[dict], r: Optional[dict], puntuacion: Optional[float] = None) -> dict:
+    # la RSCE es la fuente oficial: nombre, fechas y lugar suyos si los hay
+    base = r or f
+    otro = f if r else None
+    campo = lambda k: base.get(k) if base.get(k) not in (None, "") else (otro or {}).get(k)
+    fuentes = [x["fuente"] for x in (f, r) if x]
+    return {
+        "id": _id(base),
+        "nombre": campo("nombre"),
+        "fecha_inicio": campo("fecha_inicio"),
+        "fecha_fin": campo("fecha_fin"),
+        "ciudad": campo("ciudad"),
+        "provincia": campo("provincia"),
+        "lat": campo("lat"),
+        "lon": campo("lon"),
+        "estado": campo("estado"),
+        "fuentes": fuentes,
+        "urls": {x["fuente"]: x["url"] for x in (f, r) if x and x.get("url")},
+        "puntuacion": round(puntuacion, 3) if puntuacion is not None else None,
+        "procedencia": {x["fuente"]: x["original"] for x in (f, r) if x},
+    }
+
+
+def fusionar(flow_eventos: List[dict], rsce_filas: List[dict], umbral: float = UMBRAL) -> Tuple[List[dict], Dict]:
+    """Calendario unificado (ordenado por fecha) y estadísticas del emparejamiento."""
+    gaz = gazetteer.cargar()
+    flow = normalizar_flow(flow_eventos, gaz)
+    rsce = normalizar_rsce(rsce_filas, gaz)
+    pares, comparaciones = emparejar(flow, rsce, umbral)
+    con_f, con_r = {i for i, _, _ in pares}, {j for _, j, _ in pares}
+    salida = [_canonico(flow[i], rsce[j], p) for i, j, p in pares]
+    salida += [_canonico(a, None) for i, a in enumerate(flow) if i not in con_f]
+    salida += [_canonico(None, b) for j, b in enumerate(rsce) if j not in con_r]
+    salida.sort(key=lambda e: (e["fecha_inicio"] or "9999", e["nombre"] or ""))
+    stats = {"flow": len(flow), "rsce": len(rsce), "emparejados": len(pares), "total": len(salida),
+             "comparaciones": comparaciones, "sin_bloques": len(flow) * len(rsce)}
+    return salida, stats
+
+
+def guardar(eventos: List[dict], path: str):
+    """JSON completo (con procedencia) y, al lado, un CSV plano."""
+    with escritores.EscritorJSONArray(path, indent=2) as w:
+        w.escribir_todos(eventos)
+    with escritores.EscritorCSV(os.path.splitext(path)[0] + ".csv", CABECERA) as w:
+        w.escribir_todos({**e, "fuentes": "+".join(e["fuentes"]), "url_flow": e["urls"].get("flow"),
+                          "url_rsce": e["urls"].get("rsce")} for e in eventos)
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Une los calendarios de FlowAgility y RSCE")
+    ap.add_argument("--flow", default="./output/competiciones_agility.json")
+    ap.add_argument("--rsce", default="./resultados_agility/eventos_agility_2025.csv")
+    ap.add_argument("--salida", default="./output/calendario_unificado.json")
+    ap.add_argument("--umbral", type=float, default=UMBRAL)
+    args = ap.parse_args(argv)
+    flow = cargar(args.flow) if os.path.exists(args.flow) else []
+    rsce = cargar(args.rsce) if os.path.exists(args.rsce) else []
+    if not flow and not rsce:
+        print("❌ No hay eventos de ninguna fuente")
+        return 1
+    eventos, st = fusionar(flow, rsce, args.umbral)
+    guardar(eventos, args.salida)
+    print(f"🔗 {st['flow']} FlowAgility + {st['rsce']} RSCE -> {st['total']} eventos "
+          f"({st['emparejados']} en ambas fuentes; {st['comparaciones']} comparaciones en vez de {st['sin_bloques']})")
+    print(f"📁 Calendario unificado: {args.salida} (+ .csv)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
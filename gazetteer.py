@@ -0,0 +1,188 @@
+# -*- coding: utf-8 -*-
+"""
+Nomenclátor offline de municipios y provincias de España.
+
+Los datos (gazetteer_es.tsv, ~7.000 poblaciones de más de 1.000 habitantes)
+proceden de GeoNames (https://www.geonames.org, CC BY 4.0). Se cargan una
+vez en arrays paralelos con un índice por nombre normalizado (sin tildes ni
+mayúsculas), así que una búsqueda exacta es un acceso a dict.
+
+Resolución de un texto tipo "Alhaurín de la Torre (Málaga)", "Getafe, Madrid"
+o "Madrid / Madrid / Spain":
+1. nombre exacto (o sin artículo inicial); si hay varios homónimos se elige
+   el de la provincia indicada, y si no hay pista se considera ambiguo
+2. nombre de provincia (o su capital si se llama igual) -> centroide de sus poblaciones
+3. aproximado (difflib) entre los nombres con la misma inicial
+
+Regenerar los datos:
+  python gazetteer.py --construir rg_cities1000.csv   (formato reverse_geocoder: lat,lon,name,admin1,admin2,cc)
+"""
+
+import os, re, csv, sys, difflib, argparse
+from array import array
+from collections import defaultdict, namedtuple
+from functools import lru_cache
+from typing import Optional, Tuple
+
+from geocache import normalizar
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+DATOS = os.path.join(HERE, "gazetteer_es.tsv")
+
+Lugar = namedtuple("Lugar", "nombre provincia lat lon")
+
+ARTICULOS = re.compile(r"^(?:(?:el|la|los|las|els|es|sa|o|a|as|os) |l')")
+PAIS      = {"espana", "spain", "es"}
+PREFIJOS_PROV = ("provincia de ", "provincia da ", "province of ")
+ALIAS_PROVINCIAS = {
+    "a coruna": "coruna", "la coruna": "coruna",
+    "araba": "alava", "gipuzkoa": "guipuzcoa", "vizcaya": "bizkaia",
+    "baleares": "illes balears", "islas baleares": "illes balears", "balears": "illes balears",
+    "castellon": "castello", "gerona": "girona", "lerida": "lleida", "orense": "ourense",
+    "navarre": "navarra",
+}
+ALIAS_CIUDADES = {
+    "castellon": "castello de la plana", "castellon de la plana": "castello de la plana",
+    "donostia": "san sebastian", "alacant": "alicante", "elx": "elche", "vitoria gasteiz": "vitoria",
+}
+
+
+def _clave(texto: str) -> str:
+    return normalizar(texto).replace("-", " ")
+
+
+def clave_provincia(texto: str) -> str:
+    k = _clave(texto)
+    for pre in PREFIJOS_PROV:
+        if k.startswith(pre):
+            k = k[len(pre):]
+            break
+    return ALIAS_PROVINCIAS.get(k, k)
+
+
+class Gazetteer:
+    def __init__(self, path: str = DATOS):
+        self.nombres, self.provincias = [], []
+        self.lat, self.lon = array("d"), array("d")
+        self.indice = defaultdict(list)           # clave -> [idx]
+        self.centroides = {}                      # clave provincia -> Lugar
+        with open(path, encoding="utf-8") as f:
+            for linea in f:
+                if linea.startswith("#") or not linea.strip():
+                    continue
+                nombre, provincia, lat, lon = linea.rstrip("\n").split("\t")
+                self._anadir(nombre, provincia, float(lat), float(lon))
+        self._centroides()
+        self.por_inicial = defaultdict(list)
+        for k in self.indice:
+            self.por_inicial[k[:1]].append(k)
+
+    def _anadir(self, nombre, provincia, lat, lon):
+        idx = len(self.nombres)
+        self.nombres.append(nombre)
+        self.provincias.append(provincia)
+        self.lat.append(lat)
+        self.lon.append(lon)
+        k = _clave(nombre)
+        self.indice[k].append(idx)
+        sin_art = ARTICULOS.sub("", k)
+        if sin_art != k:
+            self.indice[sin_art].append(idx)
+
+    def _centroides(self):
+        acum = defaultdict(lambda: [0.0, 0.0, 0, ""])
+        for i, prov in enumerate(self.provincias):
+            a = acum[clave_provincia(prov)]
+            a[0] += self.lat[i]; a[1] += self.lon[i]; a[2] += 1; a[3] = prov
+        for k, (la, lo, n, prov) in acum.items():
+            self.centroides[k] = Lugar(prov, prov, la / n, lo / n)
+
+    def _lugar(self, i: int) -> Lugar:
+        return Lugar(self.nombres[i], self.provincias[i], self.lat[i], self.lon[i])
+
+    def _elegir(self, candidatos, pistas) -> Optional[Lugar]:
+        if len(candidatos) == 1:
+            return self._lugar(candidatos[0])
+        for p in pistas:
+            for i in candidatos:
+                if clave_provincia(self.provincias[i]) == p:
+                    return self._lugar(i)
+        return None  # homónimos sin pista: mejor que decida Nominatim
+
+    @lru_cache(maxsize=4096)
+    def buscar(self, texto: str) -> Optional[Lugar]:
+        partes = [_clave(p) for p in re.split(r"[/,()]", texto or "")]
+        partes = [p for p in partes if p and p not in PAIS]
+        if not partes:
+            return None
+        ciudad, pistas = partes[0], [clave_provincia(p) for p in partes[1:]]
+
+        ciudad = ALIAS_CIUDADES.get(ciudad, ciudad)
+        prov = clave_provincia(ciudad)
+        # "Lérida" -> "lleida": el nombre alternativo de una provincia suele ser también su capital
+        for k in (ciudad, ARTICULOS.sub("", ciudad), prov):
+            if k in self.indice:
+                return self._elegir(self.indice[k], pistas)
+        if prov in self.centroides:
+            return self.centroides[prov]
+        parecidos = difflib.get_close_matches(ciudad, self.por_inicial.get(ciudad[:1], []), n=1, cutoff=0.9)
+        if parecidos:
+            return self._elegir(self.indice[parecidos[0]], pistas)
+        return None
+
+    def resolver(self, texto: str) -> Optional[Tuple[float, float]]:
+        lugar = self.buscar(texto)
+        return (lugar.lat, lugar.lon) if lugar else None
+
+
+_GAZ = None
+
+
+def cargar() -> Gazetteer:
+    """Instancia compartida (se carga una sola vez por proceso)."""
+    global _GAZ
+    if _GAZ is None:
+        _GAZ = Gazetteer()
+    return _GAZ
+
+
+# =========================
+# Construcción de los datos
+# =========================
+def construir(origen: str, destino: str = DATOS):
+    filas = set()
+    with open(origen, encoding="utf-8", newline="") as f:
+        for r in csv.DictReader(f):
+            if r.get("cc", "").strip() != "ES":
+                continue
+            prov = r["admin2"].strip() or r["admin1"].strip()
+            for pre in ("Provincia de ", "Provincia da ", "Province of "):
+                if prov.startswith(pre):
+                    prov = prov[len(pre):]
+            # GeoNames junta variantes: "Xeraco,Jaraco", "Gasteiz / Vitoria"
+            for nombre in re.split(r"[,/]", r["name"]):
+                nombre = nombre.strip()
+                if nombre:
+                    filas.add((nombre, prov, round(float(r["lat"]), 5), round(float(r["lon"]), 5)))
+    with open(destino, "w", encoding="utf-8", newline="\n") as f:
+        f.write("# Fuente: GeoNames (https://www.geonames.org), CC BY 4.0. nombre\tprovincia\tlat\tlon\n")
+        for nombre, prov, lat, lon in sorted(filas):
+            f.write(f"{nombre}\t{prov}\t{lat}\t{lon}\n")
+    print(f"📁 {len(filas)} lugares guardados en {destino}")
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Nomenclátor offline de España")
+    ap.add_argument("--construir", metavar="CSV", help="regenera gazetteer_es.tsv desde un CSV de GeoNames")
+    ap.add_argument("consultas", nargs="*")
+    args = ap.parse_args(argv)
+    if args.construir:
+        construir(args.construir)
+        return
+    gaz = cargar()
+    for q in args.consultas:
+        print(f"{q!r:40} -> {gaz.buscar(q)}")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
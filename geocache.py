@@ -0,0 +1,92 @@
+# -*- coding: utf-8 -*-
+"""
+Caché persistente de geocodificación (SQLite).
+
+- Clave: la consulta normalizada (minúsculas, sin tildes, espacios colapsados),
+  así "Alhaurín de la Torre, España" y "alhaurin de la torre,  españa" comparten fila.
+- TTL para aciertos y TTL (más corto) para fallos: caché negativa de ciudades
+  que Nominatim no encuentra, para no repetir la consulta cada noche.
+- Tamaño acotado: al superar `max_entradas` se expulsan las menos usadas recientemente.
+
+Es seguro compartir una instancia entre hilos.
+"""
+
+import os, re, time, sqlite3, threading, unicodedata
+from typing import Optional, Tuple
+
+LatLon = Tuple[float, float]
+
+_ESPACIOS = re.compile(r"\s+")
+
+
+def normalizar(texto: str) -> str:
+    t = unicodedata.normalize("NFKD", texto or "")
+    t = "".join(ch for ch in t if not unicodedata.combining(ch))
+    return _ESPACIOS.sub(" ", t).strip().lower()
+
+
+class GeoCache:
+    def __init__(self, path: str, ttl_dias: float = 90, ttl_negativo_dias: float = 7,
+                 max_entradas: int = 20000):
+        d = os.path.dirname(os.path.abspath(path))
+        os.makedirs(d, exist_ok=True)
+        self.ttl = ttl_dias * 86400
+        self.ttl_negativo = ttl_negativo_dias * 86400
+        self.max_entradas = max_entradas
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.executescript("""
+            CREATE TABLE IF NOT EXISTS geocache (
+                clave  TEXT PRIMARY KEY,
+                lat    REAL,
+                lon    REAL,
+                creado REAL NOT NULL,
+                usado  REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS geocache_usado ON geocache(usado);
+        """)
+        self.aciertos = self.fallos = 0
+
+    def get(self, consulta: str) -> Tuple[bool, Optional[LatLon]]:
+        """(encontrado, (lat, lon) | None). None con encontrado=True es un fallo cacheado."""
+        clave = normalizar(consulta)
+        ahora = time.time()
+        with self._lock:
+            row = self._db.execute(
+                "SELECT lat, lon, creado FROM geocache WHERE clave = ?", (clave,)
+            ).fetchone()
+            if row is None:
+                self.fallos += 1
+                return False, None
+            lat, lon, creado = row
+            ttl = self.ttl if lat is not None else self.ttl_negativo
+            if ahora - creado > ttl:
+                self._db.execute("DELETE FROM geocache WHERE clave = ?", (clave,))
+                self.fallos += 1
+                return False, None
+            self._db.execute("UPDATE geocache SET usado = ? WHERE clave = ?", (ahora, clave))
+            self.aciertos += 1
+            return True, ((lat, lon) if lat is not None else None)
+
+    def put(self, consulta: str, latlon: Optional[LatLon]):
+        clave = normalizar(consulta)
+        ahora = time.time()
+        lat, lon = latlon if latlon else (None, None)
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO geocache (clave, lat, lon, creado, usado) VALUES (?, ?, ?, ?, ?)",
+                (clave, lat, lon, ahora, ahora),
+            )
+            (n,) = self._db.execute("SELECT COUNT(*) FROM geocache").fetchone()
+            if n > self.max_entradas:
+                self._db.execute(
+                    "DELETE FROM geocache WHERE clave IN "
+                    "(SELECT clave FROM geocache ORDER BY usado LIMIT ?)",
+                    (n - self.max_entradas,),
+                )
+            self._db.commit()
+
+    def close(self):
+        with self._lock:
+            self._db.commit()
+            self._db.close()
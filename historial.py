@@ -0,0 +1,367 @@
+# -*- coding: utf-8 -*-
+"""
+Historial de eventos (SQLite): estado actual de cada evento y, por cada
+ejecución, solo los campos que han cambiado.
+
+- `eventos`: una fila por (fuente, clave): id en FlowAgility, URL en RSCE.
+  Columnas indexadas para consultar (fecha_inicio, estado, ciudad...) y el
+  registro completo aplanado en `datos` (JSON; "enlaces.info" para lo anidado).
+- `cambios`: una fila por campo cambiado (antes -> despues) con la versión
+  del evento y el momento de la ejecución. La primera vez que se ve un evento
+  se guardan todos sus campos con antes = NULL.
+- `ejecuciones`: inicio/fin y recuento de cada ejecución de cada scraper.
+- Inserción por lotes (upsert) en una transacción por lote; los eventos sin
+  cambios solo actualizan `ultima_vez`.
+
+Consultas típicas:
+  ¿cuándo se abrió la inscripción?   transiciones("estado_tipo", a="inscripcion_abierta")
+  ¿qué eventos se han anulado?        transiciones("estado", a="Anulado")
+Los cambios se guardan con el nombre de campo de cada fuente ("Estado" en el
+CSV de la RSCE); `transiciones` acepta los nombres de COLUMNAS y los traduce.
+
+La base de datos tiene que sobrevivir entre ejecuciones: en un host propio
+basta la ruta por defecto; en GitHub Actions el workflow la guarda con
+actions/cache (TestPython2.yml). Sin eso cada ejecución empieza en la versión 1.
+
+Uso:
+  python historial.py transiciones estado_tipo --a inscripcion_abierta
+  python historial.py anulados --desde 2025-01-01
+  python historial.py evento rsce https://rsce.es/evento/...
+  python historial.py buscar --desde 2025-07-01 --hasta 2025-07-31 --ciudad Getafe
+"""
+
+import os, sys, json, time, sqlite3, argparse, datetime, threading
+from typing import Callable, Dict, Iterable, List, Optional
+
+RUTA = os.path.join(os.path.expanduser("~"), ".cache", "agileventos", "historial.sqlite")
+IGNORAR = {"detalles"}   # lo descarga el enriquecimiento en cada ejecución: no es un cambio del evento
+LOTE_SQL = 500           # claves por SELECT ... IN (...)
+
+# fuente -> (clave del evento, columnas indexadas: columna -> función sobre el registro aplanado)
+FUENTES: Dict[str, tuple] = {
+    "flow": ("id", {
+        "nombre": lambda r: r.get("nombre"),
+        "fecha_inicio": lambda r: r.get("fecha_inicio"),
+        "fecha_fin": lambda r: r.get("fecha_fin"),
+        "ciudad": lambda r: (r.get("lugar") or "").split("/")[0].strip() or None,
+        "estado": lambda r: r.get("estado"),
+        "estado_tipo": lambda r: r.get("estado_tipo"),
+        "url": lambda r: r.get("enlaces.info"),
+    }),
+    "rsce": ("URL", {
+        "nombre": lambda r: r.get("Nombre"),
+        "fecha_inicio": lambda r: r.get("fecha_inicio"),
+        "fecha_fin": lambda r: r.get("fecha_fin"),
+        "ciudad": lambda r: r.get("Ciudad"),
+        "estado": lambda r: r.get("Estado"),
+        "estado_tipo": lambda r: None,
+        "url": lambda r: r.get("URL"),
+    }),
+}
+COLUMNAS = ["nombre", "fecha_inicio", "fecha_fin", "ciudad", "estado", "estado_tipo", "url"]
+# columna indexada -> campo en bruto de la fuente, donde no se llaman igual
+CAMPOS: Dict[str, Dict[str, str]] = {
+    "rsce": {"nombre": "Nombre", "ciudad": "Ciudad", "estado": "Estado", "url": "URL"},
+}
+
+ESQUEMA = """
+    CREATE TABLE IF NOT EXISTS eventos (
+        fuente       TEXT NOT NULL,
+        clave        TEXT NOT NULL,
+        nombre       TEXT,
+        fecha_inicio TEXT,
+        fecha_fin    TEXT,
+        ciudad       TEXT COLLATE NOCASE,
+        estado       TEXT COLLATE NOCASE,
+        estado_tipo  TEXT,
+        url          TEXT,
+        datos        TEXT NOT NULL,
+        version      INTEGER NOT NULL,
+        primera_vez  TEXT NOT NULL,
+        ultima_vez   TEXT NOT NULL,
+        PRIMARY KEY (fuente, clave)
+    ) WITHOUT ROWID;
+    CREATE INDEX IF NOT EXISTS eventos_fecha  ON eventos(fecha_inicio);
+    CREATE INDEX IF NOT EXISTS eventos_estado ON eventos(estado, fecha_inicio);
+    CREATE INDEX IF NOT EXISTS eventos_ciudad ON eventos(ciudad, fecha_inicio);
+
+    CREATE TABLE IF NOT EXISTS cambios (
+        id        INTEGER PRIMARY KEY,
+        fuente    TEXT NOT NULL,
+        clave     TEXT NOT NULL,
+        version   INTEGER NOT NULL,
+        ejecucion INTEGER NOT NULL,
+        momento   TEXT NOT NULL,
+        campo     TEXT NOT NULL,
+        antes     TEXT,
+        despues   TEXT
+    );
+    CREATE INDEX IF NOT EXISTS cambios_evento ON cambios(fuente, clave, version);
+    CREATE INDEX IF NOT EXISTS cambios_campo  ON cambios(campo, despues COLLATE NOCASE, momento);
+    CREATE INDEX IF NOT EXISTS cambios_momento ON cambios(momento);
+
+    CREATE TABLE IF NOT EXISTS ejecuciones (
+        id        INTEGER PRIMARY KEY,
+        fuente    TEXT NOT NULL,
+        inicio    TEXT NOT NULL,
+        fin       TEXT,
+        vistos    INTEGER NOT NULL DEFAULT 0,
+        nuevos    INTEGER NOT NULL DEFAULT 0,
+        cambiados INTEGER NOT NULL DEFAULT 0
+    );
+"""
+
+
+def _aplanar(registro, prefijo="") -> Dict:
+    plano = {}
+    items = registro.items() if isinstance(registro, dict) else enumerate(registro)
+    for k, v in items:
+        if not prefijo and k in IGNORAR:
+            continue
+        if isinstance(v, dict):
+            plano.update(_aplanar(v, f"{prefijo}{k}."))
+        else:
+            plano[f"{prefijo}{k}"] = v
+    # mismo formato que lo que vuelve de la base de datos (tuplas -> listas...)
+    return json.loads(json.dumps(plano, ensure_ascii=False, default=str))
+
+
+def _texto(v) -> Optional[str]:
+    if v is None or isinstance(v, str):
+        return v
+    return json.dumps(v, ensure_ascii=False)
+
+
+def _ahora() -> str:
+    return datetime.datetime.now().isoformat(timespec="seconds")
+
+
+class Historial:
+    """Es seguro compartir una instancia entre hilos (como GeoCache)."""
+
+    def __init__(self, path: str = RUTA):
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.path = path
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.executescript(ESQUEMA)
+        self.ejecuciones: Dict[str, int] = {}
+        self.cuentas: Dict[str, Dict[str, int]] = {}
+
+    # ---------- escritura ----------
+    def _ejecucion(self, fuente: str) -> int:
+        if fuente not in self.ejecuciones:
+            cur = self._db.execute("INSERT INTO ejecuciones (fuente, inicio) VALUES (?, ?)", (fuente, _ahora()))
+            self.ejecuciones[fuente] = cur.lastrowid
+            self.cuentas[fuente] = {"vistos": 0, "nuevos": 0, "cambiados": 0}
+        return self.ejecuciones[fuente]
+
+    def _previos(self, fuente: str, claves: List[str]) -> Dict[str, tuple]:
+        previos = {}
+        for i in range(0, len(claves), LOTE_SQL):
+            trozo = claves[i:i + LOTE_SQL]
+            marcas = ",".join("?" * len(trozo))
+            for clave, version, datos in self._db.execute(
+                    f"SELECT clave, version, datos FROM eventos WHERE fuente = ? AND clave IN ({marcas})",
+                    [fuente, *trozo]):
+                previos[clave] = (version, json.loads(datos))
+        return previos
+
+    def registrar(self, fuente: str, registros: Iterable, clave: Optional[Callable] = None) -> Dict[str, int]:
+        """Upsert de un lote de eventos de `fuente` ("flow" o "rsce"); devuelve nuevos/cambiados/sin_cambios."""
+        campo_clave, columnas = FUENTES[fuente]
+        planos = {}
+        for r in registros:
+            p = _aplanar(r)
+            k = clave(r) if clave else p.get(campo_clave)
+            if k:
+                planos[str(k)] = p
+        res = {"nuevos": 0, "cambiados": 0, "sin_cambios": 0}
+        if not planos:
+            return res
+        momento = _ahora()
+        with self._lock:
+            nueva = fuente not in self.ejecuciones
+            try:
+                with self._db:
+                    self._upsert(fuente, planos, columnas, momento, res)
+            except Exception:
+                # la transacción se ha deshecho, también la fila de la ejecución
+                if nueva:
+                    self.ejecuciones.pop(fuente, None)
+                    self.cuentas.pop(fuente, None)
+                raise
+        return res
+
+    def _upsert(self, fuente, planos, columnas, momento, res):
+        """Cuerpo de registrar(), dentro de la transacción."""
+        ejecucion = self._ejecucion(fuente)
+        previos = self._previos(fuente, list(planos))
+        cambios, upserts, tocados = [], [], []
+        for k, p in planos.items():
+            version, antes = previos.get(k, (0, {}))
+            difs = [(c, antes.get(c), p.get(c)) for c in sorted(antes.keys() | p.keys())
+                    if antes.get(c) != p.get(c)]
+            if version and not difs:
+                tocados.append((momento, fuente, k))
+                res["sin_cambios"] += 1
+                continue
+            res["cambiados" if version else "nuevos"] += 1
+            version += 1
+            cambios += [(fuente, k, version, ejecucion, momento, c, _texto(a), _texto(b)) for c, a, b in difs]
+            upserts.append((fuente, k, *(columnas[c](p) for c in COLUMNAS),
+                            json.dumps(p, ensure_ascii=False), version, momento, momento))
+        self._db.executemany(
+            f"INSERT INTO eventos (fuente, clave, {', '.join(COLUMNAS)}, datos, version, primera_vez, ultima_vez) "
+            f"VALUES ({','.join('?' * (len(COLUMNAS) + 6))}) "
+            f"ON CONFLICT(fuente, clave) DO UPDATE SET "
+            + ", ".join(f"{c} = excluded.{c}" for c in COLUMNAS + ["datos", "version", "ultima_vez"]),
+            upserts)
+        self._db.executemany("UPDATE eventos SET ultima_vez = ? WHERE fuente = ? AND clave = ?", tocados)
+        self._db.executemany(
+            "INSERT INTO cambios (fuente, clave, version, ejecucion, momento, campo, antes, despues) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?)", cambios)
+        cuenta = self.cuentas[fuente]
+        cuenta["vistos"] += len(planos)
+        cuenta["nuevos"] += res["nuevos"]
+        cuenta["cambiados"] += res["cambiados"]
+        self._db.execute("UPDATE ejecuciones SET fin = ?, vistos = ?, nuevos = ?, cambiados = ? WHERE id = ?",
+                         (momento, cuenta["vistos"], cuenta["nuevos"], cuenta["cambiados"], ejecucion))
+
+    def resumen(self, fuente: str) -> str:
+        c = self.cuentas.get(fuente)
+        if not c:
+            return "sin eventos"
+        return f"{c['vistos']} vistos, {c['nuevos']} nuevos, {c['cambiados']} con cambios"
+
+    def close(self):
+        with self._lock:
+            self._db.commit()
+            self._db.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    # ---------- consultas ----------
+    def _filas(self, sql: str, params=()) -> List[Dict]:
+        with self._lock:
+            cur = self._db.execute(sql, params)
+            nombres = [d[0] for d in cur.description]
+            return [dict(zip(nombres, fila)) for fila in cur.fetchall()]
+
+    def transiciones(self, campo: str, a: Optional[str] = None, de: Optional[str] = None,
+                     desde: Optional[str] = None, fuente: Optional[str] = None,
+                     incluir_primera: bool = False) -> List[Dict]:
+        """
+        Cambios de `campo` (a `a`, desde el valor `de`) con el nombre del evento.
+        Por defecto sin la primera vez que se vio el evento (antes = NULL).
+        `campo` puede ser una columna de COLUMNAS: se busca con el nombre de cada fuente.
+        """
+        por_fuente = [(f, CAMPOS.get(f, {}).get(campo, campo)) for f in FUENTES]
+        where = ["(" + " OR ".join("(c.fuente = ? AND c.campo = ?)" for _ in por_fuente) + ")"]
+        params = [x for par in por_fuente for x in par]
+        if a is not None:
+            where.append("c.despues = ? COLLATE NOCASE")
+            params.append(a)
+        if de is not None:
+            where.append("c.antes = ? COLLATE NOCASE")
+            params.append(de)
+        elif not incluir_primera:
+            where.append("c.version > 1")
+        if desde:
+            where.append("c.momento >= ?")
+            params.append(desde)
+        if fuente:
+            where.append("c.fuente = ?")
+            params.append(fuente)
+        return self._filas(
+            "SELECT c.fuente, c.clave, e.nombre, e.fecha_inicio, e.ciudad, c.momento, c.antes, c.despues "
+            "FROM cambios c JOIN eventos e ON e.fuente = c.fuente AND e.clave = c.clave "
+            f"WHERE {' AND '.join(where)} ORDER BY c.momento, c.id", params)
+
+    def anulados(self, desde: Optional[str] = None) -> List[Dict]:
+        """
+        Eventos que han pasado a Anulado (o que ya se vieron anulados la primera vez).
+
+        >>> h = Historial(":memory:")
+        >>> _ = h.registrar("rsce", [{"URL": "https://rsce.es/e/1", "Nombre": "A", "Estado": "Activo"}])
+        >>> _ = h.registrar("rsce", [{"URL": "https://rsce.es/e/1", "Nombre": "A", "Estado": "Anulado"}])
+        >>> _ = h.registrar("flow", [{"id": "f1", "nombre": "B", "estado": "Anulado"}])
+        >>> [(f["fuente"], f["clave"], f["antes"], f["despues"]) for f in h.anulados()]
+        [('rsce', 'https://rsce.es/e/1', 'Activo', 'Anulado'), ('flow', 'f1', None, 'Anulado')]
+        """
+        return self.transiciones("estado", a="Anulado", desde=desde, incluir_primera=True)
+
+    def historia(self, fuente: str, clave: str) -> List[Dict]:
+        return self._filas("SELECT version, momento, campo, antes, despues FROM cambios "
+                           "WHERE fuente = ? AND clave = ? ORDER BY version, campo", (fuente, clave))
+
+    def buscar(self, desde: Optional[str] = None, hasta: Optional[str] = None, estado: Optional[str] = None,
+               ciudad: Optional[str] = None, fuente: Optional[str] = None, limite: int = 1000) -> List[Dict]:
+        """Estado actual de los eventos por fecha de inicio, estado y ciudad."""
+        where, params = [], []
+        for cond, v in (("fecha_inicio >= ?", desde), ("fecha_inicio <= ?", hasta), ("estado = ?", estado),
+                        ("ciudad = ?", ciudad), ("fuente = ?", fuente)):
+            if v:
+                where.append(cond)
+                params.append(v)
+        sql = ("SELECT fuente, clave, nombre, fecha_inicio, fecha_fin, ciudad, estado, estado_tipo, url, "
+               "version, primera_vez, ultima_vez FROM eventos")
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        return self._filas(sql + " ORDER BY fecha_inicio LIMIT ?", (*params, limite))
+
+
+# =========================
+# CLI
+# =========================
+def _imprimir(filas: List[Dict]):
+    for f in filas:
+        print(" | ".join("" if v is None else str(v) for v in f.values()))
+    print(f"({len(filas)} filas)")
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Consultas al historial de eventos")
+    ap.add_argument("--db", default=os.getenv("HISTORIAL_PATH", RUTA))
+    sub = ap.add_subparsers(dest="orden", required=True)
+    t = sub.add_parser("transiciones", help="cambios de un campo")
+    t.add_argument("campo")
+    t.add_argument("--a")
+    t.add_argument("--de")
+    t.add_argument("--desde")
+    t.add_argument("--fuente", choices=tuple(FUENTES))
+    a = sub.add_parser("anulados")
+    a.add_argument("--desde")
+    e = sub.add_parser("evento", help="todas las versiones de un evento")
+    e.add_argument("fuente", choices=tuple(FUENTES))
+    e.add_argument("clave")
+    b = sub.add_parser("buscar", help="estado actual por fecha/estado/ciudad")
+    for opt in ("--desde", "--hasta", "--estado", "--ciudad"):
+        b.add_argument(opt)
+    b.add_argument("--fuente", choices=tuple(FUENTES))
+    b.add_argument("--limite", type=int, default=1000)
+    args = ap.parse_args(argv)
+
+    t0 = time.perf_counter()
+    with Historial(args.db) as h:
+        if args.orden == "transiciones":
+            filas = h.transiciones(args.campo, args.a, args.de, args.desde, args.fuente)
+        elif args.orden == "anulados":
+            filas = h.anulados(args.desde)
+        elif args.orden == "evento":
+            filas = h.historia(args.fuente, args.clave)
+        else:
+            filas = h.buscar(args.desde, args.hasta, args.estado, args.ciudad, args.fuente, args.limite)
+    _imprimir(filas)
+    print(f"[DEBUG] {(time.perf_counter() - t0) * 1000:.1f} ms")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
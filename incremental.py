@@ -0,0 +1,127 @@
+# -*- coding: utf-8 -*-
+"""
+Scraping incremental: snapshot de la ejecución anterior, parada temprana y delta.
+
+- El snapshot es la salida completa de la ejecución anterior, indexada por
+  clave (id del evento en FlowAgility, URL en RSCE) y en el orden del listado.
+- `Detector` cuenta la racha de eventos ya conocidos y sin cambios; al
+  llegar a `umbral` el scraper deja de hacer scroll / paginar.
+- `fusionar` completa lo recién visto con la parte del snapshot que no se ha
+  llegado a recorrer, y `calcular_delta` da los nuevos, eliminados y cambiados.
+
+La parada temprana solo es exacta en listados por orden de alta (lo nuevo
+primero). El de RSCE, y en general los ordenados por fecha del evento, pueden
+tener altas y anulaciones en páginas posteriores; por eso cada `cada`
+ejecuciones incrementales se hace una pasada completa (`toca_completa` /
+`anotar_pasada`, con la cuenta en <snapshot>.incremental.json).
+"""
+
+import os, json, datetime
+from collections import OrderedDict
+
+
+def cargar_snapshot(path, clave, convertir=None):
+    """OrderedDict clave -> registro con el contenido de `path` (vacío si no existe)."""
+    try:
+        with open(path, encoding="utf-8") as f:
+            registros = json.load(f)
+    except (OSError, ValueError):
+        return OrderedDict()
+    if convertir:
+        registros = [convertir(r) for r in registros]
+    return OrderedDict((clave(r), r) for r in registros if clave(r))
+
+
+def guardar_json(path, datos):
+    """Escritura atómica (temporal + rename) para no dejar un snapshot a medias."""
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(datos, f, ensure_ascii=False, indent=2)
+    os.replace(tmp, path)
+
+
+def _cuenta_path(path):
+    return path + ".incremental.json"
+
+
+def toca_completa(path, cada):
+    """True si ya van `cada` ejecuciones con parada temprana desde la última pasada completa."""
+    if cada <= 0:
+        return False
+    try:
+        with open(_cuenta_path(path), encoding="utf-8") as f:
+            return int(json.load(f).get("seguidas", 0)) >= cada
+    except (OSError, ValueError, AttributeError):
+        return False
+
+
+def anotar_pasada(path, completa):
+    """Tras guardar el snapshot: reinicia la cuenta si se recorrió todo el listado."""
+    try:
+        with open(_cuenta_path(path), encoding="utf-8") as f:
+            seguidas = int(json.load(f).get("seguidas", 0))
+    except (OSError, ValueError, AttributeError):
+        seguidas = 0
+    guardar_json(_cuenta_path(path), {"seguidas": 0 if completa else seguidas + 1,
+                                      "fecha": datetime.datetime.now().isoformat(timespec="seconds")})
+
+
+class Detector:
+    def __init__(self, snapshot, clave, umbral=20):
+        self.snapshot = snapshot
+        self.clave = clave
+        self.umbral = umbral
+        self.racha = 0
+        self.vistos = set()
+
+    def ver(self, registro):
+        k = self.clave(registro)
+        if not k or k in self.vistos:
+            return
+        self.vistos.add(k)
+        if self.snapshot.get(k) == registro:
+            self.racha += 1
+        else:
+            self.racha = 0
+
+    def ver_todos(self, registros):
+        for r in registros:
+            self.ver(r)
+        return self.parar
+
+    @property
+    def parar(self):
+        return bool(self.snapshot) and self.racha >= self.umbral
+
+
+def fusionar(snapshot, vistos, clave, parcial=True):
+    """
+    vistos + los registros del snapshot posteriores al último que se ha
+    vuelto a ver (la parte del listado que no se recorrió). Los anteriores que
+    no aparecen ya no están en la web y quedan fuera (eliminados). Con
+    parcial=False (se recorrió todo) no se arrastra nada del snapshot.
+    """
+    if not parcial:
+        return list(vistos)
+    claves_vistas = {clave(r) for r in vistos}
+    orden = list(snapshot)
+    ultimo = max((i for i, k in enumerate(orden) if k in claves_vistas), default=len(orden) - 1)
+    resto = [snapshot[k] for k in orden[ultimo + 1:] if k not in claves_vistas]
+    return list(vistos) + resto
+
+
+def calcular_delta(snapshot, actuales, clave):
+    actual = OrderedDict((clave(r), r) for r in actuales if clave(r))
+    return {
+        "generado": datetime.datetime.now().isoformat(timespec="seconds"),
+        "nuevos": [r for k, r in actual.items() if k not in snapshot],
+        "eliminados": [r for k, r in snapshot.items() if k not in actual],
+        "cambiados": [
+            {"clave": k, "antes": snapshot[k], "despues": r}
+            for k, r in actual.items() if k in snapshot and snapshot[k] != r
+        ],
+    }
+
+
+def resumen(delta):
+    return f"{len(delta['nuevos'])} nuevos, {len(delta['eliminados'])} eliminados, {len(delta['cambiados'])} cambiados"
@@ -0,0 +1,138 @@
+# -*- coding: utf-8 -*-
+"""
+Medición por fases de una ejecución de scraping.
+
+    med = Medidor("rsce")
+    with med.fase("parseo") as f:
+        eventos = parsear(html)
+        f.sumar(items=len(eventos), bytes=len(html))
+    med.guardar(carpeta)
+
+Cada fase acumula duración, nº de veces, items y bytes (una fase que se
+repite por página se suma). Al terminar se escriben:
+- <carpeta>/metricas_<trabajo>.json: informe de la ejecución
+- <carpeta_prom>/agileventos_<trabajo>.prom: formato textfile de Prometheus
+  (node_exporter --collector.textfile.directory), escrito con rename atómico
+
+Las fases pueden anidarse (p. ej. 'parseo' dentro de 'scroll'): cada una
+cuenta su propio tiempo de reloj.
+"""
+
+import os, json, time, datetime, threading
+from contextlib import contextmanager
+
+PREFIJO = "agileventos"
+
+
+class Fase:
+    __slots__ = ("nombre", "items", "bytes")
+
+    def __init__(self, nombre):
+        self.nombre = nombre
+        self.items = 0
+        self.bytes = 0
+
+    def sumar(self, items: int = 0, bytes: int = 0):
+        self.items += items
+        self.bytes += bytes
+
+
+class Medidor:
+    def __init__(self, trabajo: str):
+        self.trabajo = trabajo
+        self.inicio = time.time()
+        self._t0 = time.perf_counter()
+        self.fases = {}   # nombre -> {"segundos", "veces", "items", "bytes"} (en orden de aparición)
+        self.extra = {}
+        self.ok = True
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def fase(self, nombre: str):
+        f = Fase(nombre)
+        t0 = time.perf_counter()
+        try:
+            yield f
+        finally:
+            self._anotar(nombre, time.perf_counter() - t0, f.items, f.bytes)
+
+    def _anotar(self, nombre, segundos, items=0, bytes=0):
+        with self._lock:
+            a = self.fases.setdefault(nombre, {"segundos": 0.0, "veces": 0, "items": 0, "bytes": 0})
+            a["segundos"] += segundos
+            a["veces"] += 1
+            a["items"] += items
+            a["bytes"] += bytes
+
+    def iterar(self, nombre: str, iterable, bytes_de=None):
+        """Recorre un generador midiendo el tiempo de cada next() (p. ej. descarga de páginas)."""
+        it = iter(iterable)
+        try:
+            while True:
+                t0 = time.perf_counter()
+                try:
+                    x = next(it)
+                except StopIteration:
+                    return
+                self._anotar(nombre, time.perf_counter() - t0, 1, bytes_de(x) if bytes_de else 0)
+                yield x
+        finally:
+            # al cortar el bucle (break) se cierra también el generador de origen
+            if hasattr(it, "close"):
+                it.close()
+
+    # ---------- Informes ----------
+    def informe(self) -> dict:
+        return {
+            "trabajo": self.trabajo,
+            "inicio": datetime.datetime.fromtimestamp(self.inicio).isoformat(timespec="seconds"),
+            "segundos": round(time.perf_counter() - self._t0, 3),
+            "ok": self.ok,
+            "fases": {k: dict(v, segundos=round(v["segundos"], 3)) for k, v in self.fases.items()},
+            **({"extra": self.extra} if self.extra else {}),
+        }
+
+    def prometheus(self, informe: dict = None) -> str:
+        inf = informe or self.informe()
+        t = inf["trabajo"]
+        lineas = []
+
+        def metrica(nombre, tipo, ayuda, valores):
+            lineas.append(f"# HELP {PREFIJO}_{nombre} {ayuda}")
+            lineas.append(f"# TYPE {PREFIJO}_{nombre} {tipo}")
+            for etiquetas, v in valores:
+                et = ",".join(f'{k}="{v_}"' for k, v_ in etiquetas.items())
+                lineas.append(f"{PREFIJO}_{nombre}{{{et}}} {v}")
+
+        fases = inf["fases"].items()
+        metrica("ejecucion_segundos", "gauge", "Duración total de la última ejecución",
+                [({"trabajo": t}, inf["segundos"])])
+        metrica("ejecucion_ok", "gauge", "1 si la última ejecución terminó sin error",
+                [({"trabajo": t}, int(inf["ok"]))])
+        metrica("ejecucion_timestamp_segundos", "gauge", "Inicio de la última ejecución (epoch)",
+                [({"trabajo": t}, round(self.inicio, 3))])
+        for campo, ayuda in (("segundos", "Tiempo acumulado por fase"), ("veces", "Veces que se ejecutó la fase"),
+                             ("items", "Elementos procesados por fase"), ("bytes", "Bytes procesados por fase")):
+            metrica(f"fase_{campo}", "gauge", ayuda,
+                    [({"trabajo": t, "fase": k}, v[campo]) for k, v in fases])
+        return "\n".join(lineas) + "\n"
+
+    def guardar(self, carpeta: str, carpeta_prom: str = None) -> dict:
+        inf = self.informe()
+        _escribir(os.path.join(carpeta, f"metricas_{self.trabajo}.json"),
+                  json.dumps(inf, ensure_ascii=False, indent=2))
+        _escribir(os.path.join(carpeta_prom or carpeta, f"{PREFIJO}_{self.trabajo}.prom"),
+                  self.prometheus(inf))
+        return inf
+
+    def resumen(self) -> str:
+        return " | ".join(f"{k} {v['segundos']:.2f}s" + (f" ({v['items']})" if v["items"] else "")
+                          for k, v in self.fases.items())
+
+
+def _escribir(path, texto):
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        f.write(texto)
+    os.replace(tmp, path)
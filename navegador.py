@@ -0,0 +1,279 @@
+# -*- coding: utf-8 -*-
+"""
+Arranque rápido de Chrome para los scrapers.
+
+- Resolución de chromedriver cacheada entre ejecuciones: CHROMEDRIVER_PATH si
+  está definido; si no, la ruta que devolvió webdriver_manager la última vez
+  (~/.cache/agileventos/chromedriver.json, válida DRIVER_TTL_DIAS días y
+  mientras el binario exista). Solo se vuelve a consultar la red al caducar.
+- Navegador caliente opcional: un Chrome de larga duración escuchando en
+  --remote-debugging-port (CHROME_DEBUG_PORT, 9222 por defecto) al que ambos
+  scrapers se adjuntan con `debuggerAddress` en lugar de lanzar uno nuevo.
+  Cada sesión adjunta trabaja en una pestaña propia y al liberar solo se
+  cierra esa pestaña; el navegador sigue vivo para la siguiente. Las opciones
+  de arranque del scraper no se pueden aplicar a un Chrome ya lanzado: el
+  user agent se fija en la pestaña por CDP y el resto se avisa en el log.
+- Tiempos de arranque (frío = Chrome nuevo, caliente = adjuntado) en TIEMPOS.
+
+Uso:
+  python navegador.py --lanzar            # deja un Chrome caliente en 9222
+  python navegador.py --medir             # compara arranque en frío y en caliente
+  NAVEGADOR_COMPARTIDO=1 python Calendario.py
+"""
+
+import os, sys, json, time, shutil, socket, argparse, subprocess
+from typing import Callable, Optional, Tuple
+
+CACHE_DIR       = os.path.join(os.path.expanduser("~"), ".cache", "agileventos")
+DRIVER_CACHE    = os.path.join(CACHE_DIR, "chromedriver.json")
+PERFIL_CALIENTE = os.path.join(CACHE_DIR, "chrome-perfil")
+DRIVER_TTL_DIAS = float(os.getenv("DRIVER_TTL_DIAS", "7"))
+DEBUG_PORT      = int(os.getenv("CHROME_DEBUG_PORT", "9222"))
+COMPARTIDO      = os.getenv("NAVEGADOR_COMPARTIDO", "").strip().lower() in ("1", "true", "yes", "y", "si", "sí")
+CHROME_BINARIOS = ("google-chrome", "google-chrome-stable", "chromium", "chromium-browser", "chrome")
+
+TIEMPOS = {}          # "driver", "frio", "caliente" -> segundos de la última vez
+_RUTA_DRIVER = None   # memo en proceso
+
+
+# =========================
+# chromedriver
+# =========================
+def _leer_cache() -> Optional[str]:
+    try:
+        with open(DRIVER_CACHE, encoding="utf-8") as f:
+            datos = json.load(f)
+    except (OSError, ValueError):
+        return None
+    ruta = datos.get("ruta")
+    if not ruta or not os.access(ruta, os.X_OK):
+        return None
+    if time.time() - datos.get("resuelto", 0) > DRIVER_TTL_DIAS * 86400:
+        return None
+    return ruta
+
+
+def _guardar_cache(ruta: str):
+    try:
+        os.makedirs(CACHE_DIR, exist_ok=True)
+        tmp = DRIVER_CACHE + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"ruta": ruta, "resuelto": time.time()}, f)
+        os.replace(tmp, DRIVER_CACHE)
+    except OSError:
+        pass
+
+
+def ruta_chromedriver() -> Optional[str]:
+    """
+    Ruta del chromedriver, resolviéndolo por red solo si hace falta.
+    None = que lo resuelva Selenium Manager (selenium >= 4.6).
+    """
+    global _RUTA_DRIVER
+    if _RUTA_DRIVER:
+        return _RUTA_DRIVER
+    t0 = time.perf_counter()
+    ruta = os.getenv("CHROMEDRIVER_PATH") or _leer_cache()
+    if not ruta:
+        try:
+            from webdriver_manager.chrome import ChromeDriverManager
+            ruta = ChromeDriverManager().install()
+            _guardar_cache(ruta)
+        except ImportError:
+            ruta = None
+    _RUTA_DRIVER = ruta
+    TIEMPOS["driver"] = time.perf_counter() - t0
+    return ruta
+
+
+def servicio():
+    from selenium.webdriver.chrome.service import Service
+    ruta = ruta_chromedriver()
+    return Service(ruta) if ruta else Service()
+
+
+# =========================
+# Navegador caliente
+# =========================
+def escuchando(puerto: int = DEBUG_PORT, host: str = "127.0.0.1") -> bool:
+    try:
+        with socket.create_connection((host, puerto), timeout=0.3):
+            return True
+    except OSError:
+        return False
+
+
+def binario_chrome() -> Optional[str]:
+    if os.getenv("CHROME_BIN"):
+        return os.getenv("CHROME_BIN")
+    for nombre in CHROME_BINARIOS:
+        ruta = shutil.which(nombre)
+        if ruta:
+            return ruta
+    return None
+
+
+ARGS_CALIENTE = ["--no-first-run", "--no-default-browser-check", "--no-sandbox",
+                 "--disable-dev-shm-usage", "--disable-gpu", "--window-size=1920,1080",
+                 "--disable-blink-features=AutomationControlled"]
+
+
+def lanzar_caliente(puerto: int = DEBUG_PORT, headless: bool = True, espera_s: float = 20):
+    """Arranca un Chrome de larga duración con depuración remota (Popen, o None si ya había uno)."""
+    if escuchando(puerto):
+        return None
+    chrome = binario_chrome()
+    if not chrome:
+        raise RuntimeError("No se encuentra Chrome/Chromium (define CHROME_BIN)")
+    os.makedirs(PERFIL_CALIENTE, exist_ok=True)
+    args = [chrome, f"--remote-debugging-port={puerto}", f"--user-data-dir={PERFIL_CALIENTE}",
+            *ARGS_CALIENTE, "about:blank"]
+    if headless:
+        args.insert(1, "--headless=new")
+    proc = subprocess.Popen(args, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    limite = time.monotonic() + espera_s
+    while not escuchando(puerto):
+        if proc.poll() is not None or time.monotonic() > limite:
+            proc.kill()
+            raise RuntimeError(f"Chrome no abrió el puerto {puerto}")
+        time.sleep(0.1)
+    return proc
+
+
+def adjuntar(puerto: int = DEBUG_PORT):
+    """WebDriver sobre el Chrome que escucha en `puerto`, en una pestaña nueva."""
+    from selenium import webdriver
+    from selenium.webdriver.chrome.options import Options
+
+    opts = Options()
+    opts.debugger_address = f"127.0.0.1:{puerto}"
+    d = webdriver.Chrome(service=servicio(), options=opts)
+    d.switch_to.new_window("tab")
+    d._agileventos_adjunto = True
+    return d
+
+
+def _opciones_en_caliente(d, opts):
+    """Lo que se puede de `opts` en la pestaña adjunta (user agent por CDP); avisa del resto."""
+    args = list(getattr(opts, "arguments", None) or [])
+    ua = next((a.split("=", 1)[1] for a in args if a.startswith("--user-agent=")), None)
+    if ua:
+        try:
+            d.execute_cdp_cmd("Network.setUserAgentOverride", {"userAgent": ua})
+        except Exception as e:
+            print(f"[WARN] No se pudo fijar el user agent en la pestaña: {e}")
+    ya = set(ARGS_CALIENTE) | {"--headless=new"}
+    ignoradas = [a for a in args if a not in ya and not a.startswith(("--user-agent=", "--remote-debugging-port"))]
+    if "prefs" in (getattr(opts, "experimental_options", None) or {}):
+        ignoradas.append("prefs")
+    if ignoradas:
+        print(f"[WARN] Navegador compartido: no se aplican las opciones de arranque {' '.join(ignoradas)} "
+              f"(son las de lanzar_caliente)")
+
+
+# =========================
+# API para los scrapers
+# =========================
+def obtener(crear_opciones: Callable, puerto: int = DEBUG_PORT, compartido: bool = None) -> Tuple[object, str]:
+    """
+    (driver, modo). Con navegador compartido y un Chrome escuchando en `puerto`
+    se adjunta ('caliente'; de crear_opciones() solo se aplica el user agent);
+    si no, lanza uno nuevo con crear_opciones() ('frio').
+    """
+    compartido = COMPARTIDO if compartido is None else compartido
+    t0 = time.perf_counter()
+    if compartido and escuchando(puerto):
+        try:
+            d = adjuntar(puerto)
+            _opciones_en_caliente(d, crear_opciones())
+            TIEMPOS["caliente"] = time.perf_counter() - t0
+            return d, "caliente"
+        except Exception as e:
+            print(f"[WARN] No se pudo adjuntar al navegador en {puerto}: {e} -> lanzo uno nuevo")
+    from selenium import webdriver
+    opts = crear_opciones()
+    # un Chrome propio nunca en el puerto fijo: otro scraper se adjuntaría a él
+    # (y nuestro quit() se lo cerraría) o chocaría con el Chrome compartido
+    args = getattr(opts, "arguments", None)
+    if args is not None:
+        args[:] = [a for a in args if not a.startswith("--remote-debugging-port")]
+    d = webdriver.Chrome(service=servicio(), options=opts)
+    TIEMPOS["frio"] = time.perf_counter() - t0
+    return d, "frio"
+
+
+def liberar(d):
+    """quit() del driver propio; en uno adjuntado solo se cierra su pestaña y el chromedriver."""
+    if getattr(d, "_agileventos_adjunto", False):
+        try:
+            d.close()
+        finally:
+            d.service.stop()
+    else:
+        d.quit()
+
+
+def resumen() -> str:
+    partes = [f"{k} {v:.2f}s" for k, v in TIEMPOS.items()]
+    return ", ".join(partes) or "sin datos"
+
+
+# =========================
+# CLI
+# =========================
+def _opciones_headless():
+    from selenium.webdriver.chrome.options import Options
+    opts = Options()
+    for a in ("--headless=new", "--no-sandbox", "--disable-dev-shm-usage", "--disable-gpu"):
+        opts.add_argument(a)
+    return opts
+
+
+def medir(puerto: int = DEBUG_PORT, repeticiones: int = 3):
+    """Arranque en frío vs adjuntar a un Chrome caliente (lanzado aquí si no lo hay)."""
+    ruta_chromedriver()
+    print(f"chromedriver: {_RUTA_DRIVER or 'Selenium Manager'} ({TIEMPOS['driver']:.2f}s)")
+    frio, caliente = [], []
+    for _ in range(repeticiones):
+        d, _modo = obtener(_opciones_headless, puerto, compartido=False)
+        liberar(d)
+        frio.append(TIEMPOS["frio"])
+    proc = lanzar_caliente(puerto)
+    try:
+        for _ in range(repeticiones):
+            d, _modo = obtener(_opciones_headless, puerto, compartido=True)
+            liberar(d)
+            caliente.append(TIEMPOS.get("caliente", float("nan")))
+    finally:
+        if proc:
+            proc.terminate()
+    print(f"frío:     {min(frio):.2f}s (mejor de {repeticiones})")
+    print(f"caliente: {min(caliente):.2f}s (mejor de {repeticiones})")
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Chrome caliente y caché de chromedriver")
+    ap.add_argument("--lanzar", action="store_true", help="arranca un Chrome de larga duración y espera")
+    ap.add_argument("--medir", action="store_true", help="mide arranque en frío y en caliente")
+    ap.add_argument("--puerto", type=int, default=DEBUG_PORT)
+    ap.add_argument("--con-ventana", action="store_true", help="Chrome caliente sin headless")
+    args = ap.parse_args(argv)
+    if args.medir:
+        medir(args.puerto)
+    elif args.lanzar:
+        proc = lanzar_caliente(args.puerto, headless=not args.con_ventana)
+        if proc is None:
+            print(f"Ya hay un navegador escuchando en {args.puerto}")
+            return
+        print(f"🌍 Chrome caliente en 127.0.0.1:{args.puerto} (pid {proc.pid}); Ctrl+C para cerrarlo")
+        try:
+            proc.wait()
+        except KeyboardInterrupt:
+            proc.terminate()
+    else:
+        print(f"chromedriver: {ruta_chromedriver() or 'Selenium Manager'} ({resumen()})")
+        print(f"navegador en {args.puerto}: {'sí' if escuchando(args.puerto) else 'no'}")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,364 @@
+# -*- coding: utf-8 -*-
+"""
+Punto de entrada único para los scrapers: una pasada (cron / GitHub Actions)
+o demonio de larga duración.
+
+- Trabajos: "flow" (01_eventosprox.py), "rsce" (Calendario.py) y, opcional,
+  "fusion" (fusion.py) tras cada scraping correcto. Cada uno con su intervalo.
+- Concurrencia: los trabajos que tocan se lanzan a la vez en un pool de
+  WORKERS hilos; un mismo trabajo nunca se solapa consigo mismo, ni dentro
+  del proceso ni con otro proceso (cerrojo en ~/.cache/agileventos/<trabajo>.lock,
+  p. ej. un cron manual mientras corre el demonio).
+- Recursos compartidos: un Chrome caliente (navegador.py) en el que cada
+  scraper abre su pestaña, y una sola capa de geocoding (nomenclátor
+  cargado una vez, misma caché SQLite y un único cliente de Nominatim con su
+  límite de peticiones para todas las ejecuciones de RSCE).
+- Configuración en un solo sitio: --config planificador.json con, por
+  trabajo, intervalo y ajustes (variables de entorno de Calendario.py o
+  constantes de 01_eventosprox.py).
+- Tras un fallo el trabajo se reintenta antes de su intervalo, con espera
+  exponencial (REINTENTO_MIN_S, 2x, ... hasta el intervalo). La última
+  ejecución de cada trabajo se guarda en ESTADO: al reiniciar el demonio no
+  se repite lo que se hizo hace poco.
+
+Ejemplo de planificador.json:
+  {"trabajos": {"rsce": {"intervalo": "6h", "ajustes": {"WORKERS": 4, "MOTOR": "http"}},
+                "flow": {"intervalo": "12h", "ajustes": {"ENRICH": true}}},
+   "fusion": {"salida": "output/calendario_unificado.json"}, "workers": 2, "navegador_compartido": true}
+
+Uso:
+  python planificador.py                          # una pasada de todo, en paralelo
+  python planificador.py --trabajos rsce --fusion
+  python planificador.py --demonio --intervalo rsce=6h flow=12h
+  python planificador.py --demonio --config planificador.json
+"""
+
+import os, re, sys, json, time, signal, argparse, datetime, threading, contextlib
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional
+
+try:
+    import fcntl
+except ImportError:   # Windows: solo el cerrojo en proceso
+    fcntl = None
+
+import navegador
+
+CACHE_DIR = os.path.join(os.path.expanduser("~"), ".cache", "agileventos")
+ESTADO = os.getenv("PLANIFICADOR_ESTADO", os.path.join(CACHE_DIR, "planificador.json"))
+INTERVALOS = {"rsce": "6h", "flow": "12h"}
+REINTENTO_MIN_S = 300.0
+
+_ENTORNO_LOCK = threading.Lock()   # os.environ es del proceso: los ajustes de RSCE se aplican de uno en uno
+
+
+def segundos(texto) -> float:
+    """'90', '30m', '6h', '1d' -> segundos."""
+    m = re.fullmatch(r"\s*(\d+(?:\.\d+)?)\s*([smhd]?)\s*", str(texto))
+    if not m:
+        raise ValueError(f"intervalo no válido: {texto!r}")
+    return float(m.group(1)) * {"": 1, "s": 1, "m": 60, "h": 3600, "d": 86400}[m.group(2)]
+
+
+def log(msg: str):
+    # una sola escritura: las líneas de trabajos simultáneos no se mezclan
+    sys.stdout.write(f"[{time.strftime('%H:%M:%S')}] [planificador] {msg}\n")
+    sys.stdout.flush()
+
+
+@contextlib.contextmanager
+def _entorno(valores: Dict):
+    previo = {k: os.environ.get(k) for k in valores}
+    os.environ.update({k: str(int(v) if isinstance(v, bool) else v) for k, v in valores.items()})
+    try:
+        yield
+    finally:
+        for k, v in previo.items():
+            if v is None:
+                os.environ.pop(k, None)
+            else:
+                os.environ[k] = v
+
+
+# =========================
+# Recursos compartidos
+# =========================
+class Recursos:
+    """Navegador caliente y geocoding compartidos entre trabajos y ejecuciones."""
+
+    def __init__(self, navegador_compartido: bool = True):
+        self.navegador_compartido = navegador_compartido
+        self.chrome = None           # Popen del Chrome caliente si lo hemos lanzado nosotros
+        self.geocode = None          # RateLimiter de Nominatim (lo crea la primera ejecución de RSCE)
+        self.lock = threading.Lock()
+
+    def abrir(self):
+        if self.navegador_compartido:
+            if navegador.binario_chrome() is None and not navegador.escuchando():
+                log("Sin Chrome: cada scraper usará su motor sin navegador o lanzará el suyo")
+            else:
+                try:
+                    self.chrome = navegador.lanzar_caliente()
+                    navegador.COMPARTIDO = True
+                    log(f"Chrome caliente en el puerto {navegador.DEBUG_PORT}"
+                        + (" (ya estaba abierto)" if self.chrome is None else ""))
+                except Exception as e:
+                    log(f"[WARN] No se pudo lanzar el Chrome compartido: {e}")
+        import gazetteer
+        gazetteer.cargar()   # una sola carga por proceso para RSCE y fusión
+
+    def cerrar(self):
+        if self.chrome is not None:
+            self.chrome.terminate()
+            try:
+                self.chrome.wait(10)
+            except Exception:
+                self.chrome.kill()
+            self.chrome = None
+
+
+# =========================
+# Trabajos
+# =========================
+def _trabajo_rsce(ajustes: Dict, rec: Recursos) -> bool:
+    from Calendario import RSCEAgilityCSV
+    with _ENTORNO_LOCK, _entorno(ajustes):
+        scraper = RSCEAgilityCSV()   # lee la configuración del entorno solo aquí
+    with rec.lock:
+        if rec.geocode is not None:
+            scraper._geocode = rec.geocode
+    try:
+        # una pasada con páginas sin descargar no cuenta como buena
+        return scraper.run() is not False
+    finally:
+        with rec.lock:
+            rec.geocode = getattr(scraper, "_geocode", None) or rec.geocode
+
+
+def _trabajo_flow(ajustes: Dict, rec: Recursos) -> bool:
+    import replay
+    flow = replay.cargar_flow()
+    for k, v in ajustes.items():
+        if not hasattr(flow, k):
+            raise ValueError(f"01_eventosprox.py no tiene el ajuste {k}")
+        setattr(flow, k, v)
+    return flow.main() is not False
+
+
+def _trabajo_fusion(ajustes: Dict, rec: Recursos) -> bool:
+    import fusion
+    args = [f"--{k}={v}" for k, v in ajustes.items()]
+    return fusion.main(args) == 0
+
+
+FUNCIONES: Dict[str, Callable[[Dict, Recursos], bool]] = {
+    "rsce": _trabajo_rsce,
+    "flow": _trabajo_flow,
+    "fusion": _trabajo_fusion,
+}
+
+
+class Trabajo:
+    def __init__(self, nombre: str, intervalo_s: float, ajustes: Optional[Dict] = None):
+        self.nombre = nombre
+        self.funcion = FUNCIONES[nombre]
+        self.intervalo_s = intervalo_s
+        self.ajustes = dict(ajustes or {})
+        self.proximo = 0.0          # time.time() de la próxima ejecución
+        self.fallos = 0
+        self.ultima: Optional[Dict] = None
+        self.en_curso = threading.Lock()
+
+    def __repr__(self):
+        return f"Trabajo({self.nombre}, cada {self.intervalo_s / 3600:g} h)"
+
+
+@contextlib.contextmanager
+def _cerrojo_fichero(nombre: str):
+    """Cerrojo entre procesos; cede False si otro proceso ya ejecuta el trabajo."""
+    if fcntl is None:
+        yield True
+        return
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    with open(os.path.join(CACHE_DIR, f"{nombre}.lock"), "w") as f:
+        try:
+            fcntl.flock(f, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            yield False
+            return
+        try:
+            f.write(str(os.getpid()))
+            f.flush()
+            yield True
+        finally:
+            fcntl.flock(f, fcntl.LOCK_UN)
+
+
+class Planificador:
+    def __init__(self, trabajos: List[Trabajo], workers: int = 2, fusion=False,
+                 navegador_compartido: bool = True, estado: str = ESTADO):
+        self.trabajos = {t.nombre: t for t in trabajos}
+        self.workers = max(1, workers)
+        # fusion: True o los argumentos de fusion.py ({"flow": ..., "rsce": ..., "salida": ...})
+        self.fusion = Trabajo("fusion", 0, fusion if isinstance(fusion, dict) else None) if fusion else None
+        # el Chrome compartido solo si algún trabajo lo va a usar
+        usa_chrome = any(t.nombre == "flow" or str(t.ajustes.get("MOTOR", os.getenv("MOTOR", "auto"))).lower() != "http"
+                         for t in trabajos)
+        self.recursos = Recursos(navegador_compartido and usa_chrome)
+        self.estado = estado
+        self.parar = threading.Event()
+        self.resultados: Dict[str, bool] = {}
+
+    # ---------- estado persistente ----------
+    def _cargar_estado(self):
+        try:
+            with open(self.estado, encoding="utf-8") as f:
+                datos = json.load(f)
+        except (OSError, ValueError):
+            return
+        for nombre, t in self.trabajos.items():
+            u = datos.get(nombre)
+            if u and u.get("ok"):
+                t.ultima = u
+                t.proximo = u["inicio"] + t.intervalo_s
+
+    def _guardar_estado(self):
+        datos = {n: t.ultima for n, t in self.trabajos.items() if t.ultima}
+        try:
+            os.makedirs(os.path.dirname(os.path.abspath(self.estado)), exist_ok=True)
+            tmp = self.estado + ".tmp"
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(datos, f, ensure_ascii=False, indent=2)
+            os.replace(tmp, self.estado)
+        except OSError as e:
+            log(f"[WARN] No se pudo guardar el estado: {e}")
+
+    # ---------- ejecución ----------
+    def ejecutar(self, t: Trabajo) -> Optional[bool]:
+        """Una ejecución de `t`; None si ya estaba en marcha (aquí o en otro proceso)."""
+        # la fusión espera a la anterior (flow y rsce pueden acabar a la vez); el resto se salta
+        if not t.en_curso.acquire(blocking=t is self.fusion):
+            log(f"{t.nombre}: sigue en marcha, me salto esta vez")
+            return None
+        try:
+            with _cerrojo_fichero(t.nombre) as mio:
+                if not mio:
+                    log(f"{t.nombre}: otro proceso lo está ejecutando, me salto esta vez")
+                    return None
+                inicio = time.time()
+                log(f"{t.nombre}: inicio")
+                try:
+                    ok = bool(t.funcion(t.ajustes, self.recursos))
+                except Exception as e:
+                    log(f"[WARN] {t.nombre}: {type(e).__name__}: {e}")
+                    ok = False
+                duracion = time.time() - inicio
+                t.ultima = {"inicio": inicio, "fin": time.time(), "ok": ok,
+                            "hora": datetime.datetime.fromtimestamp(inicio).isoformat(timespec="seconds"),
+                            "segundos": round(duracion, 1)}
+                if ok:
+                    t.fallos = 0
+                    t.proximo = inicio + t.intervalo_s
+                else:
+                    t.fallos += 1
+                    t.proximo = time.time() + min(t.intervalo_s or REINTENTO_MIN_S,
+                                                  REINTENTO_MIN_S * 2 ** (t.fallos - 1))
+                log(f"{t.nombre}: {'ok' if ok else 'FALLO'} en {duracion:.1f}s")
+                self.resultados[t.nombre] = ok
+                if t.nombre != "fusion":
+                    self._guardar_estado()
+                    if ok and self.fusion:
+                        self.ejecutar(self.fusion)
+                return ok
+        finally:
+            t.en_curso.release()
+
+    def una_pasada(self) -> bool:
+        """Todos los trabajos una vez, en paralelo. True si todos fueron bien."""
+        self.recursos.abrir()
+        try:
+            with ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="trabajo") as pool:
+                list(pool.map(self.ejecutar, self.trabajos.values()))
+        finally:
+            self.recursos.cerrar()
+        return all(self.resultados.get(n) for n in self.trabajos)
+
+    def demonio(self):
+        """Bucle hasta SIGTERM/SIGINT: lanza cada trabajo cuando le toca."""
+        self._cargar_estado()
+        self.recursos.abrir()
+        for sig in (signal.SIGTERM, signal.SIGINT):
+            try:
+                signal.signal(sig, lambda *a: self.parar.set())
+            except ValueError:   # fuera del hilo principal
+                pass
+        ahora = time.time()
+        for t in self.trabajos.values():
+            espera = max(0.0, t.proximo - ahora)
+            log(f"{t.nombre}: cada {t.intervalo_s / 3600:g} h, primera en {espera / 60:.0f} min")
+        pool = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="trabajo")
+        try:
+            while not self.parar.is_set():
+                ahora = time.time()
+                for t in self.trabajos.values():
+                    if t.proximo <= ahora and not t.en_curso.locked():
+                        # hasta que termine no vuelve a tocar: próxima provisional un intervalo más tarde
+                        t.proximo = ahora + max(t.intervalo_s, REINTENTO_MIN_S)
+                        pool.submit(self.ejecutar, t)
+                siguiente = min(t.proximo for t in self.trabajos.values())
+                self.parar.wait(min(60.0, max(1.0, siguiente - time.time())))
+            log("Parando: espero a los trabajos en marcha")
+        finally:
+            pool.shutdown(wait=True)
+            self.recursos.cerrar()
+
+
+# =========================
+# Configuración y CLI
+# =========================
+def construir(config: Dict, nombres: Optional[List[str]] = None, intervalos: Optional[Dict] = None) -> List[Trabajo]:
+    conf = config.get("trabajos", {})
+    nombres = nombres or list(conf) or list(INTERVALOS)
+    trabajos = []
+    for n in nombres:
+        if n not in INTERVALOS:
+            raise ValueError(f"trabajo desconocido: {n} (hay {', '.join(INTERVALOS)})")
+        c = conf.get(n, {})
+        intervalo = (intervalos or {}).get(n) or c.get("intervalo") or INTERVALOS[n]
+        trabajos.append(Trabajo(n, segundos(intervalo), c.get("ajustes")))
+    return trabajos
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Ejecuta los scrapers una vez o como demonio")
+    ap.add_argument("--config", help="JSON con trabajos, intervalos y ajustes")
+    ap.add_argument("--trabajos", nargs="+", choices=tuple(INTERVALOS))
+    ap.add_argument("--intervalo", nargs="+", default=[], metavar="TRABAJO=INTERVALO", help="p. ej. rsce=6h flow=12h")
+    ap.add_argument("--demonio", action="store_true", help="no termina: relanza cada trabajo según su intervalo")
+    ap.add_argument("--fusion", action="store_true", help="fusion.py tras cada scraping correcto")
+    ap.add_argument("--workers", type=int, help="trabajos simultáneos (por defecto 2)")
+    ap.add_argument("--sin-navegador-compartido", action="store_true", help="cada scraper lanza su propio Chrome")
+    args = ap.parse_args(argv)
+
+    config = {}
+    if args.config:
+        with open(args.config, encoding="utf-8") as f:
+            config = json.load(f)
+    intervalos = dict(i.split("=", 1) for i in args.intervalo)
+    trabajos = construir(config, args.trabajos, intervalos)
+    plan = Planificador(
+        trabajos,
+        workers=args.workers or config.get("workers", 2),
+        fusion=config.get("fusion") or args.fusion,
+        navegador_compartido=not args.sin_navegador_compartido and config.get("navegador_compartido", True),
+    )
+    if args.demonio:
+        plan.demonio()
+        return 0
+    ok = plan.una_pasada()
+    log("Resumen: " + ", ".join(f"{n} {'ok' if v else 'FALLO'}" for n, v in plan.resultados.items()))
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,406 @@
+# -*- coding: utf-8 -*-
+"""
+Publicación por FTPS de los ficheros generados (p. ej. eventos_prox.csv).
+
+- Se salta la subida si el contenido no ha cambiado: se calcula una huella
+  de los registros normalizados (filas del CSV o elementos del JSON, sin
+  espacios sobrantes y ordenados, así que reordenar el listado no cuenta
+  como cambio) y se compara con la última publicada. La última huella se
+  guarda en local (~/.cache/agileventos/publicado.json) y, para runners
+  efímeros, en el servidor junto al fichero (<nombre>.publicado.json).
+- Una sola conexión FTPS (PROT P, binario, PASV ignorando la IP que anuncia
+  el servidor, como --ftp-skip-pasv-ip de curl) para todos los ficheros.
+- Subida a <nombre>.part y rename al final: el fichero publicado nunca queda
+  a medias. Si la conexión se corta, se reconecta y se continúa desde lo
+  que ya tenga el .part (REST). Junto al .part se deja <nombre>.part.json con
+  el sha256 y el tamaño del fichero del que salió: solo se reanuda si ambos
+  coinciden con el local (si no, el .part se borra y se sube desde cero), y
+  tras reanudar se exige hash remoto igual; sin hash, se vuelve a subir entero.
+- Verificación sin descargar: SIZE y, si el servidor lo anuncia en FEAT,
+  HASH SHA-256 (o XSHA256 / XMD5).
+
+Configuración (env): FTP_SERVER, FTP_USERNAME, FTP_PASSWORD, FTP_REMOTE_DIR,
+FTP_PORT (21), FTP_TLS (1; 0 = FTP plano, solo para pruebas).
+
+Uso:
+  python publicar.py eventos_prox.csv --destino Competiciones/ListadoEventos
+  python publicar.py output/*.json --forzar
+
+Prueba en local (pip install pyftpdlib):
+  python -m pyftpdlib -p 2121 -w -u u -P p -d /tmp/ftp &
+  FTP_SERVER=127.0.0.1 FTP_PORT=2121 FTP_USERNAME=u FTP_PASSWORD=p FTP_TLS=0 python publicar.py eventos_prox.csv
+"""
+
+import os, io, sys, csv, json, time, ftplib, hashlib, argparse, datetime
+from typing import Dict, Iterable, List, Optional
+
+CACHE_DIR = os.path.join(os.path.expanduser("~"), ".cache", "agileventos")
+ESTADO    = os.getenv("PUBLICAR_ESTADO") or os.path.join(CACHE_DIR, "publicado.json")
+SUFIJO_TMP    = ".part"
+SUFIJO_MARCA  = ".part.json"
+SUFIJO_HUELLA = ".publicado.json"
+BLOQUE = 64 * 1024
+
+
+class PublicacionError(Exception):
+    pass
+
+
+# =========================
+# Huellas
+# =========================
+def sha256(path: str) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for b in iter(lambda: f.read(BLOQUE), b""):
+            h.update(b)
+    return h.hexdigest()
+
+
+def _registros(path: str) -> Optional[List[str]]:
+    """Registros normalizados (texto canónico por registro), o None si el formato no se conoce."""
+    ext = os.path.splitext(path)[1].lower()
+    if ext == ".csv":
+        with open(path, newline="", encoding="utf-8-sig") as f:
+            filas = [[c.strip() for c in fila] for fila in csv.reader(f) if any(c.strip() for c in fila)]
+        if not filas:
+            return []
+        cabecera, cuerpo = filas[0], filas[1:]
+        return [json.dumps(cabecera, ensure_ascii=False)] + sorted(json.dumps(f, ensure_ascii=False) for f in cuerpo)
+    if ext in (".json", ".jsonl"):
+        with open(path, encoding="utf-8") as f:
+            if ext == ".json":
+                datos = json.load(f)
+                datos = datos if isinstance(datos, list) else [datos]
+            else:
+                datos = [json.loads(l) for l in f if l.strip()]
+        return sorted(json.dumps(r, ensure_ascii=False, sort_keys=True) for r in datos)
+    return None
+
+
+def huella(path: str) -> str:
+    """sha256 de los registros normalizados (o de los bytes si no es CSV/JSON)."""
+    regs = _registros(path)
+    if regs is None:
+        return sha256(path)
+    h = hashlib.sha256()
+    for r in regs:
+        h.update(r.encode("utf-8") + b"\n")
+    return h.hexdigest()
+
+
+def _leer_estado() -> Dict:
+    try:
+        with open(ESTADO, encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def _guardar_estado(estado: Dict):
+    try:
+        os.makedirs(os.path.dirname(ESTADO), exist_ok=True)
+        tmp = ESTADO + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(estado, f, ensure_ascii=False, indent=2)
+        os.replace(tmp, ESTADO)
+    except OSError:
+        pass
+
+
+# =========================
+# Conexión FTPS
+# =========================
+class _FTP_TLS(ftplib.FTP_TLS):
+    # Algunos servidores exigen reutilizar la sesión TLS de control en el canal de datos
+    def ntransfercmd(self, cmd, rest=None):
+        conn, size = ftplib.FTP.ntransfercmd(self, cmd, rest)
+        if self._prot_p:
+            conn = self.context.wrap_socket(conn, server_hostname=self.host, session=self.sock.session)
+        return conn, size
+
+
+class Publicador:
+    """Una conexión para todas las subidas; se reabre sola si el servidor la corta."""
+
+    def __init__(self, host: str, usuario: str, clave: str, directorio: str = "",
+                 puerto: int = 21, tls: bool = True, timeout: float = 60, reintentos: int = 3):
+        self.host, self.usuario, self.clave = host, usuario, clave
+        self.directorio = directorio
+        self.puerto, self.tls, self.timeout, self.reintentos = puerto, tls, timeout, reintentos
+        self.ftp = None
+        self.feat = set()
+
+    # ---------- conexión ----------
+    def conectar(self):
+        ftp = _FTP_TLS(timeout=self.timeout) if self.tls else ftplib.FTP(timeout=self.timeout)
+        ftp.connect(self.host, self.puerto)
+        ftp.login(self.usuario, self.clave)
+        if self.tls:
+            ftp.prot_p()
+        ftp.set_pasv(True)
+        ftp.voidcmd("TYPE I")
+        self.ftp = ftp
+        self.feat = self._features()
+        if self.directorio:
+            self._cd(self.directorio)
+        return self
+
+    def _features(self) -> set:
+        try:
+            resp = self.ftp.sendcmd("FEAT")
+        except ftplib.all_errors:
+            return set()
+        return {l.strip().split(" ")[0].upper() for l in resp.splitlines()[1:-1] if l.strip()}
+
+    def _cd(self, ruta: str):
+        """cd creando los directorios que falten (como --ftp-create-dirs)."""
+        if ruta.startswith("/"):
+            self.ftp.cwd("/")
+        for parte in [p for p in ruta.split("/") if p]:
+            try:
+                self.ftp.cwd(parte)
+            except ftplib.error_perm:
+                self.ftp.mkd(parte)
+                self.ftp.cwd(parte)
+
+    def _reconectar(self):
+        self.close()
+        time.sleep(1)
+        self.conectar()
+
+    def close(self):
+        if self.ftp is not None:
+            try:
+                self.ftp.quit()
+            except ftplib.all_errors:
+                try:
+                    self.ftp.close()
+                except Exception:
+                    pass
+            self.ftp = None
+
+    def __enter__(self):
+        return self.conectar()
+
+    def __exit__(self, *exc):
+        self.close()
+
+    # ---------- operaciones ----------
+    def tamano(self, nombre: str) -> Optional[int]:
+        try:
+            return self.ftp.size(nombre)
+        except ftplib.error_perm:
+            return None
+
+    def leer(self, nombre: str) -> Optional[bytes]:
+        buf = io.BytesIO()
+        try:
+            self.ftp.retrbinary(f"RETR {nombre}", buf.write)
+        except ftplib.error_perm:
+            return None
+        return buf.getvalue()
+
+    def _renombrar(self, origen: str, destino: str):
+        try:
+            self.ftp.rename(origen, destino)
+        except ftplib.error_perm:
+            # servidores que no sobrescriben con RNTO
+            try:
+                self.ftp.delete(destino)
+            except ftplib.error_perm:
+                pass
+            self.ftp.rename(origen, destino)
+
+    def subir_bytes(self, datos: bytes, nombre: str):
+        """Fichero pequeño (huella): .part + rename, sin reanudación."""
+        self.ftp.storbinary(f"STOR {nombre}{SUFIJO_TMP}", io.BytesIO(datos), BLOQUE)
+        self._renombrar(nombre + SUFIJO_TMP, nombre)
+
+    def _borrar(self, nombre: str):
+        try:
+            self.ftp.delete(nombre)
+        except ftplib.error_perm:
+            pass
+
+    def _leer_marca(self, nombre: str) -> Optional[Dict]:
+        crudo = self.leer(nombre + SUFIJO_MARCA)
+        try:
+            return json.loads(crudo) if crudo else None
+        except ValueError:
+            return None
+
+    def _inicio(self, nombre: str, marca: Dict, reanudar: bool) -> int:
+        """Bytes del .part que se pueden conservar: solo si salió de este mismo fichero."""
+        tmp = nombre + SUFIJO_TMP
+        ya = self.tamano(tmp) or 0
+        if ya and reanudar and ya <= marca["bytes"] and self._leer_marca(nombre) == marca:
+            return ya
+        if ya:
+            if reanudar:
+                print(f"[WARN] {tmp} no corresponde a este fichero (o es más grande); se sube desde cero")
+            self._borrar(tmp)
+        self.subir_bytes(json.dumps(marca).encode("utf-8"), nombre + SUFIJO_MARCA)
+        return 0
+
+    def _enviar(self, local: str, nombre: str, marca: Dict, reanudar: bool = True) -> int:
+        """STOR a <nombre>.part con reintentos; devuelve desde qué byte se reanudó (0 si no)."""
+        tmp = nombre + SUFIJO_TMP
+        total = marca["bytes"]
+        reanudado = 0
+        for intento in range(1, self.reintentos + 1):
+            try:
+                ya = self._inicio(nombre, marca, reanudar)
+                if ya:
+                    reanudado = ya
+                    print(f"[DEBUG] Reanudando {tmp} desde {ya} de {total} bytes")
+                if ya < total or total == 0:
+                    with open(local, "rb") as f:
+                        f.seek(ya)
+                        self.ftp.storbinary(f"STOR {tmp}", f, BLOQUE, rest=ya or None)
+                break
+            except (OSError, EOFError, ftplib.error_temp, ftplib.error_reply) as e:
+                if intento == self.reintentos:
+                    raise PublicacionError(f"Subida de {nombre} fallida tras {intento} intentos: {e}")
+                print(f"[WARN] Subida de {nombre} cortada ({e}); reintento {intento}/{self.reintentos - 1}")
+                self._reconectar()
+        if self.tamano(tmp) != total:
+            raise PublicacionError(f"{tmp}: tamaño remoto {self.tamano(tmp)} != local {total}")
+        return reanudado
+
+    def subir(self, local: str, nombre: str = None) -> Dict:
+        """Sube `local` como `nombre` (.part + REST + rename) y lo verifica. Devuelve un resumen."""
+        nombre = nombre or os.path.basename(local)
+        tmp = nombre + SUFIJO_TMP
+        marca = {"sha256": sha256(local), "bytes": os.path.getsize(local)}
+        reanudado = self._enviar(local, nombre, marca)
+        if reanudado:
+            # un .part empalmado solo se da por bueno con hash remoto igual
+            try:
+                metodo = self.verificar(local, tmp)
+            except PublicacionError as e:
+                metodo = str(e)
+            if not metodo.startswith("size+"):
+                print(f"[WARN] {tmp} reanudado sin verificar por hash ({metodo}); se sube entero")
+                self._enviar(local, nombre, marca, reanudar=False)
+                reanudado = 0
+        self._renombrar(tmp, nombre)
+        self._borrar(nombre + SUFIJO_MARCA)
+        metodo = self.verificar(local, nombre)
+        return {"bytes": marca["bytes"], "reanudado": reanudado, "verificado": metodo}
+
+    def hash_remoto(self, nombre: str):
+        """(algoritmo, hex) con el comando que anuncie el servidor, o (None, None)."""
+        try:
+            if "HASH" in self.feat:
+                self.ftp.sendcmd("OPTS HASH SHA-256")
+                # 213 SHA-256 0-1234 9f86d0... nombre
+                partes = self.ftp.sendcmd(f"HASH {nombre}").split()
+                return "sha256", partes[3].lower()
+            for cmd, alg in (("XSHA256", "sha256"), ("XMD5", "md5")):
+                if cmd in self.feat:
+                    return alg, self.ftp.sendcmd(f"{cmd} {nombre}").split()[-1].lower()
+        except (ftplib.all_errors + (IndexError,)) as e:
+            print(f"[WARN] El servidor anuncia hash remoto pero falló: {e}")
+        return None, None
+
+    def verificar(self, local: str, nombre: str) -> str:
+        """SIZE siempre y hash remoto si lo hay; excepción si no coinciden."""
+        total = os.path.getsize(local)
+        remoto = self.tamano(nombre)
+        if remoto != total:
+            raise PublicacionError(f"{nombre}: tamaño remoto {remoto} != local {total}")
+        alg, hx = self.hash_remoto(nombre)
+        if alg is None:
+            return "size"
+        h = hashlib.new(alg)
+        with open(local, "rb") as f:
+            for b in iter(lambda: f.read(BLOQUE), b""):
+                h.update(b)
+        if h.hexdigest() != hx:
+            raise PublicacionError(f"{nombre}: {alg} remoto {hx} != local {h.hexdigest()}")
+        return f"size+{alg}"
+
+
+# =========================
+# Publicación con salto si no hay cambios
+# =========================
+def _clave(pub: Publicador, nombre: str) -> str:
+    return f"{pub.host}:{pub.puerto}/{pub.directorio.strip('/')}/{nombre}"
+
+
+def publicar(ficheros: Iterable[str], pub: Publicador, forzar: bool = False) -> List[Dict]:
+    """
+    Publica cada fichero si su huella cambió. La conexión se abre solo si hace
+    falta y se reutiliza para todos. Devuelve un resumen por fichero.
+    """
+    estado = _leer_estado()
+    resultados = []
+    try:
+        for local in ficheros:
+            nombre = os.path.basename(local)
+            clave = _clave(pub, nombre)
+            h = huella(local)
+            res = {"fichero": local, "huella": h}
+            if not forzar and estado.get(clave, {}).get("huella") == h:
+                print(f"⏭️  {nombre}: sin cambios desde la última publicación (estado local)")
+                resultados.append(dict(res, accion="sin_cambios"))
+                continue
+            if pub.ftp is None:
+                pub.conectar()
+            previo = None
+            if not forzar:
+                crudo = pub.leer(nombre + SUFIJO_HUELLA)
+                try:
+                    previo = json.loads(crudo) if crudo else None
+                except ValueError:
+                    previo = None
+            if previo and previo.get("huella") == h and pub.tamano(nombre) == previo.get("bytes"):
+                print(f"⏭️  {nombre}: sin cambios desde la última publicación (huella remota)")
+                estado[clave] = previo
+                resultados.append(dict(res, accion="sin_cambios"))
+                continue
+            t0 = time.perf_counter()
+            info = pub.subir(local, nombre)
+            registro = {"huella": h, "sha256": sha256(local), "bytes": info["bytes"],
+                        "publicado": datetime.datetime.now().isoformat(timespec="seconds")}
+            pub.subir_bytes(json.dumps(registro, ensure_ascii=False).encode("utf-8"), nombre + SUFIJO_HUELLA)
+            estado[clave] = registro
+            print(f"📤 {nombre}: {info['bytes']} bytes en {time.perf_counter() - t0:.2f}s "
+                  f"(verificado: {info['verificado']}" + (f", reanudado desde {info['reanudado']}" if info["reanudado"] else "") + ")")
+            resultados.append(dict(res, accion="subido", **info))
+    finally:
+        pub.close()
+        _guardar_estado(estado)
+    return resultados
+
+
+def desde_entorno(destino: str = "") -> Publicador:
+    host = os.getenv("FTP_SERVER")
+    if not host:
+        raise PublicacionError("Falta FTP_SERVER")
+    base = os.getenv("FTP_REMOTE_DIR", "")
+    directorio = "/".join(p.strip("/") for p in (base, destino) if p.strip("/"))
+    if base.startswith("/"):
+        directorio = "/" + directorio
+    return Publicador(host, os.getenv("FTP_USERNAME", "anonymous"), os.getenv("FTP_PASSWORD", ""),
+                      directorio, int(os.getenv("FTP_PORT", "21")),
+                      os.getenv("FTP_TLS", "1").strip().lower() not in ("0", "false", "no", "n"))
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Publica ficheros por FTPS si han cambiado")
+    ap.add_argument("ficheros", nargs="+")
+    ap.add_argument("--destino", default="", help="subcarpeta bajo FTP_REMOTE_DIR (se crea si falta)")
+    ap.add_argument("--forzar", action="store_true", help="sube aunque la huella no haya cambiado")
+    args = ap.parse_args(argv)
+    try:
+        publicar(args.ficheros, desde_entorno(args.destino), args.forzar)
+    except (PublicacionError,) + ftplib.all_errors as e:
+        print(f"❌ Publicación fallida: {e}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
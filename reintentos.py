@@ -0,0 +1,195 @@
+# -*- coding: utf-8 -*-
+"""
+Reintentos, cortacircuitos y puntos de control para los scrapers.
+
+- `Politica`: reintentos con espera exponencial y jitter
+  (base * factor^(n-1), acotada por `maximo`).
+- `Circuito`: cortacircuitos por fallos consecutivos. Con `umbral` fallos
+  seguidos se abre y las llamadas siguientes fallan en el acto
+  (CircuitoAbierto) hasta pasar `enfriamiento_s`; entonces se deja pasar un
+  intento de prueba. Evita martillear una web caída página tras página.
+- `Checkpoint`: progreso de una ejecución en un JSONL de solo añadir
+  (páginas hechas con sus eventos, geocodificaciones, eventos cosechados...).
+  Si la ejecución falla, la siguiente lo carga y sigue donde se quedó; si
+  termina bien, se borra. Una firma (URL, filtros) descarta los checkpoints
+  de otra configuración y `caducidad_s` los demasiado viejos (un fallo de la
+  ejecución nocturna se reanuda a la noche siguiente, uno de hace una semana no).
+"""
+
+import os, json, time, random, threading
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+
+class CircuitoAbierto(Exception):
+    pass
+
+
+class Circuito:
+    """Compartido entre los hilos que descargan páginas: el estado va bajo un lock."""
+
+    def __init__(self, umbral: int = 5, enfriamiento_s: float = 60.0, nombre: str = ""):
+        self.umbral = umbral
+        self.enfriamiento_s = enfriamiento_s
+        self.nombre = nombre
+        self.fallos = 0
+        self.abierto_desde: Optional[float] = None
+        self._lock = threading.Lock()
+
+    @property
+    def abierto(self) -> bool:
+        return self.abierto_desde is not None
+
+    def permitir(self):
+        """Lanza CircuitoAbierto si no toca intentar todavía."""
+        with self._lock:
+            if self.abierto_desde is None:
+                return
+            if time.monotonic() - self.abierto_desde < self.enfriamiento_s:
+                nombre = f" {self.nombre}" if self.nombre else ""
+                raise CircuitoAbierto(f"circuito{nombre} abierto tras {self.fallos} fallos seguidos")
+            # semiabierto: pasa un intento; si falla se vuelve a abrir
+            self.abierto_desde = None
+            self.fallos = self.umbral - 1
+
+    def exito(self):
+        with self._lock:
+            self.fallos = 0
+            self.abierto_desde = None
+
+    def fallo(self):
+        with self._lock:
+            self.fallos += 1
+            if self.fallos >= self.umbral:
+                self.abierto_desde = time.monotonic()
+
+
+class Politica:
+    def __init__(self, intentos: int = 4, base_s: float = 1.0, factor: float = 2.0,
+                 maximo_s: float = 30.0, jitter: float = 0.25,
+                 excepciones: Tuple[type, ...] = (Exception,), dormir: Callable[[float], None] = time.sleep):
+        self.intentos = max(1, intentos)
+        self.base_s, self.factor, self.maximo_s, self.jitter = base_s, factor, maximo_s, jitter
+        self.excepciones = excepciones
+        self.dormir = dormir
+        self.reintentos = 0
+
+    def espera(self, intento: int) -> float:
+        """Segundos antes del intento `intento + 1`."""
+        t = min(self.maximo_s, self.base_s * self.factor ** (intento - 1))
+        return t * (1 + random.uniform(-self.jitter, self.jitter))
+
+    def ejecutar(self, fn: Callable[[int], Any], que: str = "operación", circuito: Optional[Circuito] = None,
+                 log: Callable[[str], None] = print):
+        """
+        Llama a fn(intento) (1, 2, ...) hasta que no lance una de `excepciones`.
+        Tras el último intento relanza el error. CircuitoAbierto no se reintenta.
+        """
+        for intento in range(1, self.intentos + 1):
+            if circuito:
+                circuito.permitir()
+            try:
+                r = fn(intento)
+            except CircuitoAbierto:
+                raise
+            except self.excepciones as e:
+                if circuito:
+                    circuito.fallo()
+                if intento == self.intentos or (circuito and circuito.abierto):
+                    raise
+                t = self.espera(intento)
+                self.reintentos += 1
+                log(f"[WARN] {que}: {type(e).__name__}: {e} -> reintento {intento}/{self.intentos - 1} en {t:.1f}s")
+                self.dormir(t)
+            else:
+                if circuito:
+                    circuito.exito()
+                return r
+
+
+class Checkpoint:
+    """
+    JSONL de solo añadir: una cabecera con la firma y la hora de creación y,
+    después, líneas {"pagina": p, "eventos": [...]} o {"datos": clave, "valores": {...}}.
+    Una última línea a medias (corte a mitad de escritura) se ignora.
+    """
+
+    def __init__(self, path: str, firma: Dict, caducidad_s: Optional[float] = None):
+        self.path = path
+        self.firma = json.loads(json.dumps(firma, default=str))
+        self.caducidad_s = caducidad_s
+        self.paginas: Dict[int, List] = {}
+        self.datos: Dict[str, Dict] = {}
+        self.reanudado = False
+        self._cargar()
+        os.makedirs(os.path.dirname(os.path.abspath(path)) or ".", exist_ok=True)
+        if self.reanudado:
+            self._f = open(path, "a", encoding="utf-8")
+        else:
+            self._f = open(path, "w", encoding="utf-8")
+            self._linea({"firma": self.firma, "creado": time.time()})
+
+    def _cargar(self):
+        try:
+            with open(self.path, "rb") as f:
+                contenido = f.read()
+        except OSError:
+            return
+        registros, valido = [], 0
+        for linea in contenido.split(b"\n")[:-1]:   # sin "\n" final = línea a medias
+            try:
+                registros.append(json.loads(linea))
+            except ValueError:
+                break
+            valido += len(linea) + 1
+        if not registros or registros[0].get("firma") != self.firma:
+            return
+        edad = time.time() - float(registros[0].get("creado") or 0)
+        if self.caducidad_s is not None and edad > self.caducidad_s:
+            return
+        for r in registros[1:]:
+            if "pagina" in r:
+                self.paginas[int(r["pagina"])] = r.get("eventos") or []
+            elif "datos" in r:
+                self.datos.setdefault(r["datos"], {}).update(r.get("valores") or {})
+        # se sigue añadiendo justo detrás de la última línea completa
+        with open(self.path, "r+b") as f:
+            f.truncate(valido)
+        self.reanudado = True
+
+    def _linea(self, obj):
+        self._f.write(json.dumps(obj, ensure_ascii=False, default=str) + "\n")
+        self._f.flush()
+
+    @property
+    def hechas(self) -> set:
+        return set(self.paginas)
+
+    def pagina(self, p: int, eventos: Iterable):
+        eventos = list(eventos)
+        self.paginas[int(p)] = eventos
+        self._linea({"pagina": int(p), "eventos": eventos})
+
+    def anotar(self, clave: str, valores: Dict):
+        if valores:
+            self.datos.setdefault(clave, {}).update(valores)
+            self._linea({"datos": clave, "valores": valores})
+
+    def eventos(self) -> List:
+        """Eventos de todas las páginas guardadas, en orden de página."""
+        return [e for p in sorted(self.paginas) for e in self.paginas[p]]
+
+    def cerrar(self):
+        """Deja el checkpoint en disco para la siguiente ejecución."""
+        if not self._f.closed:
+            self._f.close()
+
+    def terminar(self):
+        """Ejecución completa: el checkpoint ya no hace falta."""
+        self.cerrar()
+        try:
+            os.remove(self.path)
+        except OSError:
+            pass
+
+    def resumen(self) -> str:
+        return f"{len(self.paginas)} páginas, {len(self.eventos())} eventos"
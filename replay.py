@@ -0,0 +1,163 @@
+# -*- coding: utf-8 -*-
+"""
+Modo replay: ejecuta los parsers de ambos scrapers sin lanzar Chrome.
+
+Alimenta `extract_events` / `extract_event_details` (01_eventosprox.py) y
+`RSCEAgilityCSV._extraer_eventos` (Calendario.py) con HTML guardado en disco
+(ver SAVE_HTML / GUARDAR_HTML en cada script) o generado sintéticamente.
+
+Uso:
+  python replay.py flow output/events_page.html
+  python replay.py rsce resultados_agility/pagina_1.html
+  python replay.py flow --sintetico 500 --salida /tmp/flow.json
+"""
+
+import os, sys, json, random, argparse, contextlib, importlib.util
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+_FLOW = None
+_RSCE = None
+
+
+def cargar_flow():
+    """Importa 01_eventosprox.py (el nombre empieza por dígito, no vale `import`)."""
+    global _FLOW
+    if _FLOW is None:
+        spec = importlib.util.spec_from_file_location("eventosprox", os.path.join(HERE, "01_eventosprox.py"))
+        mod = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(mod)
+        _FLOW = mod
+    return _FLOW
+
+
+def cargar_rsce():
+    """Devuelve una instancia de RSCEAgilityCSV (solo se usa su parser)."""
+    global _RSCE
+    if _RSCE is None:
+        from Calendario import RSCEAgilityCSV
+        _RSCE = RSCEAgilityCSV()
+    return _RSCE
+
+
+# =========================
+# HTML sintético
+# =========================
+CIUDADES = [
+    ("Madrid", "Madrid"), ("Barcelona", "Barcelona"), ("Valencia", "Valencia"),
+    ("Sevilla", "Sevilla"), ("Zaragoza", "Zaragoza"), ("Málaga", "Málaga"),
+    ("Alhaurín de la Torre", "Málaga"), ("Getafe", "Madrid"), ("Lleida", "Lleida"),
+    ("Oviedo", "Asturias"), ("Vigo", "Pontevedra"), ("Logroño", "La Rioja"),
+]
+MESES_ES = ["enero", "febrero", "marzo", "abril", "mayo", "junio", "julio",
+            "agosto", "septiembre", "octubre", "noviembre", "diciembre"]
+MESES_EN = ["Jan", "Feb", "Mar", "Apr", "May", "Jun", "Jul", "Aug", "Sep", "Oct", "Nov", "Dec"]
+ESTADOS_FLOW = ["Inscribirse", "En curso", "Cerrado"]
+
+
+def card_flow(i: int, rnd: random.Random) -> str:
+    """Una tarjeta `div.group.mb-6` con la misma estructura que FlowAgility."""
+    ciudad, prov = CIUDADES[i % len(CIUDADES)]
+    d, m, y = rnd.randint(1, 26), rnd.randint(0, 11), rnd.choice((2025, 2026))
+    uid = "%08x-0000-4000-8000-%012x" % (i, rnd.getrandbits(48))
+    estado = ESTADOS_FLOW[i % len(ESTADOS_FLOW)]
+    return f"""<div class="group mb-6" id="{uid}"><div class="flex flex-row">
+<div class="relative flex flex-col w-full pt-1 pb-6 mb-4 border-b border-gray-300">
+<div class="text-xs">{d} - {d + 2} {MESES_EN[m]} {y}</div>
+<div class="text-xs">RSCE</div>
+<div class="font-caption text-lg text-black truncate -mt-1">Prueba de Agility {i}</div>
+<div class="text-xs mb-0.5 mt-0.5">Club Agility {ciudad}</div>
+<div class="text-xs">{ciudad} / {prov} / Spain</div>
+</div>
+<div class="text-md">🇪🇸</div>
+<div class="py-1 px-4 border text-white font-bold rounded text-sm">{estado}</div>
+<a href="/zone/events/{uid}/info/general">Info</a>
+<a href="/zone/events/{uid}/participants_list">Participantes</a>
+<a href="/zone/events/{uid}/runs">Mangas</a>
+</div></div>
+"""
+
+
+def item_rsce(i: int, rnd: random.Random) -> str:
+    """Un bloque `div.jet-listing-grid__item` con la estructura del listado RSCE."""
+    ciudad, _ = CIUDADES[i % len(CIUDADES)]
+    d, m, y = rnd.randint(1, 26), rnd.randint(0, 11), rnd.choice((2025, 2026))
+    badge = '<span class="jet-listing-dynamic-terms__link">Anulado</span>' if i % 17 == 0 else ""
+    return f"""<div class="jet-listing-grid__item jet-listing-dynamic-post-{i}">
+<h2 class="elementor-heading-title"><a href="https://www.rsce.es/evento/agility-{i}/">Concurso Agility {i}</a></h2>
+<div class="jet-listing-dynamic-field__content">{d} de {MESES_ES[m]} de {y}</div>
+<div class="jet-listing-dynamic-field__content">{d + 1} de {MESES_ES[m]} de {y}</div>
+<div class="elementor-icon-box-title"><span>{ciudad}</span></div>
+{badge}
+</div>
+"""
+
+
+def html_flow(n: int, seed: int = 0) -> str:
+    rnd = random.Random(seed)
+    cards = "".join(card_flow(i, rnd) for i in range(n))
+    return f"<html><head><title>Events</title></head><body><main>{cards}</main></body></html>"
+
+
+def html_rsce(n: int, seed: int = 0, pagina: int = 1, total_paginas: int = 1) -> str:
+    rnd = random.Random(seed)
+    items = "".join(item_rsce(i, rnd) for i in range(n))
+    links = "".join(
+        f'<div class="jet-filters-pagination__link">{p}</div>' for p in range(1, total_paginas + 1)
+    )
+    if pagina < total_paginas:
+        links += '<div class="jet-filters-pagination__link next">Siguiente</div>'
+    return (
+        "<html><body><div class=\"jet-listing-grid\">"
+        f"<div class=\"jet-listing-grid__items\">{items}</div></div>"
+        f"<div class=\"jet-filters-pagination\">{links}</div></body></html>"
+    )
+
+
+# =========================
+# Replay
+# =========================
+def parsear_flow(html: str):
+    return cargar_flow().extract_events(html)
+
+
+def parsear_rsce(html: str):
+    # _extraer_eventos imprime ejemplos de depuración: que no ensucien la salida JSON
+    with contextlib.redirect_stdout(sys.stderr):
+        return cargar_rsce()._extraer_eventos(html)
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Replay offline de los parsers")
+    ap.add_argument("fuente", choices=("flow", "rsce"))
+    ap.add_argument("ficheros", nargs="*", help="HTML guardados")
+    ap.add_argument("--sintetico", type=int, default=0, help="genera N tarjetas en vez de leer ficheros")
+    ap.add_argument("--salida", help="JSON de salida (por defecto stdout)")
+    args = ap.parse_args(argv)
+
+    if args.sintetico:
+        paginas = [html_flow(args.sintetico) if args.fuente == "flow" else html_rsce(args.sintetico)]
+    elif args.ficheros:
+        paginas = []
+        for path in args.ficheros:
+            with open(path, encoding="utf-8") as f:
+                paginas.append(f.read())
+    else:
+        ap.error("indica ficheros HTML o --sintetico N")
+
+    parser = parsear_flow if args.fuente == "flow" else parsear_rsce
+    eventos = []
+    for html in paginas:
+        eventos.extend(parser(html))
+
+    out = json.dumps(eventos, ensure_ascii=False, indent=2)
+    if args.salida:
+        with open(args.salida, "w", encoding="utf-8") as f:
+            f.write(out)
+        print(f"[REPLAY] {len(eventos)} eventos -> {args.salida}", file=sys.stderr)
+    else:
+        print(out)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,167 @@
+# -*- coding: utf-8 -*-
+"""
+Motor HTTP para el listado JetEngine de la RSCE (sin navegador).
+
+- Descarga la página del listado (URL_BASE con filtros /jsf/...) con un
+  requests.Session con pool de conexiones y reintentos.
+- Lee `JetSmartFilterSettings` del HTML y pide el resto de páginas con la
+  misma llamada AJAX que hace la paginación (`action=jet_smart_filters`).
+- Devuelve HTML que se pasa tal cual a RSCEAgilityCSV._extraer_eventos.
+
+Cualquier respuesta inesperada lanza RSCEHttpError para que Calendario.py
+vuelva al motor Selenium.
+"""
+
+import re, json, datetime
+from typing import Dict, Optional, Tuple
+from urllib.parse import urljoin, urlsplit
+
+USER_AGENT = ("Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 "
+              "(KHTML, like Gecko) Chrome/139.0.0.0 Safari/537.36")
+
+JSF_RE      = re.compile(r"/jsf/([^/:]+):([^/]+)/(.*)$")
+SETTINGS_RE = re.compile(r"JetSmartFilterSettings\s*=\s*")
+DATE_RE     = re.compile(r"(!date:)\d{4}\.\d{1,2}\.\d{1,2}-")
+ITEM_MARK   = "jet-listing-grid__item"
+
+
+class RSCEHttpError(Exception):
+    pass
+
+
+def url_desde_hoy(url: str, hoy: Optional[datetime.date] = None) -> str:
+    """Equivalente HTTP del filtro UI 'Desde=hoy': reescribe `!date:AAAA.M.D-` en la URL jsf."""
+    hoy = hoy or datetime.date.today()
+    return DATE_RE.sub(lambda m: f"{m.group(1)}{hoy.year}.{hoy.month}.{hoy.day}-", url)
+
+
+def parse_jsf(url: str) -> Tuple[Optional[str], Optional[str], Dict[str, str]]:
+    """
+    '/jsf/jet-engine:eventocuadro/tax/tipos-de-disciplinas:38/meta/fecha-evento!date:2025.1.1-/'
+    -> ('jet-engine', 'eventocuadro',
+        {'_tax_query_tipos-de-disciplinas': '38', '_meta_query_fecha-evento|date': '2025.1.1-'})
+    """
+    m = JSF_RE.search(urlsplit(url).path)
+    if not m:
+        return None, None, {}
+    provider, query_id, rest = m.groups()
+    parts = [p for p in rest.split("/") if p]
+    query = {}
+    for kind, value in zip(parts[::2], parts[1::2]):
+        key, _, val = value.partition(":")
+        if kind == "tax":
+            query[f"_tax_query_{key}"] = val
+        elif kind == "meta":
+            name, _, typ = key.partition("!")
+            query[f"_meta_query_{name}" + (f"|{typ}" if typ else "")] = val
+    return provider, query_id, query
+
+
+def _php_form(data, prefix=""):
+    """Aplana dicts/listas anidados al formato `a[b][c]=v` que espera admin-ajax.php."""
+    out = []
+    items = data.items() if isinstance(data, dict) else enumerate(data)
+    for k, v in items:
+        key = f"{prefix}[{k}]" if prefix else str(k)
+        if isinstance(v, (dict, list)):
+            out.extend(_php_form(v, key))
+        elif v is not None:
+            out.append((key, "true" if v is True else "false" if v is False else str(v)))
+    return out
+
+
+class RSCEHttp:
+    def __init__(self, url_base: str, timeout: float = 20, pool: int = 8, retries: int = 3):
+        import requests
+        from requests.adapters import HTTPAdapter
+        from urllib3.util.retry import Retry
+
+        self.url_base = url_base
+        self.timeout = timeout
+        self.session = requests.Session()
+        self.session.headers.update({"User-Agent": USER_AGENT, "Accept-Language": "es-ES,es;q=0.9"})
+        retry = Retry(total=retries, backoff_factor=0.5, allowed_methods=None,
+                      status_forcelist=(429, 500, 502, 503, 504))
+        adapter = HTTPAdapter(pool_connections=2, pool_maxsize=pool, max_retries=retry)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+        self.provider, self.query_id, self.query = parse_jsf(url_base)
+        self.settings = None
+        self.ajaxurl = None
+        self._vistos = set()
+
+    def close(self):
+        self.session.close()
+
+    # ---------- Página 1 ----------
+    def primera_pagina(self) -> str:
+        r = self.session.get(self.url_base, timeout=self.timeout)
+        r.raise_for_status()
+        html = r.text
+        if ITEM_MARK not in html:
+            raise RSCEHttpError("La página no contiene jet-listing-grid__item")
+        self._vistos.add(hash(html))
+        self.settings = self._leer_settings(html)
+        self.ajaxurl = (self.settings or {}).get("ajaxurl") or urljoin(self.url_base, "/wp-admin/admin-ajax.php")
+        return html
+
+    @staticmethod
+    def _leer_settings(html: str) -> Optional[dict]:
+        m = SETTINGS_RE.search(html)
+        if not m:
+            return None
+        try:
+            obj, _ = json.JSONDecoder().raw_decode(html, m.end())
+            return obj
+        except ValueError:
+            return None
+
+    def total_paginas(self) -> Optional[int]:
+        """max_num_pages según los props de JetSmartFilters (None si no vienen)."""
+        try:
+            props = self.settings["props"][self.provider][self._qid("props")]
+            return int(props.get("max_num_pages") or 1)
+        except (TypeError, KeyError, ValueError):
+            return None
+
+    def _qid(self, section: str) -> str:
+        # si la URL no traía query_id, se toma el primero que publique la página
+        if self.query_id:
+            return self.query_id
+        try:
+            return next(iter(self.settings[section][self.provider]))
+        except (TypeError, KeyError, StopIteration):
+            return "default"
+
+    # ---------- Páginas 2..N (AJAX) ----------
+    def pagina(self, n: int) -> str:
+        if self.settings is None:
+            raise RSCEHttpError("Sin JetSmartFilterSettings: no se puede paginar por AJAX")
+        provider = self.provider or "jet-engine"
+        qid = self._qid("settings")
+        s = self.settings
+        data = {
+            "action": "jet_smart_filters",
+            "provider": f"{provider}/{qid}",
+            "query": self.query,
+            "defaults": (s.get("queries") or {}).get(provider, {}).get(qid, {}),
+            "settings": (s.get("settings") or {}).get(provider, {}).get(qid, {}),
+            "props": (s.get("props") or {}).get(provider, {}).get(qid, {}),
+            "paged": n,
+        }
+        r = self.session.post(self.ajaxurl, data=_php_form(data), timeout=self.timeout,
+                              headers={"X-Requested-With": "XMLHttpRequest", "Referer": self.url_base})
+        r.raise_for_status()
+        try:
+            content = r.json().get("content")
+        except ValueError:
+            raise RSCEHttpError(f"Respuesta AJAX no es JSON (página {n})")
+        if not content or ITEM_MARK not in content:
+            raise RSCEHttpError(f"Respuesta AJAX sin listado (página {n})")
+        h = hash(content)
+        if h in self._vistos:
+            # el servidor ignora `paged`: mejor que lo haga Selenium
+            raise RSCEHttpError(f"La página {n} repite el contenido de otra página")
+        self._vistos.add(h)
+        return content
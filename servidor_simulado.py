@@ -0,0 +1,297 @@
+# -*- coding: utf-8 -*-
+"""
+Servidor local que imita lo que usan los scrapers, para medir el pipeline
+completo sin tocar flowagility.com, rsce.es ni Nominatim.
+
+FlowAgility (01_eventosprox.py: BASE = <url>):
+- GET/POST /user/login: formulario user[email] / user[password]; al enviar
+  pone la cookie de sesión y redirige a /zone/events
+- GET /zone/events: sin sesión redirige al login; con sesión, el primer
+  lote de tarjetas `div.group.mb-6`, banner de cookies y scroll infinito
+  (fetch de /zone/events/lote?desde=N al acercarse al final)
+
+RSCE (Calendario.py: URL_BASE = <url>/eventos-rsce/jsf/jet-engine:eventocuadro/...):
+- GET /eventos-rsce/...: página 1 del listado JetEngine con
+  JetSmartFilterSettings y enlaces `.jet-filters-pagination__link`
+  (números alrededor de la página actual + "Siguiente"), que al pulsarse
+  piden la página por AJAX como la web real
+- POST /wp-admin/admin-ajax.php (action=jet_smart_filters, paged=N)
+
+Geocoder (Calendario.py: NOMINATIM_URL = <url>):
+- GET /search?q=...&format=json: coordenadas deterministas dentro de España
+
+GET /estado devuelve peticiones y bytes servidos por ruta.
+
+El marcado de tarjetas e items es el de replay.py. Nº de eventos, tamaño de
+página (RSCE), tamaño de lote (Flow) y latencia por petición son configurables.
+
+Uso:
+  python servidor_simulado.py --eventos 5000 --puerto 8765 --latencia-ms 50
+"""
+
+import sys, json, time, random, hashlib, secrets, argparse, threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlsplit, parse_qs
+from typing import Dict, Optional
+
+import replay
+
+RUTA_RSCE = "/eventos-rsce/jsf/jet-engine:eventocuadro/tax/tipos-de-disciplinas:38/"
+COOKIE = "_flow_session"
+
+
+class Simulador:
+    def __init__(self, eventos: int = 1000, por_pagina: int = 12, por_lote: int = 20,
+                 latencia_ms: float = 0, seed: int = 0, usuario: Optional[str] = None,
+                 clave: Optional[str] = None, host: str = "127.0.0.1", puerto: int = 0):
+        self.eventos = eventos
+        self.por_pagina = max(1, por_pagina)
+        self.por_lote = max(1, por_lote)
+        self.latencia = latencia_ms / 1000.0
+        self.seed = seed
+        self.usuario, self.clave = usuario, clave   # None = cualquiera
+        self.sesiones = set()
+        self.stats: Dict[str, Dict[str, int]] = {}
+        self._lock = threading.Lock()
+        self.httpd = ThreadingHTTPServer((host, puerto), _Handler)
+        self.httpd.daemon_threads = True
+        self.httpd.sim = self
+        self._hilo = None
+
+    # ---------- ciclo de vida ----------
+    @property
+    def url(self) -> str:
+        host, puerto = self.httpd.server_address[:2]
+        return f"http://{host}:{puerto}"
+
+    @property
+    def url_rsce(self) -> str:
+        return self.url + RUTA_RSCE
+
+    @property
+    def paginas(self) -> int:
+        return max(1, -(-self.eventos // self.por_pagina))
+
+    def start(self):
+        self._hilo = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self._hilo.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def anotar(self, ruta: str, nbytes: int):
+        with self._lock:
+            s = self.stats.setdefault(ruta, {"peticiones": 0, "bytes": 0})
+            s["peticiones"] += 1
+            s["bytes"] += nbytes
+
+    def total(self) -> Dict[str, int]:
+        with self._lock:
+            return {"peticiones": sum(s["peticiones"] for s in self.stats.values()),
+                    "bytes": sum(s["bytes"] for s in self.stats.values())}
+
+    # ---------- contenido ----------
+    def _rnd(self, i: int) -> random.Random:
+        # cada evento sale igual en cualquier página o lote
+        return random.Random(self.seed * 1_000_003 + i)
+
+    def tarjetas(self, desde: int, n: int) -> str:
+        return "".join(replay.card_flow(i, self._rnd(i)) for i in range(desde, min(desde + n, self.eventos)))
+
+    def items(self, pagina: int) -> str:
+        desde = (pagina - 1) * self.por_pagina
+        return "".join(replay.item_rsce(i, self._rnd(i))
+                       for i in range(desde, min(desde + self.por_pagina, self.eventos)))
+
+    def paginacion(self, pagina: int) -> str:
+        total = self.paginas
+        nums = sorted({1, total, *range(max(1, pagina - 2), min(total, pagina + 2) + 1)})
+        links = "".join(f'<div class="jet-filters-pagination__link" data-p="{p}">{p}</div>' for p in nums)
+        if pagina < total:
+            links += f'<div class="jet-filters-pagination__link next" data-p="{pagina + 1}">Siguiente</div>'
+        return links
+
+    def geocodificar(self, q: str):
+        h = hashlib.sha256(q.encode("utf-8")).digest()
+        lat = 36.0 + 7.5 * h[0] / 255
+        lon = -9.0 + 12.0 * h[1] / 255
+        return [{"place_id": int.from_bytes(h[:4], "big"), "lat": f"{lat:.5f}", "lon": f"{lon:.5f}",
+                 "display_name": q, "class": "place", "type": "city", "importance": 0.5}]
+
+
+_LOGIN_HTML = """<html><head><title>Login</title></head><body>
+<form method="post" action="/user/login">
+<input type="email" name="user[email]"><input type="password" name="user[password]">
+<button type="submit">Entrar</button></form></body></html>"""
+
+_EVENTOS_HTML = """<html><head><title>Events</title></head><body>
+<div id="uc-banner"><button data-testid="uc-accept-all-button" onclick="this.parentNode.remove()">Aceptar todo</button></div>
+<main id="lista">%(tarjetas)s</main><div id="fin" style="height:1px"></div>
+<script>
+let desde = %(desde)d, cargando = false;
+const total = %(total)d, lote = %(lote)d, lista = document.getElementById('lista');
+async function mas() {
+  if (cargando || desde >= total) return;
+  cargando = true;
+  try {
+    const r = await fetch('/zone/events/lote?desde=' + desde);
+    lista.insertAdjacentHTML('beforeend', await r.text());
+    desde += lote;
+  } finally { cargando = false; }
+}
+const cerca = () => window.innerHeight + window.scrollY >= document.body.scrollHeight - 600;
+window.addEventListener('scroll', () => { if (cerca()) mas(); });
+new IntersectionObserver(e => { if (e[0].isIntersecting) mas(); }).observe(document.getElementById('fin'));
+</script></body></html>"""
+
+_RSCE_HTML = """<html><head><title>Eventos RSCE</title></head><body>
+<div class="jet-listing-grid"><div class="jet-listing-grid__items">%(items)s</div></div>
+<div class="jet-filters-pagination">%(paginacion)s</div>
+<script>
+var JetSmartFilterSettings = %(settings)s;
+document.addEventListener('click', async (ev) => {
+  const a = ev.target.closest('.jet-filters-pagination__link');
+  if (!a) return;
+  const body = new URLSearchParams({action: 'jet_smart_filters', provider: 'jet-engine/eventocuadro', paged: a.dataset.p});
+  const r = await fetch(JetSmartFilterSettings.ajaxurl, {method: 'POST', body});
+  const j = await r.json();
+  document.querySelector('.jet-listing-grid__items').innerHTML = j.content;
+  document.querySelector('.jet-filters-pagination').innerHTML = j.pagination;
+});
+</script></body></html>"""
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"   # keep-alive: el pool de requests reutiliza conexiones
+    disable_nagle_algorithm = True  # cabeceras y cuerpo van en escrituras separadas: sin esto, +40 ms por respuesta
+
+    def log_message(self, *a):
+        pass
+
+    @property
+    def sim(self) -> Simulador:
+        return self.server.sim
+
+    # ---------- respuestas ----------
+    def _enviar(self, ruta: str, cuerpo, tipo="text/html; charset=utf-8", estado=200, cabeceras=()):
+        b = cuerpo.encode("utf-8") if isinstance(cuerpo, str) else cuerpo
+        self.send_response(estado)
+        self.send_header("Content-Type", tipo)
+        self.send_header("Content-Length", str(len(b)))
+        for k, v in cabeceras:
+            self.send_header(k, v)
+        self.end_headers()
+        self.wfile.write(b)
+        self.sim.anotar(ruta, len(b))
+
+    def _json(self, ruta, obj):
+        self._enviar(ruta, json.dumps(obj, ensure_ascii=False), "application/json; charset=utf-8")
+
+    def _redirigir(self, ruta, destino, cabeceras=()):
+        self._enviar(ruta, "", estado=302, cabeceras=(("Location", destino),) + tuple(cabeceras))
+
+    def _con_sesion(self) -> bool:
+        for parte in (self.headers.get("Cookie") or "").split(";"):
+            k, _, v = parte.strip().partition("=")
+            if k == COOKIE and v in self.sim.sesiones:
+                return True
+        return False
+
+    def _form(self) -> Dict[str, str]:
+        n = int(self.headers.get("Content-Length") or 0)
+        q = parse_qs(self.rfile.read(n).decode("utf-8")) if n else {}
+        return {k: v[0] for k, v in q.items()}
+
+    # ---------- rutas ----------
+    def do_GET(self):
+        time.sleep(self.sim.latencia)
+        u = urlsplit(self.path)
+        q = {k: v[0] for k, v in parse_qs(u.query).items()}
+        sim = self.sim
+        if u.path == "/user/login":
+            return self._enviar("login", _LOGIN_HTML)
+        if u.path == "/zone/events":
+            if not self._con_sesion():
+                return self._redirigir("eventos", "/user/login")
+            return self._enviar("eventos", _EVENTOS_HTML % {
+                "tarjetas": sim.tarjetas(0, sim.por_lote), "desde": sim.por_lote,
+                "total": sim.eventos, "lote": sim.por_lote})
+        if u.path == "/zone/events/lote":
+            if not self._con_sesion():
+                return self._enviar("lote", "", estado=401)
+            return self._enviar("lote", sim.tarjetas(int(q.get("desde", 0)), sim.por_lote))
+        if u.path.startswith("/eventos-rsce/"):
+            settings = {
+                "ajaxurl": sim.url + "/wp-admin/admin-ajax.php",
+                "props": {"jet-engine": {"eventocuadro": {"max_num_pages": sim.paginas, "page": 1,
+                                                          "found_posts": sim.eventos}}},
+                "settings": {"jet-engine": {"eventocuadro": {"lisitng_id": "1", "posts_num": sim.por_pagina}}},
+                "queries": {"jet-engine": {"eventocuadro": {}}},
+            }
+            return self._enviar("rsce", _RSCE_HTML % {
+                "items": sim.items(1), "paginacion": sim.paginacion(1), "settings": json.dumps(settings)})
+        if u.path == "/search":
+            return self._json("geocoder", sim.geocodificar(q.get("q", "")))
+        if u.path == "/estado":
+            return self._json("estado", {"rutas": sim.stats, **sim.total()})
+        if u.path == "/":
+            return self._enviar("inicio", "<html><body>FlowAgility simulado</body></html>")
+        self._enviar("404", "no encontrado", estado=404)
+
+    def do_POST(self):
+        time.sleep(self.sim.latencia)
+        u = urlsplit(self.path)
+        sim = self.sim
+        if u.path == "/user/login":
+            f = self._form()
+            email, clave = f.get("user[email]", ""), f.get("user[password]", "")
+            ok = email and clave and (sim.usuario is None or (email == sim.usuario and clave == sim.clave))
+            if not ok:
+                return self._enviar("login", _LOGIN_HTML)
+            token = secrets.token_hex(16)
+            sim.sesiones.add(token)
+            expira = time.strftime("%a, %d %b %Y %H:%M:%S GMT", time.gmtime(time.time() + 86400))
+            return self._redirigir("login", "/zone/events",
+                                   (("Set-Cookie", f"{COOKIE}={token}; Path=/; Expires={expira}"),))
+        if u.path == "/wp-admin/admin-ajax.php":
+            f = self._form()
+            if f.get("action") != "jet_smart_filters":
+                return self._json("ajax", {"content": ""})
+            p = max(1, min(int(f.get("paged", 1)), sim.paginas))
+            return self._json("ajax", {"content": f'<div class="jet-listing-grid__items">{sim.items(p)}</div>',
+                                       "pagination": sim.paginacion(p)})
+        self._enviar("404", "no encontrado", estado=404)
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Servidor simulado de FlowAgility, RSCE y Nominatim")
+    ap.add_argument("--eventos", type=int, default=1000)
+    ap.add_argument("--por-pagina", type=int, default=12, help="items por página del listado RSCE")
+    ap.add_argument("--por-lote", type=int, default=20, help="tarjetas por carga del scroll infinito")
+    ap.add_argument("--latencia-ms", type=float, default=0)
+    ap.add_argument("--puerto", type=int, default=8765)
+    ap.add_argument("--usuario")
+    ap.add_argument("--clave")
+    args = ap.parse_args(argv)
+    sim = Simulador(args.eventos, args.por_pagina, args.por_lote, args.latencia_ms,
+                    usuario=args.usuario, clave=args.clave, puerto=args.puerto)
+    print(f"🌐 {sim.url}  ({args.eventos} eventos, {sim.paginas} páginas RSCE)")
+    print(f"   FlowAgility: BASE={sim.url}  EVENTS_URL={sim.url}/zone/events")
+    print(f"   RSCE:        URL_BASE={sim.url_rsce}")
+    print(f"   Nominatim:   NOMINATIM_URL={sim.url}")
+    try:
+        sim.httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    sys.exit(main())